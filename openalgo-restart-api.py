@@ -4,7 +4,6 @@ OpenAlgo REST API with Web UI - Simplified Version
 """
 
 import http.server
-import socketserver
 import subprocess
 import json
 import sys
@@ -18,15 +17,109 @@ import hashlib
 import hmac
 import secrets
 import getpass
+import gzip
+import select
+import tempfile
 from threading import Thread, Lock
+from concurrent.futures import Future, ThreadPoolExecutor, TimeoutError as FuturesTimeout
 from urllib.parse import urlparse, parse_qs, quote
 import urllib.request
+import ssl
 from datetime import datetime, timedelta, timezone
 
+# orjson is optional (`apt install python3-orjson`): it encodes straight to
+# bytes several times faster than the json module. The API only ever sends
+# str-keyed dicts/lists of plain values, so both paths produce the same JSON.
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
 PORT = 8888
 
 _SERVER_IP_CACHE = None
 
+# Master-contract readiness is judged against Indian market days.
+_IST = timezone(timedelta(hours=5, minutes=30))
+
+# Instance directories are "openalgoN" or "openalgo-<domain-with-dashes>"; a
+# bare domain is accepted from callers and mapped onto the second form.
+_INSTANCE_RE = re.compile(r"^openalgo(?:\d+|-[A-Za-z0-9-]{1,253})$")
+_HOST_NAME_RE = re.compile(r"^[A-Za-z0-9.-]{1,253}$")
+_SERVICE_NAME_RE = re.compile(r"^[A-Za-z0-9@_.-]+$")
+# Broker name from an OpenAlgo REDIRECT_URL: https://domain/<broker>/callback
+_CALLBACK_RE = re.compile(r'/([^/]+)/callback')
+_IPV4_RE = re.compile(r'^\d{1,3}(\.\d{1,3}){3}$')
+# journalctl cursors are "s=<hex>;i=<hex>;b=<hex>;m=<hex>;t=<hex>;x=<hex>".
+_JOURNAL_CURSOR_RE = re.compile(r'^[A-Za-z0-9=;]{1,512}$')
+# CSI escape sequences (colours, cursor movement) in captured script output.
+_ANSI_RE = re.compile(r"\x1B\[[0-?]*[ -/]*[@-~]")
+# The four /proc/meminfo fields the health stats use, values in kB.
+_MEMINFO_RE = re.compile(rb"^(MemTotal|MemAvailable|SwapTotal|SwapFree):\s+(\d+)", re.M)
+# Terminal SQL must be a plain SELECT; any of these keywords disqualifies it.
+_WRITE_SQL_RE = re.compile(r"\b(insert|update|delete|drop|alter|create|pragma|attach|detach|vacuum|reindex)\b")
+
+# Building a default context loads the system CA bundle; do it once and share
+# it across the per-instance domain checks (SSLContext is thread-safe).
+_TLS_CONTEXT = ssl.create_default_context()
+
+# The systemd unit runs this server as root, where prefixing systemctl or
+# journalctl with sudo only adds a fork plus a PAM/sudoers pass to every
+# restart and log view. Keep sudo for the odd manual run as an unprivileged user.
+_SUDO = [] if os.geteuid() == 0 else ["sudo"]
+_SYSTEMCTL = _SUDO + ["systemctl"]
+_JOURNALCTL = _SUDO + ["journalctl"]
+
+
+# Reused for every response when orjson is missing; compact separators match
+# orjson's output and drop two bytes per key from the health payload.
+_JSON_ENCODE = json.JSONEncoder(separators=(',', ':'), ensure_ascii=False).encode
+
+
+def _json_dumps(data):
+    """Serialize an API response to UTF-8 JSON bytes."""
+    if orjson is not None:
+        return orjson.dumps(data)
+    return _JSON_ENCODE(data).encode('utf-8')
+
+
+# JSON responses smaller than this go out uncompressed.
+_JSON_GZIP_MIN_SIZE = 1024
+
+
+def _accepts_gzip(accept_encoding):
+    """True if an Accept-Encoding header allows gzip.
+
+    A bare substring test would also match "gzip;q=0", which is a client
+    explicitly refusing gzip; honour q=0 and the "*" wildcard instead.
+    """
+    wildcard = False
+    for part in (accept_encoding or '').lower().split(','):
+        coding, _, params = part.partition(';')
+        coding = coding.strip()
+        if coding not in ('gzip', 'x-gzip', '*'):
+            continue
+        refused = False
+        for param in params.split(';'):
+            key, _, value = param.partition('=')
+            if key.strip() == 'q':
+                try:
+                    refused = float(value) == 0
+                except ValueError:
+                    refused = True
+        if coding == '*':
+            wildcard = not refused
+        else:
+            return not refused
+    return wildcard
+
+
+def _json_loads(raw):
+    """Parse a request body (bytes or str); raises ValueError on bad JSON."""
+    if orjson is not None:
+        return orjson.loads(raw)
+    return json.loads(raw)
+
 
 def get_server_ip():
     """Best-effort public IP. Cloud VMs (AWS/GCP/Azure/...) NAT their public IP,
@@ -40,7 +133,7 @@ def get_server_ip():
             try:
                 with urllib.request.urlopen(url, timeout=3) as r:
                     candidate = r.read().decode('utf-8').strip()
-                if re.match(r'^\d{1,3}(\.\d{1,3}){3}$', candidate):
+                if _IPV4_RE.match(candidate):
                     ip = candidate
                     break
             except Exception:
@@ -224,7 +317,8 @@ main{max-width:min(1920px,96vw);margin:0 auto;padding:24px 20px 64px;display:fle
 .logs-section{display:none;margin:0 20px 16px;padding:12px;background:#080b12;border:1px solid var(--border);border-radius:var(--radius-sm)}
 .logs-section.show{display:block}
 .logs-container{max-height:420px;overflow-y:auto;font-family:var(--mono);font-size:11.5px;color:#c3cadb;line-height:1.5}
-.log-line{padding:2px 6px;word-break:break-all;border-radius:4px}
+.log-line{padding:2px 6px;word-break:break-all;border-radius:4px;content-visibility:auto;contain-intrinsic-size:auto 21px}
+.logs-older{margin:0 0 8px}
 .log-error{background:rgba(244,88,110,.12);color:#ff8fa0}
 .log-success{background:rgba(47,216,166,.12);color:#7ee8c8}
 .actions{display:flex;gap:8px;flex-wrap:wrap;padding:16px 20px;border-top:1px solid var(--border-soft)}
@@ -305,9 +399,67 @@ error:'<svg viewBox="0 0 24 24" fill="none" stroke="currentColor" stroke-width="
 };
 const ICON_LOGS='<svg width="14" height="14" viewBox="0 0 24 24" fill="none" stroke="currentColor" stroke-width="2" stroke-linecap="round" stroke-linejoin="round"><path d="M4 6h16M4 12h16M4 18h10"/></svg>';
 const ICON_CHEVRON='<svg width="14" height="14" viewBox="0 0 24 24" fill="none" stroke="currentColor" stroke-width="2" stroke-linecap="round" stroke-linejoin="round"><path d="M6 9l6 6 6-6"/></svg>';
+const ESC_MAP={'&':'&amp;','<':'&lt;','>':'&gt;','"':'&quot;',"'":'&#039;'};
+const ESC_RE=/[&<>"']/g;
 function escapeHtml(text){
-const map={'&':'&amp;','<':'&lt;','>':'&gt;','"':'&quot;',"'":'&#039;'};
-return text.replace(/[&<>"']/g,m=>map[m]);
+return text.replace(ESC_RE,m=>ESC_MAP[m]);
+}
+// Runs fn at most once at a time. A call made while it runs queues exactly one
+// rerun, so a click during a slow poll still gets fresh data without stacking.
+function coalesce(fn){
+let running=false,again=false;
+const run=async()=>{
+if(running){again=true;return;}
+running=true;
+try{await fn();}finally{running=false;}
+if(again){again=false;run();}
+};
+return run;
+}
+// Self-scheduling poll: the next tick is timed from when this one finished, and
+// a background tab polls at the slower hiddenMs.
+function pollEvery(fn,ms,hiddenMs){
+const tick=async()=>{
+try{await fn();}finally{setTimeout(tick,document.hidden?hiddenMs:ms);}
+};
+setTimeout(tick,ms);
+}
+const JSON_HEADERS={'Content-Type':'application/json'};
+function postJson(url,body){
+return fetchJson(url,{method:'POST',headers:JSON_HEADERS,body:JSON.stringify(body||{})});
+}
+const LOG_PAGES_MAX=5;
+// One case-insensitive scan per line: group 1 marks auth failures, group 2 successes.
+const LOG_CLASS_RE=/(session expired|invalid session detected|no valid auth token)|(master contract download completed|successfully loaded)/i;
+function mergeLogPage(prev,data){
+const logs=data.logs||[];
+return prev?{logs:logs.concat(prev.logs),cursor:data.next_cursor,hasMore:data.has_more,pages:prev.pages+1}
+:{logs:logs,cursor:data.next_cursor,hasMore:data.has_more,pages:1};
+}
+function renderLogs(el,logs,olderAction){
+if(!logs||!logs.length){
+el.innerHTML='<p style="color:var(--text-faint)">No logs available</p>';
+return false;
+}
+// Rows are built as nodes, not an HTML string: textContent needs no escaping
+// and the browser skips the HTML parser entirely.
+const frag=document.createDocumentFragment();
+if(olderAction){
+const btn=document.createElement('button');
+btn.className='btn btn-sm logs-older';
+btn.textContent='Load older';
+btn.onclick=olderAction;
+frag.appendChild(btn);
+}
+for(const log of logs){
+const m=LOG_CLASS_RE.exec(log);
+const row=document.createElement('div');
+row.className=m?(m[1]?'log-line log-error':'log-line log-success'):'log-line';
+row.textContent=log;
+frag.appendChild(row);
+}
+el.replaceChildren(frag);
+return true;
 }
 function formatBytes(bytes){
 if(bytes===null||bytes===undefined)return 'N/A';
@@ -399,7 +551,7 @@ if(data===null)return;
 if(!data.new_password){showAlert('New password cannot be empty','error');return;}
 if(data.new_password!==data.confirm_password){showAlert('New passwords do not match','error');return;}
 try{
-const res=await fetchJson(`${apiBase}/change-password`,{method:'POST',headers:{'Content-Type':'application/json'},body:JSON.stringify(data)});
+const res=await postJson(`${apiBase}/change-password`,data);
 showAlert(res&&res.message?res.message:'Password changed','success');
 }catch(e){
 showAlert('Error: '+e.message,'error');
@@ -441,13 +593,21 @@ showAlert('Error: '+e.message,'error');
 showMaintenanceOutput(title,'error',null,e.message);
 }
 }
+async function waitForJob(jobId){
+for(;;){
+const job=await fetchJson(`${apiBase}/jobs/${jobId}`);
+if(job.error&&!job.status){return {status:'error',error:job.error};}
+if(job.status!=='running'&&job.status!=='queued'){return job;}
+await new Promise(r=>setTimeout(r,1500));
+}
+}
 async function startJob(endpoint,payload,title){
 showMaintenanceStatus(`${title} - starting...`);
 const outputEl=document.getElementById('maintenance-output');
 const preEl=document.getElementById('maintenance-output-pre');
 if(outputEl){outputEl.style.display='block';}
 if(preEl){preEl.innerHTML='Starting...';}
-const data=await fetchJson(endpoint,{method:'POST',headers:{'Content-Type':'application/json'},body:JSON.stringify(payload||{})});
+const data=await postJson(endpoint,payload);
 if(data.error){
 showAlert(data.error,'error');
 showMaintenanceOutput(title,'error',null,data.error);
@@ -493,2681 +653,3483 @@ if(preview)preview.textContent=(h.domain&&chosen)?`Callback URL: https://${h.dom
 """
 
 
-class RestartHandler(http.server.BaseHTTPRequestHandler):
-    JOBS = {}
-    JOBS_LOCK = Lock()
-    JOB_LIMIT = 50
-    GIT_FETCH_CACHE = {}
-    GIT_LOCK = Lock()
-    GIT_FETCH_TTL = 300
-
-    def _now_iso(self):
-        return datetime.now().isoformat(sep=' ', timespec='seconds')
-
-    def _strip_ansi(self, text):
-        if not text:
-            return text
-        ansi_re = re.compile(r"\x1B\[[0-?]*[ -/]*[@-~]")
-        return ansi_re.sub("", text)
-
-    def _truncate_output(self, text, limit=20000):
-        if text is None:
-            return ""
-        if len(text) <= limit:
-            return text
-        return text[:limit] + "\n...\n(Output truncated)"
+WEB_UI_HTML = """<!DOCTYPE html>
+<html>
+<head>
+<meta charset="UTF-8">
+<meta name="viewport" content="width=device-width, initial-scale=1">
+<title>OpenAlgo Manager</title>
+<style>""" + DASHBOARD_CSS + """</style>
+</head>
+<body>
+<div class="topbar">
+<div class="brand">
+<div class="brand-mark"><svg width="16" height="16" viewBox="0 0 24 24" fill="none" stroke="currentColor" stroke-width="2" stroke-linecap="round" stroke-linejoin="round"><path d="M3 12h4l3 8 4-16 3 8h4"/></svg></div>
+<div class="brand-text"><b>OpenAlgo</b><span>Instance Manager</span></div>
+</div>
+<div class="topbar-right">
+<span class="live"><span class="dot pulse"></span><span class="live-text" id="last-updated">Loading…</span></span>
+<button class="icon-btn" title="Refresh" onclick="loadInstances()"><svg width="16" height="16" viewBox="0 0 24 24" fill="none" stroke="currentColor" stroke-width="2" stroke-linecap="round" stroke-linejoin="round"><path d="M23 4v6h-6M1 20v-6h6"/><path d="M3.51 9a9 9 0 0114.85-3.36L23 10M1 14l4.64 4.36A9 9 0 0020.49 15"/></svg></button>
+<button class="icon-btn" title="Change Password" onclick="changePassword()"><svg width="16" height="16" viewBox="0 0 24 24" fill="none" stroke="currentColor" stroke-width="2" stroke-linecap="round" stroke-linejoin="round"><rect x="3" y="11" width="18" height="11" rx="2"/><path d="M7 11V7a5 5 0 0110 0v4"/></svg></button>
+<a class="icon-btn" href="/logout" title="Log out"><svg width="16" height="16" viewBox="0 0 24 24" fill="none" stroke="currentColor" stroke-width="2" stroke-linecap="round" stroke-linejoin="round"><path d="M9 21H5a2 2 0 01-2-2V5a2 2 0 012-2h4"/><path d="M16 17l5-5-5-5"/><path d="M21 12H9"/></svg></a>
+</div>
+</div>
+<main>
+<div id="toasts" role="status" aria-live="polite"></div>
 
-    def _find_script(self, script_name):
-        env_dirs = [
-            os.environ.get("OPENALGO_SCRIPTS_DIR"),
-            os.environ.get("OA_SCRIPTS_DIR"),
-            os.environ.get("SCRIPTS_DIR"),
-        ]
-        candidates = []
-        # Default server path for scripts
-        default_root_dir = "/root/Simplifyed-Scripts"
-        candidates.append(os.path.join(default_root_dir, script_name))
-        for env_dir in env_dirs:
-            if env_dir:
-                candidates.append(os.path.join(env_dir, script_name))
+<div class="card">
+<div class="card-head"><h2>Summary</h2></div>
+<div id="summary" class="kpi-row"><div class="kpi"><div class="kpi-label">Instances</div><div class="kpi-value">Loading…</div></div></div>
+</div>
 
-        base_dir = os.path.dirname(os.path.abspath(__file__))
-        candidates.extend([
-            os.path.join(base_dir, script_name),
-            os.path.join(os.getcwd(), script_name),
-            f"/usr/local/bin/{script_name}",
-            f"/usr/bin/{script_name}",
-            f"/usr/local/sbin/{script_name}",
-            f"/usr/sbin/{script_name}",
-        ])
-        for path in candidates:
-            if os.path.exists(path):
-                return path
-        path_hit = shutil.which(script_name)
-        if path_hit:
-            return path_hit
-        return None
+<div id="system" class="card"></div>
 
-    def _git_run(self, instance_dir, args, timeout=6):
-        try:
-            result = subprocess.run(
-                ["git"] + args,
-                cwd=instance_dir,
-                capture_output=True,
-                text=True,
-                timeout=timeout
-            )
-            if result.returncode != 0:
-                return None
-            return result.stdout.strip()
-        except Exception:
-            return None
+<div class="card">
+<div class="card-head"><h2>Maintenance</h2></div>
+<div id="scripts-status" class="scripts-row"></div>
+<div class="toolbar" style="padding-top:0">
+<button id="btn-health-all" class="btn" onclick="runHealthCheck('all')">Health Check (All)</button>
+<button id="btn-health-system" class="btn" onclick="runHealthCheck('system')">Health Check (System)</button>
+<button id="btn-update-all" class="btn" onclick="updateAll()">Update All Instances</button>
+</div>
+<div id="maintenance-status" class="maintenance-status"></div>
+<div id="maintenance-output" class="maintenance-output"><pre id="maintenance-output-pre"></pre></div>
+</div>
 
-    def _ensure_git_safe(self, instance_dir):
-        try:
-            subprocess.run(
-                ["sudo", "git", "config", "--global", "--add", "safe.directory", instance_dir],
-                capture_output=True,
-                text=True,
-                timeout=4
-            )
-        except Exception:
-            pass
+<div class="card">
+<div class="card-head"><h2>Terminal <span class="card-sub" style="margin-left:6px;font-weight:400">(safe, read-only commands)</span></h2></div>
+<div class="terminal-grid">
+<div class="field">
+<span class="field-label">Action</span>
+<select id="term-action">
+<option value="systemctl_status">Systemctl Status</option>
+<option value="journalctl_tail">Journalctl Tail</option>
+<option value="df">Disk Usage (df -h)</option>
+<option value="free">Memory (free -h)</option>
+<option value="uptime">Uptime</option>
+<option value="sqlite_select">sqlite3 SELECT</option>
+</select>
+</div>
+<div id="term-instance-wrap" class="field">
+<span class="field-label">Instance</span>
+<select id="term-instance"></select>
+</div>
+<div id="term-lines-wrap" class="field">
+<span class="field-label">Lines</span>
+<input id="term-lines" type="number" min="10" max="500" value="100"/>
+</div>
+<div id="term-db-wrap" class="field">
+<span class="field-label">DB</span>
+<select id="term-db"></select>
+</div>
+</div>
+<div id="term-query-wrap" class="field" style="padding:0 20px;margin-top:12px">
+<span class="field-label">Query (SELECT only)</span>
+<textarea id="term-query"></textarea>
+</div>
+<div class="terminal-run"><button class="btn btn-accent" onclick="runTerminal()">Run Command</button></div>
+<div class="terminal-output"><pre id="term-output">Ready.</pre></div>
+</div>
 
-    def _get_default_branch(self, instance_dir):
-        ref = self._git_run(instance_dir, ["symbolic-ref", "--quiet", "refs/remotes/origin/HEAD"])
-        if ref and ref.startswith("refs/remotes/origin/"):
-            return ref.split("/", 3)[-1]
-        if self._git_run(instance_dir, ["show-ref", "--verify", "--quiet", "refs/remotes/origin/main"]) is not None:
-            return "main"
-        if self._git_run(instance_dir, ["show-ref", "--verify", "--quiet", "refs/remotes/origin/master"]) is not None:
-            return "master"
-        return "main"
+<div class="card">
+<div class="toolbar">
+<button class="btn" onclick="restartAll()">Restart All Instances</button>
+<button class="btn btn-accent" onclick="loadInstances()">Refresh</button>
+<button class="btn btn-warning" onclick="rebootServer()">Reboot Server</button>
+</div>
+</div>
 
-    def _maybe_fetch_origin(self, instance_dir):
-        with self.GIT_LOCK:
-            cached = self.GIT_FETCH_CACHE.get(instance_dir, {})
-            last_ts = cached.get("ts", 0)
-            if time.time() - last_ts < self.GIT_FETCH_TTL:
-                return
-            self.GIT_FETCH_CACHE[instance_dir] = {"ts": time.time()}
-        try:
-            subprocess.run(
-                ["sudo", "git", "fetch", "--prune", "origin"],
-                cwd=instance_dir,
-                capture_output=True,
-                text=True,
-                timeout=15
-            )
-        except Exception:
-            pass
+<div id="loading" class="loading"><div class="spinner"></div><p>Loading instances...</p></div>
+<div id="instances"></div>
+</main>
 
-    def _get_git_info(self, instance):
-        instance_dir = f"/var/python/openalgo-flask/{instance}"
-        if not os.path.isdir(os.path.join(instance_dir, ".git")):
-            return None
+<dialog id="resetAdminDialog" class="reset-admin-dialog">
+<form method="dialog" id="resetAdminForm">
+<h3 style="margin:0 0 10px;color:var(--danger);display:flex;align-items:center;gap:8px;font-size:16px"><svg width="18" height="18" viewBox="0 0 24 24" fill="none" stroke="currentColor" stroke-width="2" stroke-linecap="round" stroke-linejoin="round"><path d="M10.29 3.86L1.82 18a2 2 0 001.71 3h16.94a2 2 0 001.71-3L13.71 3.86a2 2 0 00-3.42 0z"/><path d="M12 9v4M12 17h.01"/></svg>Factory Reset<span id="resetAdminInstanceLabel"></span></h3>
+<p style="font-size:13px;color:var(--text-dim);margin:0 0 15px;line-height:1.5">Deletes all users and clears the broker login session. The next visit will require first-time admin setup and a fresh broker login. Use only when there's no TOTP/QR reset and no working SMTP.</p>
+<div class="reset-section">
+<label class="reset-field-label">Broker</label>
+<select id="resetBroker" class="reset-input" onchange="updateCallbackPreview()">
+<option value="">Keep current broker</option>
+</select>
+<div id="resetCallbackPreview" class="reset-preview"></div>
+</div>
+<label class="reset-checkbox-label"><input type="checkbox" id="resetRotateCreds" onchange="document.getElementById('resetCredsFields').style.display=this.checked?'block':'none'"> Also update broker API key/secret in .env</label>
+<div id="resetCredsFields" style="display:none">
+<label class="reset-field-label">New BROKER_API_KEY</label>
+<input type="text" id="resetApiKey" class="reset-input" placeholder="Leave blank to keep existing">
+<label class="reset-field-label">New BROKER_API_SECRET</label>
+<input type="password" id="resetApiSecret" class="reset-input" placeholder="Leave blank to keep existing">
+<label class="reset-checkbox-label"><input type="checkbox" id="resetXts" onchange="document.getElementById('resetXtsFields').style.display=this.checked?'block':'none'"> This broker also needs separate market-data credentials (XTS-based)</label>
+<div id="resetXtsFields" style="display:none">
+<label class="reset-field-label">New BROKER_API_KEY_MARKET</label>
+<input type="text" id="resetApiKeyMarket" class="reset-input" placeholder="Leave blank to keep existing">
+<label class="reset-field-label">New BROKER_API_SECRET_MARKET</label>
+<input type="password" id="resetApiSecretMarket" class="reset-input" placeholder="Leave blank to keep existing">
+</div>
+</div>
+<div class="reset-dialog-actions">
+<button type="button" class="btn btn-ghost" onclick="document.getElementById('resetAdminDialog').close()">Cancel</button>
+<button type="submit" value="confirm" class="btn btn-danger">Factory Reset</button>
+</div>
+</form>
+</dialog>
 
-        self._ensure_git_safe(instance_dir)
-        self._maybe_fetch_origin(instance_dir)
+<dialog id="changePasswordDialog" class="reset-admin-dialog">
+<form method="dialog" id="changePasswordForm">
+<h3 style="margin:0 0 10px;display:flex;align-items:center;gap:8px;font-size:16px"><svg width="18" height="18" viewBox="0 0 24 24" fill="none" stroke="currentColor" stroke-width="2" stroke-linecap="round" stroke-linejoin="round"><rect x="3" y="11" width="18" height="11" rx="2"/><path d="M7 11V7a5 5 0 0110 0v4"/></svg>Change Admin Password</h3>
+<label class="reset-field-label">Current Password</label>
+<input type="password" id="cpCurrent" class="reset-input" autocomplete="current-password" required>
+<label class="reset-field-label">New Password</label>
+<input type="password" id="cpNew" class="reset-input" autocomplete="new-password" required>
+<label class="reset-field-label">Confirm New Password</label>
+<input type="password" id="cpConfirm" class="reset-input" autocomplete="new-password" required>
+<div class="reset-dialog-actions">
+<button type="button" class="btn btn-ghost" onclick="document.getElementById('changePasswordDialog').close()">Cancel</button>
+<button type="submit" value="confirm" class="btn btn-accent">Change Password</button>
+</div>
+</form>
+</dialog>
 
-        branch = self._get_default_branch(instance_dir)
-        current_commit = self._git_run(instance_dir, ["rev-parse", "--short", "HEAD"])
-        latest_commit = self._git_run(instance_dir, ["rev-parse", "--short", f"origin/{branch}"])
-        current_date = self._git_run(instance_dir, ["log", "-1", "--format=%cd", "--date=iso", "HEAD"])
-        latest_date = self._git_run(instance_dir, ["log", "-1", "--format=%cd", "--date=iso", f"origin/{branch}"])
-        ahead_behind = self._git_run(instance_dir, ["rev-list", "--left-right", "--count", f"HEAD...origin/{branch}"])
-        ahead = behind = None
-        if ahead_behind and " " in ahead_behind:
-            ahead_str, behind_str = ahead_behind.split(" ", 1)
-            try:
-                ahead = int(ahead_str)
-                behind = int(behind_str)
-            except Exception:
-                ahead = behind = None
-
-        return {
-            "branch": branch,
-            "current_commit": current_commit,
-            "current_date": current_date,
-            "latest_commit": latest_commit,
-            "latest_date": latest_date,
-            "ahead": ahead,
-            "behind": behind,
-        }
-
-    def _list_db_files(self, instance):
-        inst_path = f"/var/python/openalgo-flask/{instance}"
-        db_dir = f"{inst_path}/db"
-        files = []
-        if os.path.isdir(db_dir):
-            for entry in os.scandir(db_dir):
-                if entry.is_file() and entry.name.endswith(".db"):
-                    files.append(entry.name)
-        return sorted(files)
-
-    def _is_safe_select(self, query):
-        if not query:
-            return False
-        if len(query) > 1000:
-            return False
-        q = query.strip()
-        if not q.lower().startswith("select"):
-            return False
-        if ";" in q.rstrip(";"):
-            return False
-        lowered = q.lower()
-        if re.search(r"\b(insert|update|delete|drop|alter|create|pragma|attach|detach|vacuum|reindex)\b", lowered):
-            return False
-        return True
-
-    def _list_instances(self):
-        base_dir = "/var/python/openalgo-flask"
-        instances = []
-        if os.path.isdir(base_dir):
-            for entry in os.scandir(base_dir):
-                if not entry.is_dir(follow_symlinks=False):
-                    continue
-                if not entry.name.startswith("openalgo"):
-                    continue
-                suffix = entry.name[8:]
-                if suffix.isdigit() or (suffix.startswith("-") and suffix[1:] and all(ch.isalnum() or ch == "-" for ch in suffix[1:])):
-                    instances.append(entry.name)
-        return sorted(instances)
-
-    def _prune_jobs_locked(self):
-        if len(self.JOBS) <= self.JOB_LIMIT:
-            return
-        ordered = sorted(self.JOBS.items(), key=lambda item: item[1].get("created_ts", 0))
-        for job_id, _ in ordered[:-self.JOB_LIMIT]:
-            self.JOBS.pop(job_id, None)
-
-    def _create_job(self, action, params):
-        job_id = uuid.uuid4().hex[:12]
-        job = {
-            "id": job_id,
-            "action": action,
-            "params": params,
-            "status": "queued",
-            "created_at": self._now_iso(),
-            "created_ts": time.time(),
-            "started_at": None,
-            "finished_at": None,
-            "exit_code": None,
-            "output": "",
-            "error": None,
-        }
-        with self.JOBS_LOCK:
-            self.JOBS[job_id] = job
-            self._prune_jobs_locked()
-        return job_id
-
-    def _update_job(self, job_id, **updates):
-        with self.JOBS_LOCK:
-            job = self.JOBS.get(job_id)
-            if not job:
-                return None
-            job.update(updates)
-            return job
-
-    def _get_job(self, job_id):
-        with self.JOBS_LOCK:
-            job = self.JOBS.get(job_id)
-            return dict(job) if job else None
-
-    def _run_script_job(self, job_id, command, timeout=900):
-        self._update_job(job_id, status="running", started_at=self._now_iso())
-        try:
-            result = subprocess.run(
-                command,
-                capture_output=True,
-                text=True,
-                timeout=timeout
-            )
-            output = (result.stdout or "") + ("\n" + result.stderr if result.stderr else "")
-            output = self._strip_ansi(output)
-            if len(output) > 200000:
-                output = output[:200000] + "\n...\n(Output truncated)"
-            self._update_job(
-                job_id,
-                status="success" if result.returncode == 0 else "error",
-                exit_code=result.returncode,
-                output=output.strip(),
-                finished_at=self._now_iso()
-            )
-        except subprocess.TimeoutExpired as e:
-            output = (e.stdout or "") + ("\n" + e.stderr if e.stderr else "")
-            output = self._strip_ansi(output)
-            self._update_job(
-                job_id,
-                status="timeout",
-                exit_code=None,
-                output=output.strip(),
-                error="Command timed out",
-                finished_at=self._now_iso()
-            )
-        except Exception as e:
-            self._update_job(
-                job_id,
-                status="error",
-                exit_code=None,
-                error=str(e),
-                finished_at=self._now_iso()
-            )
-    def _db_has_table(self, db_file, table_name):
-        try:
-            conn = sqlite3.connect(db_file)
-            cur = conn.cursor()
-            cur.execute("SELECT name FROM sqlite_master WHERE type='table' AND name=?", (table_name,))
-            found = cur.fetchone() is not None
-            conn.close()
-            return found
-        except Exception:
-            return False
-
-    def _db_has_auth_table(self, db_file):
-        return self._db_has_table(db_file, "auth")
-
-    def _get_db_file_with_table(self, instance, table_name):
-        inst_path = f"/var/python/openalgo-flask/{instance}"
-        instance_num = instance.replace('openalgo', '')
-        db_dir = f"{inst_path}/db"
-        candidates = []
-
-        if instance_num.isdigit():
-            candidates.append(f"{db_dir}/openalgo{instance_num}.db")
-        candidates.append(f"{db_dir}/openalgo.db")
-
-        for path in candidates:
-            if os.path.exists(path) and self._db_has_table(path, table_name):
-                return path
-
-        if os.path.isdir(db_dir):
-            for entry in os.scandir(db_dir):
-                if entry.is_file() and entry.name.endswith(".db"):
-                    if self._db_has_table(entry.path, table_name):
-                        return entry.path
-        return None
-
-    def _get_auth_db_file(self, instance):
-        inst_path = f"/var/python/openalgo-flask/{instance}"
-        instance_num = instance.replace('openalgo', '')
-        db_dir = f"{inst_path}/db"
-        candidates = []
-
-        if instance_num.isdigit():
-            candidates.append(f"{db_dir}/openalgo{instance_num}.db")
-        candidates.append(f"{db_dir}/openalgo.db")
-        candidates.append(f"{db_dir}/auth.db")
-
-        for path in candidates:
-            if os.path.exists(path) and self._db_has_auth_table(path):
-                return path
-
-        if os.path.isdir(db_dir):
-            for entry in os.scandir(db_dir):
-                if entry.is_file() and entry.name.endswith(".db"):
-                    if self._db_has_auth_table(entry.path):
-                        return entry.path
-        return None
-
-    def _parse_db_datetime(self, value):
-        if value is None:
-            return None
-        if isinstance(value, datetime):
-            return value
-        value = str(value).strip()
-        for fmt in ("%Y-%m-%d %H:%M:%S.%f", "%Y-%m-%d %H:%M:%S"):
-            try:
-                return datetime.strptime(value, fmt)
-            except Exception:
-                continue
-        try:
-            return datetime.fromisoformat(value)
-        except Exception:
-            return None
+<script>""" + DASHBOARD_JS_COMMON + """
+const apiBase='/api';
+let brokerStatusCache={};
+let logsCache={};
+let terminalInstances=[];
+let terminalInitialized=false;
+async function fetchJson(url, options){
+const r=await fetch(url,options);
+if(r.status===401){
+window.location.href=`/login?next=${encodeURIComponent(location.pathname+location.search)}`;
+return new Promise(()=>{});
+}
+const text=await r.text();
+const contentType=(r.headers.get('content-type')||'').toLowerCase();
+try{
+return JSON.parse(text);
+}catch(e){
+const preview=text.replace(/\\s+/g,' ').slice(0,160);
+throw new Error(`Invalid JSON from ${url} (status ${r.status}, type ${contentType||'unknown'}): ${preview}`);
+}
+}
+let lastHealthAll={};
+let eventsLive=false;
+const instanceCards=new Map();
+const loadInstances=coalesce(async()=>{
+try{
+document.getElementById('loading').style.display='block';
+applyDashboard(await fetchJson('/api/dashboard'));
+}catch(e){
+showAlert('Error: '+e.message,'error');
+}
+});
+function applyDashboard(dash){
+if(dash.error){throw new Error(dash.error);}
+const health=dash.health||{}, scriptsStatus=dash.scripts_status;
+document.getElementById('loading').style.display='none';
+const instances=Object.keys(health.instances||{}).sort();
+if(instances.length===0){
+document.getElementById('instances').innerHTML='<p style="color:var(--text-faint)">No instances found</p>';
+return;
+}
+lastHealthAll=health.instances||{};
+renderScriptsStatus(scriptsStatus);
+renderInstances(instances, health, true);
+markLive();
+}
+function markLive(){
+const lu=document.getElementById('last-updated');
+if(lu){lu.textContent='Live · updated '+new Date().toLocaleTimeString();}
+}
+let eventSource=null;
+function startEvents(){
+if(!window.EventSource||eventSource)return;
+const es=eventSource=new EventSource('/api/events');
+es.onopen=()=>{eventsLive=true;};
+es.onmessage=e=>{
+try{applyDashboard(JSON.parse(e.data));}
+catch(err){showAlert('Error: '+err.message,'error');}
+};
+// Sent instead of the full payload when only the live system figures moved.
+es.addEventListener('system',e=>{
+try{const d=JSON.parse(e.data);renderSystem(d.system,d.access);markLive();}
+catch(err){showAlert('Error: '+err.message,'error');}
+});
+// A closed stream (refused, or the session expired) hands back to polling.
+es.onerror=()=>{if(es.readyState===EventSource.CLOSED&&eventSource===es){eventSource=null;eventsLive=false;}};
+}
+function stopEvents(){
+if(eventSource){eventSource.close();eventSource=null;}
+eventsLive=false;
+}
+// A hidden tab falls back to pollEvery's slow rate instead of holding a stream.
+document.addEventListener('visibilitychange',()=>{if(document.hidden)stopEvents();else startEvents();});
+function instanceCardHtml(inst,h){
+const active=h.status==='active'&&!h.wedged;
+const broker=h.broker||'Unknown';
+const domain=h.domain||'Unknown';
+const authName=h.auth_name||'Unknown';
+const authStatus=h.auth_status||((h.session_valid!==false)?'User Authenticated':'Not Authenticated');
+const isAuthenticated=authStatus==='User Authenticated';
+const brokerAuthBadge=isAuthenticated?`<span class="badge badge-authenticated">${authStatus}</span>`:`<span class="badge badge-unauthenticated">${authStatus}</span>`;
+const mc=h.master_contract||{};
+const mcReady=mc.is_ready===true;
+const mcStatus=mc.status||'Master Contract Data Not Ready';
+const mcBadge=mcReady?`<span class="badge badge-authenticated">${mcStatus}</span>`:`<span class="badge badge-unauthenticated">${mcStatus}</span>`;
+const mcLast=mc.last_updated||'Unknown';
+const mcSymbols=(mc.total_symbols!==undefined&&mc.total_symbols!==null)?mc.total_symbols:'N/A';
+const mcBroker=mc.broker||'Unknown';
+const mcMessage=mc.message||'N/A';
+const git=h.git||{};
+const gitCurrent=git.current_commit||'N/A';
+const gitLatest=git.latest_commit||'N/A';
+const gitBehind=(git.behind!==null&&git.behind!==undefined)?`${git.behind} behind`:'';
+const gitUpdated=git.current_date||'Unknown';
+const gitSummary=gitCurrent===gitLatest?`${gitCurrent} (up to date)`:`${gitCurrent} → ${gitLatest} ${gitBehind}`.trim();
+const actions=active
+?`<button class="btn btn-sm btn-danger" onclick="stop('${inst}')">Stop</button>`
+:`<button class="btn btn-sm btn-success" onclick="start('${inst}')">Start</button>`;
+const monitorHref=domain!=='Unknown'?`https://${domain}/monitor`:`/monitor?instance=${inst}`;
+return`<div class="card" data-inst="${inst}"><div class="instance-header"><div class="instance-name">${inst}<span class="badge ${active?'badge-active':'badge-inactive'}">${active?ICON_CHECK+' Active':ICON_X+(h.wedged?' Wedged':' Inactive')}</span></div><a class="icon-btn" href="${monitorHref}" target="_blank" rel="noopener" title="Open monitor page for ${inst}"><svg width="15" height="15" viewBox="0 0 24 24" fill="none" stroke="currentColor" stroke-width="2" stroke-linecap="round" stroke-linejoin="round"><path d="M18 13v6a2 2 0 01-2 2H5a2 2 0 01-2-2V8a2 2 0 012-2h6"/><path d="M15 3h6v6"/><path d="M10 14L21 3"/></svg></a></div><div class="detail-grid"><div class="detail-item"><div class="detail-label">Domain</div><div class="detail-value">${domain!=='Unknown'?`<a href="https://${domain}" target="_blank" rel="noopener">${domain} ↗</a>`:domain}</div></div><div class="detail-item"><div class="detail-label">Env Version</div><div class="detail-value">${h.env_version||'—'}</div></div><div class="detail-item"><div class="detail-label">Status</div><div class="detail-value ${active?'active':'inactive'}">${h.wedged?'active (wedged - not serving)':(h.status||'unknown')}</div></div><div class="detail-item"><div class="detail-label">Flask Port</div><div class="detail-value">${h.port||'N/A'}</div></div><div class="detail-item"><div class="detail-label">Database</div><div class="detail-value status-inline">${h.database?ICON_CHECK+' Present':ICON_X+' Missing'}</div></div><div class="detail-item"><div class="detail-label">Git</div><div class="detail-value mono">${gitSummary}</div></div><div class="detail-item"><div class="detail-label">Code Updated</div><div class="detail-value">${gitUpdated}</div></div></div><div class="subpanel ${isAuthenticated?'ok':'bad'}"><div class="subpanel-title">${authName} | Broker: ${broker} ${brokerAuthBadge}</div></div><div class="subpanel ${mcReady?'ok':'bad'}"><div class="subpanel-title">Master Contract Data ${mcBadge}</div><div class="subpanel-grid"><div><div class="detail-label">Last Updated</div><div class="detail-value">${mcLast}</div></div><div><div class="detail-label">Total Symbols</div><div class="detail-value">${mcSymbols}</div></div><div><div class="detail-label">Broker</div><div class="detail-value">${mcBroker}</div></div><div><div class="detail-label">Message</div><div class="detail-value">${mcMessage}</div></div></div></div><button class="logs-toggle" onclick="toggleLogs('${inst}')">${ICON_LOGS}View Logs${ICON_CHEVRON}</button><div id="logs-${inst}" class="logs-section"><div class="logs-container" id="logs-content-${inst}"><p style="color:var(--text-faint)">Loading logs...</p></div></div><div class="actions"><button class="btn btn-sm" onclick="runHealthCheck('instance','${inst}')">Health</button><button class="btn btn-sm" onclick="updateInstance('${inst}')">Update</button><button class="btn btn-sm" onclick="restart('${inst}')">Restart</button><div class="danger-group"><button class="btn btn-sm" onclick="invalidate('${inst}')">Invalidate</button><button class="btn btn-sm btn-danger" onclick="resetAdminUser('${inst}')">Factory Reset</button>${actions}</div></div></div>`;
+}
+// Cards are rebuilt only when their instance's health changed since the last
+// render; unchanged cards keep their DOM (and any open log panel) untouched.
+// Returns the card, which is left for the caller to place if it is new.
+function renderCard(container,inst,h){
+const key=JSON.stringify(h);
+const cached=instanceCards.get(inst);
+const el=cached&&container.contains(cached.el)?cached.el:null;
+if(el&&cached.key===key){return el;}
+const tpl=document.createElement('template');
+tpl.innerHTML=instanceCardHtml(inst,h);
+const card=tpl.content.firstElementChild;
+const openLogs=el&&el.querySelector('.logs-section.show');
+if(openLogs){
+card.querySelector('.logs-section').replaceWith(openLogs);
+card.querySelector('.logs-toggle').classList.add('open');
+}else{
+delete logsCache[inst];
+}
+if(el){el.replaceWith(card);}
+instanceCards.set(inst,{key,el:card});
+return card;
+}
+// Re-render one card from a fresh health object (as returned by stop/start)
+// without refetching or touching the other cards.
+function updateCard(inst,h){
+const container=document.getElementById('instances');
+const cached=instanceCards.get(inst);
+if(!h||!cached||!container.contains(cached.el)){loadInstances();return;}
+lastHealthAll[inst]=h;
+cached.key=null;
+renderCard(container,inst,h);
+renderSummary(Object.keys(lastHealthAll),lastHealthAll);
+}
+// Shown while a stop/start is in flight: the card's buttons are disabled and
+// its badge says what is happening, until updateCard replaces the card.
+function setCardBusy(inst,label){
+const el=instanceCards.get(inst)?.el;
+if(!el)return;
+el.querySelectorAll('.actions button').forEach(b=>{b.disabled=true;});
+const badge=el.querySelector('.instance-name .badge');
+if(badge){badge.className='badge badge-inactive';badge.textContent=label;}
+}
+function renderSummary(instances,healthInstances){
+const running=Object.values(healthInstances||{}).filter(i=>i.status==='active'&&!i.wedged).length;
+document.getElementById('summary').innerHTML=`<div class="kpi"><div class="kpi-label">Total Instances</div><div class="kpi-value">${instances.length}</div></div><div class="kpi"><div class="kpi-label">Running</div><div class="kpi-value success">${running}</div></div><div class="kpi"><div class="kpi-label">Stopped</div><div class="kpi-value danger">${instances.length-running}</div></div>`;
+}
+function renderInstances(instances, health, initTerminal){
+renderSummary(instances,health.instances);
+renderSystem(health.system,health.access);
+const container=document.getElementById('instances');
+let prev=null;
+instances.forEach(inst=>{
+const el=renderCard(container,inst,health.instances?.[inst]||{});
+const next=prev?prev.nextElementSibling:container.firstElementChild;
+if(next!==el){container.insertBefore(el,next);}
+prev=el;
+});
+while(prev&&prev.nextElementSibling){prev.nextElementSibling.remove();}
+for(const inst of [...instanceCards.keys()]){if(!instances.includes(inst)){instanceCards.delete(inst);}}
+if(initTerminal && !terminalInitialized){
+populateTerminalInstances(instances);
+terminalInitialized=true;
+}
+}
+function populateTerminalInstances(instances){
+const select=document.getElementById('term-instance');
+if(!select)return;
+terminalInstances=Array.isArray(instances)?instances:[];
+if(!instances||instances.length===0){
+select.innerHTML='<option value="">No instances</option>';
+}else{
+select.innerHTML=instances.map(i=>`<option value="${i}">${i}</option>`).join('');
+}
+if(select.options.length){
+select.selectedIndex=0;
+}
+updateTerminalFields();
+}
+function getSelectedInstance(){
+const select=document.getElementById('term-instance');
+if(!select)return'';
+let val='';
+if(select.selectedOptions&&select.selectedOptions.length){
+const opt=select.selectedOptions[0];
+val=(opt.value||opt.text||'').trim();
+}
+if(!val){
+val=(select.value||'').trim();
+}
+if(!val&&select.options&&select.options.length){
+const opt=select.options[0];
+val=(opt.value||opt.text||'').trim();
+}
+return val;
+}
+function resolveInstance(){
+let inst=getSelectedInstance();
+const select=document.getElementById('term-instance');
+if(!inst&&select&&select.options&&select.options.length){
+select.selectedIndex=0;
+inst=getSelectedInstance();
+}
+if(!inst&&terminalInstances.length){
+inst=terminalInstances[0];
+if(select){select.value=inst;}
+}
+return (inst||'').trim();
+}
+function updateTerminalFields(){
+const action=document.getElementById('term-action')?.value;
+const dbWrap=document.getElementById('term-db-wrap');
+const queryWrap=document.getElementById('term-query-wrap');
+const linesWrap=document.getElementById('term-lines-wrap');
+const instanceWrap=document.getElementById('term-instance-wrap');
+if(dbWrap){dbWrap.style.display=(action==='sqlite_select')?'block':'none';}
+if(queryWrap){queryWrap.style.display=(action==='sqlite_select')?'block':'none';}
+if(linesWrap){linesWrap.style.display=(action==='journalctl_tail')?'block':'none';}
+if(instanceWrap){instanceWrap.style.display=(action==='df'||action==='free'||action==='uptime')?'none':'block';}
+loadTerminalDbs();
+}
+async function loadTerminalDbs(){
+const action=document.getElementById('term-action')?.value;
+const inst=resolveInstance();
+const dbSelect=document.getElementById('term-db');
+if(!dbSelect)return;
+if(!inst){
+dbSelect.innerHTML='<option value="">Select instance</option>';
+return;
+}
+if(action!=='sqlite_select'){
+dbSelect.innerHTML='';
+return;
+}
+try{
+const data=await fetchJson(`/api/terminal/dbs?instance=${encodeURIComponent(inst)}`);
+const dbs=data.dbs||[];
+dbSelect.innerHTML=dbs.length?dbs.map(d=>`<option value="${d}">${d}</option>`).join(''):'<option value="">No databases found</option>';
+}catch(e){
+dbSelect.innerHTML='<option value="">Error loading dbs</option>';
+}
+}
+document.getElementById('term-action')?.addEventListener('change',()=>{
+updateTerminalFields();
+});
+document.getElementById('term-instance')?.addEventListener('change',loadTerminalDbs);
+document.getElementById('term-action')?.dispatchEvent(new Event('change'));
 
-    def _ist_now(self):
-        ist = datetime.now(timezone.utc).astimezone(timezone(timedelta(hours=5, minutes=30)))
-        return ist.replace(tzinfo=None)
+async function runTerminal(){
+const action=document.getElementById('term-action').value;
+const instance=resolveInstance();
+const lines=document.getElementById('term-lines').value;
+const db=document.getElementById('term-db').value;
+const query=document.getElementById('term-query').value;
+const output=document.getElementById('term-output');
+if(output){output.textContent='Running...';}
+if((action==='systemctl_status'||action==='journalctl_tail'||action==='sqlite_select')&&!instance){
+if(output){output.textContent='Instance required for this action.';}
+return;
+}
+if(action==='sqlite_select' && !db){
+if(output){output.textContent='Please select a database.';}
+return;
+}
+if(action==='sqlite_select' && (!query||!query.trim())){
+if(output){output.textContent='Please enter a SELECT query.';}
+return;
+}
+const payload={action,instance,lines,db,query};
+try{
+const data=await postJson('/api/terminal/run',payload);
+if(data.error){
+if(output){output.textContent=data.error;}
+return;
+}
+if(output){output.textContent=data.output||'';}
+}catch(e){
+if(output){output.textContent=e.message;}
+}
+}
+function applyScriptsAvailability(scripts){
+const healthOk=!!(scripts&&scripts['oa-health-check.sh']&&scripts['oa-health-check.sh'].found);
+const updateOk=!!(scripts&&scripts['oa-update.sh']&&scripts['oa-update.sh'].found);
+const btnHealthAll=document.getElementById('btn-health-all');
+const btnHealthSystem=document.getElementById('btn-health-system');
+const btnUpdateAll=document.getElementById('btn-update-all');
+if(btnHealthAll){btnHealthAll.disabled=!healthOk;btnHealthAll.title=healthOk?'':'oa-health-check.sh not found';}
+if(btnHealthSystem){btnHealthSystem.disabled=!healthOk;btnHealthSystem.title=healthOk?'':'oa-health-check.sh not found';}
+if(btnUpdateAll){btnUpdateAll.disabled=!updateOk;btnUpdateAll.title=updateOk?'':'oa-update.sh not found';}
+}
+async function toggleLogs(inst){
+const logsSection=document.getElementById(`logs-${inst}`);
+logsSection.classList.toggle('show');
+event?.currentTarget?.classList.toggle('open');
+if(logsSection.classList.contains('show')&&!logsCache[inst]){
+queueLogs(inst);
+}
+}
+const logsLoading=new Set();
+const pendingLogs=new Set();
+let pendingLogsTimer=null;
+function showLogPage(inst,prev,data){
+const logsContent=document.getElementById(`logs-content-${inst}`);
+if(!logsContent)return;
+if(data.error){throw new Error(data.error);}
+const state=mergeLogPage(prev,data);
+const more=state.hasMore&&state.pages<LOG_PAGES_MAX;
+if(renderLogs(logsContent,state.logs,more?()=>fetchLogs(inst,true):null)){
+logsCache[inst]=state;
+}
+}
+function showLogError(inst,e){
+const logsContent=document.getElementById(`logs-content-${inst}`);
+if(logsContent){logsContent.innerHTML=`<p style="color:var(--danger)">Error loading logs: ${e.message}</p>`;}
+}
+// Panels opened within 50 ms of each other share one /api/logs request.
+function queueLogs(inst){
+pendingLogs.add(inst);
+if(!pendingLogsTimer){pendingLogsTimer=setTimeout(flushLogs,50);}
+}
+async function flushLogs(){
+const insts=[...pendingLogs].filter(i=>!logsLoading.has(i));
+pendingLogs.clear();
+pendingLogsTimer=null;
+if(insts.length===1){fetchLogs(insts[0]);return;}
+if(!insts.length)return;
+insts.forEach(i=>logsLoading.add(i));
+try{
+const data=await fetchJson(`/api/logs?instances=${insts.map(encodeURIComponent).join(',')}`);
+if(data.error){throw new Error(data.error);}
+for(const inst of insts){
+try{showLogPage(inst,null,(data.instances||{})[inst]||{logs:[]});}
+catch(e){showLogError(inst,e);}
+}
+}catch(e){
+insts.forEach(inst=>showLogError(inst,e));
+}finally{
+insts.forEach(i=>logsLoading.delete(i));
+}
+}
+async function fetchLogs(inst,older){
+if(logsLoading.has(inst))return;
+logsLoading.add(inst);
+try{
+const prev=older?logsCache[inst]:null;
+const data=await fetchJson(`/api/logs/${inst}`+(prev?`?before=${encodeURIComponent(prev.cursor)}`:''));
+showLogPage(inst,prev,data);
+}catch(e){
+showLogError(inst,e);
+}finally{
+logsLoading.delete(inst);
+}
+}
+async function restartAll(){
+if(!confirm('Restart all instances?'))return;
+showAlert('Restarting all...','info');
+const d=await fetchJson('/api/restart-all',{method:'POST'});
+if(d.error){showAlert(d.error,'error');return;}
+showAlert(d.message,'info');
+const job=await waitForJob(d.job_id);
+if(job.status==='success'){showAlert('All instances restarted','success');}
+else{showAlert(job.error||'Restart all failed','error');}
+loadInstances();
+}
+function runHealthCheck(scope,instance){
+const title=scope==='instance'?`Health Check (${instance})`:`Health Check (${scope})`;
+startJob('/api/health-check',{scope:scope,instance:instance},title);
+}
+function updateAll(){
+if(!confirm('Update ALL instances? This can take several minutes.'))return;
+startJob('/api/update',{scope:'all'},'Update All Instances');
+}
+function updateInstance(inst){
+if(!confirm(`Update ${inst}? This can take several minutes.`))return;
+startJob('/api/update',{scope:'instance',instance:inst},`Update ${inst}`);
+}
+async function restart(inst){
+if(!confirm(`Restart ${inst}? This will invalidate the session.`))return;
+const d=await postJson('/api/restart-instance',{instance:inst});
+if(d.error){showAlert(d.error,'error');return;}
+showAlert(`Restarting ${inst}`,'info');
+const job=await waitForJob(d.job_id);
+if(job.status==='success'){showAlert(`${inst} restarted`,'success');}
+else{showAlert(job.error||`Restart of ${inst} failed`,'error');}
+loadInstances();
+}
+async function invalidate(inst){
+if(!confirm(`Invalidate session for ${inst}? This will clear auth tokens and revoke the session.`))return;
+await postJson('/api/invalidate-session',{instance:inst});
+showAlert(`Invalidating session for ${inst}`,'info');
+setTimeout(loadInstances,1000);
+}
+let resetDialogHealth=null;
+function openResetAdminDialog(inst){
+resetDialogHealth=(lastHealthAll&&lastHealthAll[inst])||{};
+const dlg=document.getElementById('resetAdminDialog');
+document.getElementById('resetAdminForm').reset();
+populateBrokerSelect();
+document.getElementById('resetCredsFields').style.display='none';
+document.getElementById('resetXtsFields').style.display='none';
+document.getElementById('resetAdminInstanceLabel').textContent=inst?` for ${inst}`:'';
+return new Promise(resolve=>{
+dlg.returnValue='';
+dlg.showModal();
+dlg.onclose=function(){
+if(dlg.returnValue!=='confirm'){resolve(null);return;}
+const broker=document.getElementById('resetBroker').value;
+if(!document.getElementById('resetRotateCreds').checked){resolve(broker?{broker:broker}:{});return;}
+const xts=document.getElementById('resetXts').checked;
+resolve({
+broker:broker,
+broker_api_key:document.getElementById('resetApiKey').value.trim(),
+broker_api_secret:document.getElementById('resetApiSecret').value.trim(),
+broker_api_key_market:xts?document.getElementById('resetApiKeyMarket').value.trim():'',
+broker_api_secret_market:xts?document.getElementById('resetApiSecretMarket').value.trim():''
+});
+};
+});
+}
+async function resetAdminUser(inst){
+const creds=await openResetAdminDialog(inst);
+if(creds===null)return;
+showAlert(`Resetting admin user for ${inst}...`,'info');
+try{
+const res=await postJson('/api/reset-admin-user',Object.assign({instance:inst},creds));
+showAlert(res&&res.message?res.message:`Factory reset complete for ${inst}`,res&&res.status==='error'?'error':'success');
+}catch(e){
+showAlert('Error: '+e.message,'error');
+return;
+}
+setTimeout(loadInstances,1000);
+}
+async function stop(inst){
+if(!confirm(`Stop ${inst}?`))return;
+await unitAction(inst,'Stopping...','/api/stop-instance');
+}
+async function start(inst){
+if(!confirm(`Start ${inst}?`))return;
+await unitAction(inst,'Starting...','/api/start-instance');
+}
+async function unitAction(inst,label,url){
+setCardBusy(inst,label);
+let d;
+try{d=await postJson(url,{instance:inst});}
+catch(e){d={error:'Error: '+e.message};}
+applyUnitChange(inst,d);
+}
+// stop/start answer with the unit's fresh is-active state only; serving/wedged
+// are reset to their not-probed defaults until the next poll.
+function applyUnitChange(inst,d){
+if(d.error){
+showAlert(d.error,'error');
+updateCard(inst,lastHealthAll[inst]);
+return;
+}
+showAlert(d.message,'success');
+const prev=lastHealthAll[inst];
+if(d.state&&prev){updateCard(inst,Object.assign({},prev,{status:d.state,serving:null,wedged:false}));}
+else{loadInstances();}
+}
+window.addEventListener('load',()=>{loadInstances();startEvents();});
+pollEvery(async()=>{if(!eventsLive)await loadInstances();},30000,120000);
+</script>
+</body>
+</html>"""
 
-    def _ist_window_start(self, now_ist):
-        window_start = now_ist.replace(hour=3, minute=0, second=0, microsecond=0)
-        if now_ist < window_start:
-            window_start -= timedelta(days=1)
-        return window_start
+# The manager page has no per-request substitutions, so it is encoded and
+# compressed once at import instead of on every GET /.
+WEB_UI_BYTES = WEB_UI_HTML.encode('utf-8')
+WEB_UI_GZIP = gzip.compress(WEB_UI_BYTES, compresslevel=9, mtime=0)
+# Weak, because the same tag covers both the identity and gzip encodings.
+WEB_UI_ETAG = 'W/"%s"' % hashlib.sha256(WEB_UI_BYTES).hexdigest()[:16]
 
-    def _read_cpu_times(self):
-        try:
-            with open("/proc/stat", "r") as f:
-                line = f.readline()
-            parts = line.split()
-            if len(parts) < 5 or parts[0] != "cpu":
-                return None, None
-            values = [int(p) for p in parts[1:]]
-            total = sum(values)
-            idle = values[3] + (values[4] if len(values) > 4 else 0)
-            return total, idle
-        except Exception:
-            return None, None
+MONITOR_UI_HTML = """<!DOCTYPE html>
+<html>
+<head>
+<meta charset="UTF-8">
+<meta name="viewport" content="width=device-width, initial-scale=1">
+<title>OpenAlgo Monitor</title>
+<style>""" + DASHBOARD_CSS + """</style>
+</head>
+<body>
+<div class="topbar">
+<div class="brand">
+<div class="brand-mark"><svg width="16" height="16" viewBox="0 0 24 24" fill="none" stroke="currentColor" stroke-width="2" stroke-linecap="round" stroke-linejoin="round"><path d="M3 12h4l3 8 4-16 3 8h4"/></svg></div>
+<div class="brand-text"><b>OpenAlgo</b><span>Instance Monitor</span></div>
+</div>
+<div class="topbar-right">
+<span class="live"><span class="dot pulse"></span><span class="live-text" id="last-updated">Loading…</span></span>
+<a class="icon-btn" href="__MANAGER_URL__" title="All Instances"><svg width="16" height="16" viewBox="0 0 24 24" fill="none" stroke="currentColor" stroke-width="2" stroke-linecap="round" stroke-linejoin="round"><rect x="3" y="3" width="7" height="7" rx="1"/><rect x="14" y="3" width="7" height="7" rx="1"/><rect x="14" y="14" width="7" height="7" rx="1"/><rect x="3" y="14" width="7" height="7" rx="1"/></svg></a>
+<button class="icon-btn" title="Refresh" onclick="loadInstance()"><svg width="16" height="16" viewBox="0 0 24 24" fill="none" stroke="currentColor" stroke-width="2" stroke-linecap="round" stroke-linejoin="round"><path d="M23 4v6h-6M1 20v-6h6"/><path d="M3.51 9a9 9 0 0114.85-3.36L23 10M1 14l4.64 4.36A9 9 0 0020.49 15"/></svg></button>
+<button class="icon-btn" title="Change Password" onclick="changePassword()"><svg width="16" height="16" viewBox="0 0 24 24" fill="none" stroke="currentColor" stroke-width="2" stroke-linecap="round" stroke-linejoin="round"><rect x="3" y="11" width="18" height="11" rx="2"/><path d="M7 11V7a5 5 0 0110 0v4"/></svg></button>
+<a class="icon-btn" href="/monitor/logout" title="Log out"><svg width="16" height="16" viewBox="0 0 24 24" fill="none" stroke="currentColor" stroke-width="2" stroke-linecap="round" stroke-linejoin="round"><path d="M9 21H5a2 2 0 01-2-2V5a2 2 0 012-2h4"/><path d="M16 17l5-5-5-5"/><path d="M21 12H9"/></svg></a>
+</div>
+</div>
+<main>
+<div id="toasts" role="status" aria-live="polite"></div>
 
-    def _get_system_stats(self):
-        stats = {
-            "cpu_percent": None,
-            "load1": None,
-            "load5": None,
-            "load15": None,
-            "mem_total": None,
-            "mem_used": None,
-            "mem_available": None,
-            "mem_percent": None,
-            "swap_total": None,
-            "swap_used": None,
-            "swap_percent": None,
-            "disk_total": None,
-            "disk_used": None,
-            "disk_free": None,
-            "disk_percent": None,
-        }
+<div class="card">
+<div class="toolbar">
+<button class="btn btn-accent" onclick="loadInstance()">Refresh</button>
+<button class="btn" onclick="restartInstance()">Restart Instance</button>
+<button class="btn btn-warning" onclick="rebootServer()">Reboot Server</button>
+<button class="btn" onclick="clearLogs()">Clear Logs</button>
+<button class="btn" onclick="invalidateSession()">Invalidate Session</button>
+<div class="toolbar-danger"><button class="btn btn-danger" onclick="resetAdminUser()">Factory Reset</button></div>
+</div>
+</div>
 
-        total1, idle1 = self._read_cpu_times()
-        time.sleep(0.1)
-        total2, idle2 = self._read_cpu_times()
-        if total1 is not None and total2 is not None:
-            total_delta = total2 - total1
-            idle_delta = idle2 - idle1
-            if total_delta > 0:
-                stats["cpu_percent"] = round(100.0 * (1.0 - (idle_delta / total_delta)), 1)
+<div id="system" class="card"></div>
 
-        try:
-            load1, load5, load15 = os.getloadavg()
-            stats["load1"] = round(load1, 2)
-            stats["load5"] = round(load5, 2)
-            stats["load15"] = round(load15, 2)
-        except Exception:
-            pass
+<div class="card">
+<div class="card-head"><h2>Maintenance</h2></div>
+<div id="scripts-status" class="scripts-row"></div>
+<div class="toolbar" style="padding-top:0">
+<button id="btn-health-instance" class="btn" onclick="runHealthCheck()">Health Check</button>
+<button id="btn-update-instance" class="btn" onclick="updateInstance()">Update Instance</button>
+</div>
+<div id="maintenance-status" class="maintenance-status"></div>
+<div id="maintenance-output" class="maintenance-output"><pre id="maintenance-output-pre"></pre></div>
+</div>
 
-        try:
-            meminfo = {}
-            with open("/proc/meminfo", "r") as f:
-                for line in f:
-                    parts = line.split(":")
-                    if len(parts) != 2:
-                        continue
-                    key = parts[0].strip()
-                    val_parts = parts[1].strip().split()
-                    if not val_parts:
-                        continue
-                    meminfo[key] = int(val_parts[0]) * 1024
-            mem_total = meminfo.get("MemTotal")
-            mem_available = meminfo.get("MemAvailable")
-            if mem_total is not None and mem_available is not None:
-                mem_used = mem_total - mem_available
-                stats["mem_total"] = mem_total
-                stats["mem_available"] = mem_available
-                stats["mem_used"] = mem_used
-                stats["mem_percent"] = round(100.0 * mem_used / mem_total, 1)
+<div id="loading" class="loading"><div class="spinner"></div><p>Loading instance...</p></div>
+<div id="instance"></div>
+</main>
+
+<dialog id="resetAdminDialog" class="reset-admin-dialog">
+<form method="dialog" id="resetAdminForm">
+<h3 style="margin:0 0 10px;color:var(--danger);display:flex;align-items:center;gap:8px;font-size:16px"><svg width="18" height="18" viewBox="0 0 24 24" fill="none" stroke="currentColor" stroke-width="2" stroke-linecap="round" stroke-linejoin="round"><path d="M10.29 3.86L1.82 18a2 2 0 001.71 3h16.94a2 2 0 001.71-3L13.71 3.86a2 2 0 00-3.42 0z"/><path d="M12 9v4M12 17h.01"/></svg>Factory Reset</h3>
+<p style="font-size:13px;color:var(--text-dim);margin:0 0 15px;line-height:1.5">Deletes all users and clears the broker login session for this instance. The next visit will require first-time admin setup and a fresh broker login. Use only when there's no TOTP/QR reset and no working SMTP.</p>
+<div class="reset-section">
+<label class="reset-field-label">Broker</label>
+<select id="resetBroker" class="reset-input" onchange="updateCallbackPreview()">
+<option value="">Keep current broker</option>
+</select>
+<div id="resetCallbackPreview" class="reset-preview"></div>
+</div>
+<label class="reset-checkbox-label"><input type="checkbox" id="resetRotateCreds" onchange="document.getElementById('resetCredsFields').style.display=this.checked?'block':'none'"> Also update broker API key/secret in .env</label>
+<div id="resetCredsFields" style="display:none">
+<label class="reset-field-label">New BROKER_API_KEY</label>
+<input type="text" id="resetApiKey" class="reset-input" placeholder="Leave blank to keep existing">
+<label class="reset-field-label">New BROKER_API_SECRET</label>
+<input type="password" id="resetApiSecret" class="reset-input" placeholder="Leave blank to keep existing">
+<label class="reset-checkbox-label"><input type="checkbox" id="resetXts" onchange="document.getElementById('resetXtsFields').style.display=this.checked?'block':'none'"> This broker also needs separate market-data credentials (XTS-based)</label>
+<div id="resetXtsFields" style="display:none">
+<label class="reset-field-label">New BROKER_API_KEY_MARKET</label>
+<input type="text" id="resetApiKeyMarket" class="reset-input" placeholder="Leave blank to keep existing">
+<label class="reset-field-label">New BROKER_API_SECRET_MARKET</label>
+<input type="password" id="resetApiSecretMarket" class="reset-input" placeholder="Leave blank to keep existing">
+</div>
+</div>
+<div class="reset-dialog-actions">
+<button type="button" class="btn btn-ghost" onclick="document.getElementById('resetAdminDialog').close()">Cancel</button>
+<button type="submit" value="confirm" class="btn btn-danger">Factory Reset</button>
+</div>
+</form>
+</dialog>
 
-            swap_total = meminfo.get("SwapTotal")
-            swap_free = meminfo.get("SwapFree")
-            if swap_total is not None and swap_free is not None and swap_total > 0:
-                swap_used = swap_total - swap_free
-                stats["swap_total"] = swap_total
-                stats["swap_used"] = swap_used
-                stats["swap_percent"] = round(100.0 * swap_used / swap_total, 1)
-            elif swap_total is not None:
-                stats["swap_total"] = swap_total
-                stats["swap_used"] = 0
-                stats["swap_percent"] = 0.0
-        except Exception:
-            pass
+<dialog id="changePasswordDialog" class="reset-admin-dialog">
+<form method="dialog" id="changePasswordForm">
+<h3 style="margin:0 0 10px;display:flex;align-items:center;gap:8px;font-size:16px"><svg width="18" height="18" viewBox="0 0 24 24" fill="none" stroke="currentColor" stroke-width="2" stroke-linecap="round" stroke-linejoin="round"><rect x="3" y="11" width="18" height="11" rx="2"/><path d="M7 11V7a5 5 0 0110 0v4"/></svg>Change Admin Password</h3>
+<label class="reset-field-label">Current Password</label>
+<input type="password" id="cpCurrent" class="reset-input" autocomplete="current-password" required>
+<label class="reset-field-label">New Password</label>
+<input type="password" id="cpNew" class="reset-input" autocomplete="new-password" required>
+<label class="reset-field-label">Confirm New Password</label>
+<input type="password" id="cpConfirm" class="reset-input" autocomplete="new-password" required>
+<div class="reset-dialog-actions">
+<button type="button" class="btn btn-ghost" onclick="document.getElementById('changePasswordDialog').close()">Cancel</button>
+<button type="submit" value="confirm" class="btn btn-accent">Change Password</button>
+</div>
+</form>
+</dialog>
 
-        try:
-            stat = os.statvfs("/")
-            total = stat.f_frsize * stat.f_blocks
-            free = stat.f_frsize * stat.f_bavail
-            used = total - free
-            if total > 0:
-                stats["disk_total"] = total
-                stats["disk_free"] = free
-                stats["disk_used"] = used
-                stats["disk_percent"] = round(100.0 * used / total, 1)
-        except Exception:
-            pass
+<script>""" + DASHBOARD_JS_COMMON + """
+const monitorInstance="__INSTANCE__";
+let resolvedInstance=null;
+let logsState=null;
+const monitorApiBase='/monitor/api';
+const apiBase=monitorApiBase;
+async function fetchJson(url, options){
+const opts=options||{};
+const headers=new Headers(opts.headers||{});
+if(url.startsWith(monitorApiBase)){
+const inst=resolvedInstance||monitorInstance;
+if(inst){headers.set('X-OpenAlgo-Instance',inst);}
+}
+opts.headers=headers;
+const r=await fetch(url,opts);
+if(r.status===401){
+window.location.href=`/monitor/login?next=${encodeURIComponent(location.pathname+location.search)}`;
+return new Promise(()=>{});
+}
+const text=await r.text();
+const contentType=(r.headers.get('content-type')||'').toLowerCase();
+try{
+return JSON.parse(text);
+}catch(e){
+const preview=text.replace(/\\s+/g,' ').slice(0,160);
+throw new Error(`Invalid JSON from ${url} (status ${r.status}, type ${contentType||'unknown'}): ${preview}`);
+}
+}
+let lastHealth=null;
+const loadInstance=coalesce(async()=>{
+if(!monitorInstance){
+showAlert('Instance not specified. Use /monitor?instance=openalgo1','error');
+document.getElementById('loading').style.display='none';
+return;
+}
+try{
+document.getElementById('loading').style.display='block';
+const dash=await fetchJson(`${monitorApiBase}/dashboard`);
+const h=dash.health||dash;
+const scriptsStatus=dash.scripts_status;
+document.getElementById('loading').style.display='none';
+if(h.error){
+showAlert(h.error,'error');
+return;
+}
+lastHealth=h;
+renderSystem(h.system,h.access);
+renderScriptsStatus(scriptsStatus);
+renderInstance(h);
+const lu=document.getElementById('last-updated');
+if(lu){lu.textContent='Live · updated '+new Date().toLocaleTimeString();}
+}catch(e){
+showAlert('Error: '+e.message,'error');
+}
+});
+function applyScriptsAvailability(scripts){
+const healthOk=!!(scripts&&scripts['oa-health-check.sh']&&scripts['oa-health-check.sh'].found);
+const updateOk=!!(scripts&&scripts['oa-update.sh']&&scripts['oa-update.sh'].found);
+const btnHealth=document.getElementById('btn-health-instance');
+const btnUpdate=document.getElementById('btn-update-instance');
+if(btnHealth){btnHealth.disabled=!healthOk;btnHealth.title=healthOk?'':'oa-health-check.sh not found';}
+if(btnUpdate){btnUpdate.disabled=!updateOk;btnUpdate.title=updateOk?'':'oa-update.sh not found';}
+}
+function renderInstance(h){
+const inst=h.name||monitorInstance;
+resolvedInstance=inst||resolvedInstance;
+const active=h.status==='active'&&!h.wedged;
+const broker=h.broker||'Unknown';
+const domain=h.domain||'Unknown';
+const authName=h.auth_name||'Unknown';
+const authStatus=h.auth_status||((h.session_valid!==false)?'User Authenticated':'Not Authenticated');
+const isAuthenticated=authStatus==='User Authenticated';
+const brokerAuthBadge=isAuthenticated?`<span class="badge badge-authenticated">${authStatus}</span>`:`<span class="badge badge-unauthenticated">${authStatus}</span>`;
+const mc=h.master_contract||{};
+const mcReady=mc.is_ready===true;
+const mcStatus=mc.status||'Master Contract Data Not Ready';
+const mcBadge=mcReady?`<span class="badge badge-authenticated">${mcStatus}</span>`:`<span class="badge badge-unauthenticated">${mcStatus}</span>`;
+const mcLast=mc.last_updated||'Unknown';
+const mcSymbols=(mc.total_symbols!==undefined&&mc.total_symbols!==null)?mc.total_symbols:'N/A';
+const mcBroker=mc.broker||'Unknown';
+const mcMessage=mc.message||'N/A';
+const git=h.git||{};
+const gitCurrent=git.current_commit||'N/A';
+const gitLatest=git.latest_commit||'N/A';
+const gitBehind=(git.behind!==null&&git.behind!==undefined)?`${git.behind} behind`:'';
+const gitUpdated=git.current_date||'Unknown';
+const gitSummary=gitCurrent===gitLatest?`${gitCurrent} (up to date)`:`${gitCurrent} → ${gitLatest} ${gitBehind}`.trim();
+const dc=h.domain_check||{};
+const dcOk=dc.reachable===true&&dc.status_code>=200&&dc.status_code<400;
+const dcClass=dcOk?'ok':(dc.reachable?'':'bad');
+const dcBadge=dcOk?`<span class="badge badge-authenticated">${ICON_CHECK} ${dc.status_code} OK</span>`:`<span class="badge badge-unauthenticated">${ICON_X} ${dc.reachable?dc.status_code:'Unreachable'}</span>`;
+const dcExtra=dc.error?`<div style="color:var(--danger);font-size:11px;margin-top:3px">${escapeHtml(dc.error)}</div>`:'';
+const dcHtml=domain!=='Unknown'&&h.domain_check!==undefined?`<div class="domain-check ${dcClass}"><strong>App Reachability</strong> | <a href="https://${domain}" target="_blank" rel="noopener">${domain}</a> | ${dcBadge}${dcExtra}</div>`:'';
+const actions=active
+?`<button class="btn btn-sm btn-danger" onclick="stopInstance()">Stop</button>`
+:`<button class="btn btn-sm btn-success" onclick="startInstance()">Start</button>`;
+document.getElementById('instance').innerHTML=`<div class="card"><div class="instance-header"><div class="instance-name">${inst}<span class="badge ${active?'badge-active':'badge-inactive'}">${active?ICON_CHECK+' Active':ICON_X+(h.wedged?' Wedged':' Inactive')}</span></div></div><div class="detail-grid"><div class="detail-item"><div class="detail-label">Domain</div><div class="detail-value">${domain!=='Unknown'?`<a href="https://${domain}" target="_blank" rel="noopener">${domain} ↗</a>`:domain}</div></div><div class="detail-item"><div class="detail-label">Env Version</div><div class="detail-value">${h.env_version||'—'}</div></div><div class="detail-item"><div class="detail-label">Status</div><div class="detail-value ${active?'active':'inactive'}">${h.wedged?'active (wedged - not serving)':(h.status||'unknown')}</div></div><div class="detail-item"><div class="detail-label">Flask Port</div><div class="detail-value">${h.port||'N/A'}</div></div><div class="detail-item"><div class="detail-label">Database</div><div class="detail-value status-inline">${h.database?ICON_CHECK+' Present':ICON_X+' Missing'}</div></div><div class="detail-item"><div class="detail-label">Git</div><div class="detail-value mono">${gitSummary}</div></div><div class="detail-item"><div class="detail-label">Code Updated</div><div class="detail-value">${gitUpdated}</div></div></div>${dcHtml}<div class="subpanel ${isAuthenticated?'ok':'bad'}"><div class="subpanel-title">${authName} | Broker: ${broker} ${brokerAuthBadge}</div></div><div class="subpanel ${mcReady?'ok':'bad'}"><div class="subpanel-title">Master Contract Data ${mcBadge}</div><div class="subpanel-grid"><div><div class="detail-label">Last Updated</div><div class="detail-value">${mcLast}</div></div><div><div class="detail-label">Total Symbols</div><div class="detail-value">${mcSymbols}</div></div><div><div class="detail-label">Broker</div><div class="detail-value">${mcBroker}</div></div><div><div class="detail-label">Message</div><div class="detail-value">${mcMessage}</div></div></div></div><button class="logs-toggle" onclick="toggleLogs()">${ICON_LOGS}View Logs${ICON_CHEVRON}</button><div id="logs" class="logs-section"><div class="logs-container" id="logs-content"><p style="color:var(--text-faint)">Loading logs...</p></div></div><div class="actions"><button class="btn btn-sm" onclick="restartInstance()">Restart</button><div class="danger-group">${actions}</div></div></div>`;
+}
+function toggleLogs(){
+const logsSection=document.getElementById('logs');
+if(!logsSection)return;
+logsSection.classList.toggle('show');
+document.querySelector('.logs-toggle')?.classList.toggle('open');
+if(logsSection.classList.contains('show')&&!logsState){
+fetchLogs();
+}
+}
+let logsLoading=false;
+async function fetchLogs(older){
+if(logsLoading)return;
+logsLoading=true;
+try{
+const prev=older?logsState:null;
+const data=await fetchJson(`${monitorApiBase}/logs`+(prev?`?before=${encodeURIComponent(prev.cursor)}`:''));
+const logsContent=document.getElementById('logs-content');
+const state=mergeLogPage(prev,data);
+const more=state.hasMore&&state.pages<LOG_PAGES_MAX;
+if(renderLogs(logsContent,state.logs,more?()=>fetchLogs(true):null)){
+logsState=state;
+}
+}catch(e){
+document.getElementById('logs-content').innerHTML=`<p style="color:var(--danger)">Error loading logs: ${e.message}</p>`;
+}finally{
+logsLoading=false;
+}
+}
+async function post(path){
+return fetchJson(path,{method:'POST'});
+}
+async function restartInstance(){
+if(!confirm('Restart this instance? This will invalidate the session.'))return;
+showAlert('Restarting instance and invalidating session...','info');
+const d=await post('/monitor/api/restart');
+if(d.error){showAlert(d.error,'error');return;}
+const job=await waitForJob(d.job_id);
+if(job.status==='success'){showAlert('Instance restarted','success');}
+else{showAlert(job.error||'Restart failed','error');}
+loadInstance();
+}
+async function stopInstance(){
+if(!confirm('Stop this instance?'))return;
+showAlert('Stopping instance...','info');
+await unitAction('/monitor/api/stop');
+}
+async function startInstance(){
+if(!confirm('Start this instance?'))return;
+showAlert('Starting instance...','info');
+await unitAction('/monitor/api/start');
+}
+async function unitAction(url){
+let d;
+try{d=await post(url);}
+catch(e){d={error:'Error: '+e.message};}
+applyUnitChange(d);
+}
+function applyUnitChange(d){
+if(d.error){showAlert(d.error,'error');return;}
+showAlert(d.message,'success');
+if(d.state&&lastHealth){
+lastHealth=Object.assign({},lastHealth,{status:d.state,serving:null,wedged:false});
+renderInstance(lastHealth);
+}else{
+loadInstance();
+}
+}
+async function clearLogs(){
+if(!confirm('Clear all log files for this instance?'))return;
+showAlert('Clearing logs...','info');
+try{
+const res=await post('/monitor/api/clear-logs');
+if(res&&res.error){
+showAlert(res.error,'error');
+return;
+}
+const msg=res&&res.message?res.message:'Logs cleared';
+showAlert(msg,'success');
+}catch(e){
+showAlert('Error: '+e.message,'error');
+return;
+}
+logsState=null;
+setTimeout(loadInstance,1000);
+}
+async function invalidateSession(){
+if(!confirm('Invalidate the session for this instance? This will clear auth tokens and revoke the session.'))return;
+showAlert('Invalidating session...','info');
+await post('/monitor/api/invalidate-session');
+setTimeout(loadInstance,1000);
+}
+let resetDialogHealth=null;
+function openResetAdminDialog(health){
+resetDialogHealth=health||{};
+const dlg=document.getElementById('resetAdminDialog');
+document.getElementById('resetAdminForm').reset();
+populateBrokerSelect();
+document.getElementById('resetCredsFields').style.display='none';
+document.getElementById('resetXtsFields').style.display='none';
+return new Promise(resolve=>{
+dlg.returnValue='';
+dlg.showModal();
+dlg.onclose=function(){
+if(dlg.returnValue!=='confirm'){resolve(null);return;}
+const broker=document.getElementById('resetBroker').value;
+if(!document.getElementById('resetRotateCreds').checked){resolve(broker?{broker:broker}:{});return;}
+const xts=document.getElementById('resetXts').checked;
+resolve({
+broker:broker,
+broker_api_key:document.getElementById('resetApiKey').value.trim(),
+broker_api_secret:document.getElementById('resetApiSecret').value.trim(),
+broker_api_key_market:xts?document.getElementById('resetApiKeyMarket').value.trim():'',
+broker_api_secret_market:xts?document.getElementById('resetApiSecretMarket').value.trim():''
+});
+};
+});
+}
+async function resetAdminUser(){
+const creds=await openResetAdminDialog(lastHealth);
+if(creds===null)return;
+showAlert('Resetting admin user...','info');
+try{
+const res=await postJson('/monitor/api/reset-admin-user',creds);
+const msg=res&&res.message?res.message:'Factory reset complete';
+showAlert(msg,res&&res.status==='error'?'error':'success');
+}catch(e){
+showAlert('Error: '+e.message,'error');
+return;
+}
+setTimeout(loadInstance,1000);
+}
+function runHealthCheck(){
+const target=resolvedInstance||monitorInstance;
+if(!target){
+showAlert('Instance not specified. Use /monitor?instance=openalgo1','error');
+return;
+}
+startJob(`${monitorApiBase}/health-check`,{scope:'instance',instance:target},`Health Check (${target})`);
+}
+function updateInstance(){
+const target=resolvedInstance||monitorInstance;
+if(!target){
+showAlert('Instance not specified. Use /monitor?instance=openalgo1','error');
+return;
+}
+if(!confirm(`Update ${target}? This can take several minutes.`))return;
+startJob(`${monitorApiBase}/update`,{scope:'instance',instance:target},`Update ${target}`);
+}
+window.addEventListener('load',loadInstance);
+pollEvery(loadInstance,30000,120000);
+</script>
+</body>
+</html>"""
+
+# The monitor page only varies in the manager link and the instance name, so it
+# is encoded once and split around those two slots.
+MONITOR_UI_HEAD, _rest = MONITOR_UI_HTML.encode('utf-8').split(b"__MANAGER_URL__")
+MONITOR_UI_MID, MONITOR_UI_TAIL = _rest.split(b"__INSTANCE__")
+del _rest
+# A page's ETag hashes this with its two slot values, so a revalidation never
+# has to assemble or compress the page.
+MONITOR_UI_DIGEST = hashlib.sha256(MONITOR_UI_HTML.encode('utf-8')).digest()
+
+# Request routing. Exact paths map to RestartHandler method names; the few
+# parameterised paths are matched by prefix and get the remainder of the path.
+_GET_ROUTES = {
+    '/': 'serve_web_ui',
+    '/index.html': 'serve_web_ui',
+    '/health': 'handle_health',
+    '/api/instances': 'handle_instances',
+    '/api/status': 'handle_status',
+    '/api/health': 'handle_instances_health',
+    '/api/dashboard': 'handle_dashboard',
+    '/api/events': 'handle_events',
+    '/api/logs': 'handle_logs_batch',
+    '/api/scripts-status': 'handle_scripts_status',
+    '/api/terminal/dbs': 'handle_terminal_dbs',
+    '/monitor': 'serve_monitor_ui',
+    '/monitor/': 'serve_monitor_ui',
+    '/monitor/api/health': 'handle_monitor_health',
+    '/monitor/api/logs': 'handle_monitor_logs',
+    '/monitor/api/status': 'handle_monitor_status',
+    '/monitor/api/scripts-status': 'handle_scripts_status',
+    '/monitor/api/dashboard': 'handle_monitor_dashboard',
+}
+_GET_PREFIX_ROUTES = (
+    ('/api/logs/', '_route_instance_logs'),
+    ('/api/broker-status/', '_route_broker_status'),
+    ('/api/jobs/', '_route_job_status'),
+    ('/monitor/api/jobs/', '_route_job_status'),
+)
+
+# POST paths map to (method name, where the instance comes from, pass body).
+# "monitor" resolves it like the monitor page does (query, body or Host);
+# "body" takes the "instance" field of the JSON body.
+_POST_ROUTES = {
+    '/api/restart-all': ('handle_restart_all', None, False),
+    '/api/restart-instance': ('handle_restart_instance', 'body', False),
+    '/api/stop-instance': ('handle_stop_instance', 'body', False),
+    '/api/start-instance': ('handle_start_instance', 'body', False),
+    '/api/invalidate-session': ('handle_invalidate_session', 'body', False),
+    '/api/reset-admin-user': ('handle_reset_admin_user', 'body', True),
+    '/api/reboot-server': ('handle_reboot_server', None, False),
+    '/api/health-check': ('handle_health_check', None, True),
+    '/api/update': ('handle_update', None, True),
+    '/api/change-password': ('handle_change_password', None, True),
+    '/api/scripts-status': ('handle_scripts_status', None, False),
+    '/api/terminal/run': ('handle_terminal_run', None, True),
+    '/monitor/api/restart': ('handle_restart_instance', 'monitor', False),
+    '/monitor/api/stop': ('handle_stop_instance', 'monitor', False),
+    '/monitor/api/start': ('handle_start_instance', 'monitor', False),
+    '/monitor/api/clear-logs': ('handle_clear_logs_instance', 'monitor', False),
+    '/monitor/api/invalidate-session': ('handle_invalidate_session', 'monitor', False),
+    '/monitor/api/reset-admin-user': ('handle_reset_admin_user', 'monitor', True),
+    '/monitor/api/reboot-server': ('handle_reboot_server', None, False),
+    '/monitor/api/health-check': ('handle_health_check', None, True),
+    '/monitor/api/update': ('handle_update', None, True),
+    '/monitor/api/change-password': ('handle_change_password', None, True),
+}
 
-        return stats
 
-    def _get_master_contract_status(self, instance):
-        db_file = self._get_db_file_with_table(instance, "master_contract_status")
-        if not db_file:
-            return {
-                "is_ready": False,
-                "status": "Master Contract Data Not Ready",
-                "last_updated": None,
-                "total_symbols": None,
-                "message": None,
-                "broker": None,
-            }
+class RestartHandler(http.server.BaseHTTPRequestHandler):
+    # HTTP/1.1 keeps the connection open across the dashboard's back-to-back
+    # fetches. Every response sets Content-Length so the client knows where it
+    # ends; a connection left idle for `timeout` seconds is closed.
+    protocol_version = "HTTP/1.1"
+    timeout = 60
+    # Headers and body leave as separate writes. On a kept-alive connection
+    # Nagle would hold the body until the client ACKs the headers, which a
+    # delayed ACK can stall for ~40 ms; TCP_NODELAY sends it straight away.
+    disable_nagle_algorithm = True
+    JOBS = {}
+    JOBS_LOCK = Lock()
+    JOB_LIMIT = 50
+    GIT_FETCH_CACHE = {}
+    GIT_LOCK = Lock()
+    GIT_FETCH_TTL = 300
+    GIT_SAFE_DIRS = set()
+    INSTANCES_CACHE = {}
+    INSTANCES_LOCK = Lock()
+    # Restarts run on a small shared pool instead of a fresh thread per click,
+    # and at most one restart per unit is in flight at a time.
+    RESTART_EXECUTOR = ThreadPoolExecutor(max_workers=4, thread_name_prefix="oa-restart")
+    RESTARTS_INFLIGHT = {}
+    RESTART_LOCK = Lock()
+    RESTART_ALL_WIDTH = 3
+    LOGS_PAGE_LINES = 100
+    EVENTS_INTERVAL = 30
+    EVENTS_MAX_AGE = 300
+    EVENTS_MAX_STREAMS = 4
+    EVENTS_STREAMS = 0
+    EVENTS_LOCK = Lock()
+    LOGS_MAX_LINES = 1000
+    # Batched log reads get their own pool: queued behind them on
+    # HEALTH_EXECUTOR, instances would miss the sweep's HEALTH_TIMEOUT.
+    LOGS_EXECUTOR = ThreadPoolExecutor(max_workers=4, thread_name_prefix="oa-logs")
+    ACTIVE_STATE_CACHE = {}
+    ACTIVE_STATE_LOCK = Lock()
+    ACTIVE_STATE_TTL = 2
+    HEALTH_EXECUTOR = ThreadPoolExecutor(max_workers=8, thread_name_prefix="oa-health")
+    HEALTH_TIMEOUT = 20
+    ENV_CACHE = {}
+    ENV_LOCK = Lock()
+    HEALTH_FLIGHT = {}
+    HEALTH_LOCK = Lock()
+    HEALTH_TTL = 2
+    # One read-only sqlite connection per instance database, shared by all
+    # request threads; each entry carries its own lock to serialise queries.
+    DB_CONNS = {}
+    DB_CONNS_LOCK = Lock()
+    DB_TABLES = {}
+    SCRIPT_PATH_CACHE = {}
+    SCRIPT_PATH_TTL = 60
+    DB_PATH_CACHE = {}
+    DB_PATH_LOCK = Lock()
+    DB_PATH_TTL = 60
+    STATUS_SNAPSHOT = {}
+    STATUS_REFRESH_INTERVAL = 5
+    STATUS_IDLE = 120
+    STATUS_LAST_READ = 0
+    NOW_ISO_CACHE = (0, "")
+    HEALTH_BODY_CACHE = ("", b"")
+    MONITOR_UI_CACHE = {}
+    IST_WINDOW_CACHE = ()
+    # Last /proc/stat sample as (total, idle, monotonic time, cpu_percent).
+    CPU_SAMPLE = (None, None, 0.0, None)
+    CPU_SAMPLE_MAX_AGE = 10
 
-        try:
-            conn = sqlite3.connect(db_file)
-            cur = conn.cursor()
-            cur.execute(
-                "SELECT broker, message, last_updated, total_symbols, is_ready "
-                "FROM master_contract_status ORDER BY last_updated DESC LIMIT 1"
-            )
-            latest = cur.fetchone()
+    def _now_iso(self):
+        # Second resolution, so every response within one second can share one
+        # formatted string. The (second, text) tuple is swapped in whole, which
+        # keeps concurrent readers consistent without a lock.
+        now = int(time.time())
+        cached = RestartHandler.NOW_ISO_CACHE
+        if cached[0] != now:
+            cached = (now, datetime.fromtimestamp(now).isoformat(sep=' ', timespec='seconds'))
+            RestartHandler.NOW_ISO_CACHE = cached
+        return cached[1]
 
-            cur.execute(
-                "SELECT broker, message, last_updated, total_symbols, is_ready "
-                "FROM master_contract_status WHERE is_ready=1 "
-                "ORDER BY last_updated DESC LIMIT 20"
-            )
-            ready_rows = cur.fetchall()
-            conn.close()
+    def _strip_ansi(self, text):
+        # Most script output has no colour codes at all; the substring test
+        # skips the regex for it.
+        if not text or "\x1b" not in text:
+            return text
+        return _ANSI_RE.sub("", text)
 
-            now_ist = self._ist_now()
-            window_start = self._ist_window_start(now_ist)
-            window_end = window_start + timedelta(days=1)
+    def _truncate_output(self, text, limit=20000):
+        if text is None:
+            return ""
+        if len(text) <= limit:
+            return text
+        return text[:limit] + "\n...\n(Output truncated)"
 
-            ready_row = None
-            for row in ready_rows:
-                row_dt = self._parse_db_datetime(row[2])
-                if row_dt and window_start <= row_dt < window_end:
-                    ready_row = row
-                    break
+    def _find_script(self, script_name):
+        """Path of an oa-*.sh helper, or None.
 
-            is_ready = ready_row is not None
-            status = "Master Contract Data Ready" if is_ready else "Master Contract Data Not Ready"
+        Every dashboard poll looks up six scripts across ~10 candidate paths
+        plus $PATH. Answers are kept for SCRIPT_PATH_TTL seconds; a cached hit
+        that has since been removed is looked up again straight away.
+        """
+        now = time.time()
+        cached = self.SCRIPT_PATH_CACHE.get(script_name)
+        if (cached and now - cached[0] < self.SCRIPT_PATH_TTL
+                and (cached[1] is None or os.path.exists(cached[1]))):
+            return cached[1]
+        path = self._locate_script(script_name)
+        self.SCRIPT_PATH_CACHE[script_name] = (now, path)
+        return path
+
+    def _locate_script(self, script_name):
+        env_dirs = [
+            os.environ.get("OPENALGO_SCRIPTS_DIR"),
+            os.environ.get("OA_SCRIPTS_DIR"),
+            os.environ.get("SCRIPTS_DIR"),
+        ]
+        candidates = []
+        # Default server path for scripts
+        default_root_dir = "/root/Simplifyed-Scripts"
+        candidates.append(os.path.join(default_root_dir, script_name))
+        for env_dir in env_dirs:
+            if env_dir:
+                candidates.append(os.path.join(env_dir, script_name))
 
-            if latest:
-                broker, message, last_updated, total_symbols, _ = latest
-            else:
-                broker = message = last_updated = total_symbols = None
+        base_dir = os.path.dirname(os.path.abspath(__file__))
+        candidates.extend([
+            os.path.join(base_dir, script_name),
+            os.path.join(os.getcwd(), script_name),
+            f"/usr/local/bin/{script_name}",
+            f"/usr/bin/{script_name}",
+            f"/usr/local/sbin/{script_name}",
+            f"/usr/sbin/{script_name}",
+        ])
+        for path in candidates:
+            if os.path.exists(path):
+                return path
+        path_hit = shutil.which(script_name)
+        if path_hit:
+            return path_hit
+        return None
 
-            return {
-                "is_ready": is_ready,
-                "status": status,
-                "last_updated": last_updated,
-                "total_symbols": total_symbols,
-                "message": message,
-                "broker": broker,
-            }
+    def _git_run(self, instance_dir, args, timeout=6):
+        try:
+            result = subprocess.run(
+                ["git"] + args,
+                cwd=instance_dir,
+                capture_output=True,
+                text=True,
+                timeout=timeout
+            )
+            if result.returncode != 0:
+                return None
+            return result.stdout.strip()
         except Exception:
-            return {
-                "is_ready": False,
-                "status": "Master Contract Data Not Ready",
-                "last_updated": None,
-                "total_symbols": None,
-                "message": None,
-                "broker": None,
-            }
-
-    def _invalidate_session(self, instance):
-        """Invalidate session using instance auth models and reset master contract status."""
-        inst_path = f"/var/python/openalgo-flask/{instance}"
-        result = {
-            "instance": instance,
-            "auth_updated": False,
-            "auth_error": None,
-            "output": "",
-            "exit_code": None,
-        }
+            return None
 
-        if not os.path.isdir(inst_path):
-            result["auth_error"] = "Instance not found"
-            return result
-        script_path = self._find_script("oa-invalidate-session.sh")
-        if not script_path:
-            result["auth_error"] = "oa-invalidate-session.sh not found"
-            return result
+    def _ensure_git_safe(self, instance_dir):
+        """Register instance_dir as a git safe.directory, once per process.
 
+        This used to run `git config --add` on every health poll, which cost a
+        sudo + git fork per instance and appended a duplicate entry to root's
+        gitconfig each time. Now the existing entries are checked first, and
+        the directory is remembered once it is known to be registered; a git
+        call that fails or times out is retried on the next poll.
+        """
+        with self.GIT_LOCK:
+            if instance_dir in self.GIT_SAFE_DIRS:
+                return
         try:
-            proc = subprocess.run(
-                ["sudo", "bash", script_path, "--instance", instance],
-                cwd=inst_path,
+            existing = subprocess.run(
+                _SUDO + ["git", "config", "--global", "--get-all", "safe.directory"],
                 capture_output=True,
                 text=True,
-                timeout=60,
+                timeout=4
             )
-            result["exit_code"] = proc.returncode
-            result["output"] = (proc.stdout or "") + (("\n" + proc.stderr) if proc.stderr else "")
-            if proc.returncode == 0:
-                result["auth_updated"] = True
-            else:
-                result["auth_error"] = f"Script failed (exit {proc.returncode})"
-        except Exception as e:
-            result["auth_error"] = str(e)
+            registered = instance_dir in existing.stdout.splitlines()
+            if not registered:
+                added = subprocess.run(
+                    _SUDO + ["git", "config", "--global", "--add", "safe.directory", instance_dir],
+                    capture_output=True,
+                    text=True,
+                    timeout=4
+                )
+                registered = added.returncode == 0
+        except Exception:
+            return
+        if registered:
+            with self.GIT_LOCK:
+                self.GIT_SAFE_DIRS.add(instance_dir)
 
-        return result
+    def _get_default_branch(self, instance_dir):
+        ref = self._git_run(instance_dir, ["symbolic-ref", "--quiet", "refs/remotes/origin/HEAD"])
+        if ref and ref.startswith("refs/remotes/origin/"):
+            return ref.split("/", 3)[-1]
+        if self._git_run(instance_dir, ["show-ref", "--verify", "--quiet", "refs/remotes/origin/main"]) is not None:
+            return "main"
+        if self._git_run(instance_dir, ["show-ref", "--verify", "--quiet", "refs/remotes/origin/master"]) is not None:
+            return "master"
+        return "main"
 
-    def _reset_admin_user(self, instance, broker_creds=None):
-        """Delete all rows from the users and auth tables via oa-reset-admin.sh,
-        forcing the instance back into first-time admin setup and requiring a
-        fresh broker login. Use when a user forgot their password and has no
-        TOTP/QR reset or working SMTP configured.
+    def _maybe_fetch_origin(self, instance_dir):
+        """Start a background `git fetch` at most once per GIT_FETCH_TTL.
 
-        broker_creds, if given, is a dict that may contain broker (the new
-        broker short name, used to update REDIRECT_URL), broker_api_key,
-        broker_api_secret, broker_api_key_market, broker_api_secret_market —
-        these are also written into the instance's .env file."""
-        inst_path = f"/var/python/openalgo-flask/{instance}"
-        result = {
-            "instance": instance,
-            "reset": False,
-            "error": None,
-            "output": "",
-            "exit_code": None,
-        }
+        The fetch only feeds the next poll's ahead/behind numbers, so the health
+        request no longer waits up to 15 s on the network for it. Every health
+        call polls the kept Popen, so a finished fetch is reaped straight away
+        rather than left as a zombie until the next round; a fetch still
+        hanging when the next round is due is stopped.
+        """
+        with self.GIT_LOCK:
+            cached = self.GIT_FETCH_CACHE.get(instance_dir, {})
+            proc = cached.get("proc")
+            if proc is not None and proc.poll() is not None:
+                cached["proc"] = proc = None
+            last_ts = cached.get("ts", 0)
+            if time.time() - last_ts < self.GIT_FETCH_TTL:
+                return
+            if proc is not None:
+                proc.terminate()
+                try:
+                    proc.wait(timeout=5)
+                except subprocess.TimeoutExpired:
+                    proc.kill()
+                    proc.wait()
+            try:
+                proc = subprocess.Popen(
+                    _SUDO + ["git", "fetch", "--prune", "origin"],
+                    cwd=instance_dir,
+                    stdin=subprocess.DEVNULL,
+                    stdout=subprocess.DEVNULL,
+                    stderr=subprocess.DEVNULL,
+                    start_new_session=True,
+                )
+            except Exception:
+                proc = None
+            self.GIT_FETCH_CACHE[instance_dir] = {"ts": time.time(), "proc": proc}
 
-        if not os.path.isdir(inst_path):
-            result["error"] = "Instance not found"
-            return result
-        script_path = self._find_script("oa-reset-admin.sh")
-        if not script_path:
-            result["error"] = "oa-reset-admin.sh not found"
-            return result
+    def _git_commit_info(self, instance_dir, ref):
+        """(short hash, ISO commit date) of `ref` from a single git process."""
+        out = self._git_run(instance_dir, ["log", "-1", "--format=%h%x00%cd", "--date=iso", ref])
+        if not out or "\0" not in out:
+            return None, None
+        commit, date = out.split("\0", 1)
+        return commit or None, date or None
 
-        command = ["sudo", "bash", script_path, "--instance", instance, "--force"]
-        cred_flags = {
-            "broker": "--broker",
-            "broker_api_key": "--broker-api-key",
-            "broker_api_secret": "--broker-api-secret",
-            "broker_api_key_market": "--broker-api-key-market",
-            "broker_api_secret_market": "--broker-api-secret-market",
+    def _get_git_info(self, instance):
+        instance_dir = f"/var/python/openalgo-flask/{instance}"
+        if not os.path.isdir(os.path.join(instance_dir, ".git")):
+            return None
+
+        self._ensure_git_safe(instance_dir)
+        self._maybe_fetch_origin(instance_dir)
+
+        branch = self._get_default_branch(instance_dir)
+        current_commit, current_date = self._git_commit_info(instance_dir, "HEAD")
+        latest_commit, latest_date = self._git_commit_info(instance_dir, f"origin/{branch}")
+        ahead_behind = self._git_run(instance_dir, ["rev-list", "--left-right", "--count", f"HEAD...origin/{branch}"])
+        ahead = behind = None
+        if ahead_behind and " " in ahead_behind:
+            ahead_str, behind_str = ahead_behind.split(" ", 1)
+            try:
+                ahead = int(ahead_str)
+                behind = int(behind_str)
+            except Exception:
+                ahead = behind = None
+
+        return {
+            "branch": branch,
+            "current_commit": current_commit,
+            "current_date": current_date,
+            "latest_commit": latest_commit,
+            "latest_date": latest_date,
+            "ahead": ahead,
+            "behind": behind,
         }
-        for key, flag in cred_flags.items():
-            value = (broker_creds or {}).get(key, "")
-            if isinstance(value, str) and value.strip():
-                command.extend([flag, value.strip()])
 
+    def _list_db_files(self, instance):
+        inst_path = f"/var/python/openalgo-flask/{instance}"
+        db_dir = f"{inst_path}/db"
+        files = []
+        if os.path.isdir(db_dir):
+            for entry in os.scandir(db_dir):
+                if entry.is_file() and entry.name.endswith(".db"):
+                    files.append(entry.name)
+        return sorted(files)
+
+    def _is_safe_select(self, query):
+        if not query:
+            return False
+        if len(query) > 1000:
+            return False
+        q = query.strip()
+        if not q.lower().startswith("select"):
+            return False
+        if ";" in q.rstrip(";"):
+            return False
+        lowered = q.lower()
+        if _WRITE_SQL_RE.search(lowered):
+            return False
+        return True
+
+    def _list_instances(self):
+        # Every dashboard poll lists the instances, but they only change when one
+        # is installed or removed - and either bumps the base directory's mtime,
+        # so one stat() decides whether the cached scan is still good.
         try:
-            proc = subprocess.run(
-                command,
-                cwd=inst_path,
-                capture_output=True,
-                text=True,
-                timeout=60,
-            )
-            result["exit_code"] = proc.returncode
-            result["output"] = (proc.stdout or "") + (("\n" + proc.stderr) if proc.stderr else "")
-            if proc.returncode == 0:
-                result["reset"] = True
-            else:
-                result["error"] = f"Script failed (exit {proc.returncode})"
-        except Exception as e:
-            result["error"] = str(e)
+            key = os.stat("/var/python/openalgo-flask").st_mtime_ns
+        except OSError:
+            return []
+        with self.INSTANCES_LOCK:
+            cached = self.INSTANCES_CACHE
+            if cached and cached["key"] == key:
+                return list(cached["instances"])
+        instances = self._scan_instances()
+        with self.INSTANCES_LOCK:
+            self.INSTANCES_CACHE.update(key=key, instances=instances)
+        return list(instances)
+
+    def _scan_instances(self):
+        instances = []
+        try:
+            with os.scandir("/var/python/openalgo-flask") as entries:
+                for entry in entries:
+                    # Name first: it is free, while is_dir() may need an lstat()
+                    # on filesystems that don't report d_type.
+                    if _INSTANCE_RE.match(entry.name) and entry.is_dir(follow_symlinks=False):
+                        instances.append(entry.name)
+        except FileNotFoundError:
+            return []
+        return sorted(instances)
 
-        return result
+    def _prune_jobs_locked(self):
+        # Jobs are only ever added by _create_job, so dict order is creation
+        # order and the oldest job is always first.
+        while len(self.JOBS) > self.JOB_LIMIT:
+            del self.JOBS[next(iter(self.JOBS))]
 
-    def _read_auth_status(self, instance):
-        db_file = self._get_auth_db_file(instance)
-        if not db_file:
-            return False, "User Not Setup", None, None
-        try:
-            conn = sqlite3.connect(db_file)
-            cur = conn.cursor()
-            cur.execute("SELECT is_revoked, broker, name FROM auth LIMIT 1")
-            row = cur.fetchone()
-            conn.close()
-            if not row:
-                return False, "User Not Setup", None, None
-            is_revoked, broker, name = row
-            if is_revoked in (1, "1", True):
-                return False, "User Not Authenticated: Token Revoked", broker, name
-            return True, "User Authenticated", broker, name
-        except Exception as e:
-            return False, f"Auth check failed: {e}", None, None
-    def _service_name(self, instance):
-        """Map instance directory to systemd service name.
+    def _create_job(self, action, params):
+        job_id = uuid.uuid4().hex[:12]
+        job = {
+            "id": job_id,
+            "action": action,
+            "params": params,
+            "status": "queued",
+            "created_at": self._now_iso(),
+            "created_ts": time.time(),
+            "started_at": None,
+            "finished_at": None,
+            "exit_code": None,
+            "output": "",
+            "error": None,
+        }
+        with self.JOBS_LOCK:
+            self.JOBS[job_id] = job
+            self._prune_jobs_locked()
+        return job_id
 
-        Raises ValueError on anything that isn't a real instance name. This is the
-        single choke point every systemctl/journalctl call routes through, so
-        validating here covers all callers instead of each one remembering to.
+    def _submit_restart(self, key, action, params, target, *args):
+        """Queue target(job_id, *args) on the restart pool.
+
+        Returns (job_id, None) once queued, or (None, running_job_id) when a
+        restart for the same key is still in flight - a second `systemctl
+        restart` of a unit that is already restarting only races the first.
         """
-        instance = self._sanitize_instance(instance)
-        if not instance:
-            raise ValueError("Invalid instance name")
-        env_file = f"/var/python/openalgo-flask/{instance}/.env"
-        domain = None
-        if os.path.exists(env_file):
-            with open(env_file, 'r') as f:
-                for line in f:
-                    m = re.match(r"^DOMAIN\s*=\s*(.+)", line)
-                    if m:
-                        domain = m.group(1).strip().strip("'\"")
-                        break
-        name = f"openalgo-{domain.replace('.', '-')}" if domain else instance
-        # DOMAIN comes out of a file on disk, so don't trust it blindly either.
-        if not re.match(r"^[A-Za-z0-9@_.-]+$", name):
-            raise ValueError("Invalid service name")
-        return name
+        with self.RESTART_LOCK:
+            running = self.RESTARTS_INFLIGHT.get(key)
+            if running:
+                return None, running
+            job_id = self._create_job(action, params)
+            self.RESTARTS_INFLIGHT[key] = job_id
+
+        def run():
+            try:
+                target(job_id, *args)
+            finally:
+                with self.RESTART_LOCK:
+                    self.RESTARTS_INFLIGHT.pop(key, None)
 
-    def _sanitize_instance(self, instance):
-        if not instance:
-            return None
-        instance = instance.strip()
-        import re
-        if re.match(r"^openalgo\d+$", instance):
-            return instance
-        if re.match(r"^openalgo-[A-Za-z0-9-]+$", instance):
-            return instance
-        if re.match(r"^[A-Za-z0-9.-]+$", instance):
-            candidate = f"openalgo-{instance.replace('.', '-')}"
-            if os.path.isdir(f"/var/python/openalgo-flask/{candidate}"):
-                return candidate
-        return None
+        self.RESTART_EXECUTOR.submit(run)
+        return job_id, None
 
-    def _resolve_instance_from_host(self):
-        host = self.headers.get("Host", "")
-        host = host.split(":", 1)[0].strip()
-        if not host:
-            return None
-        import re
-        if not re.match(r"^[A-Za-z0-9.-]+$", host):
-            return None
-        candidate = f"/var/python/openalgo-flask/openalgo-{host.replace('.', '-')}"
-        if os.path.exists(candidate):
-            return self._sanitize_instance(os.path.basename(candidate))
-        return None
+    def _update_job(self, job_id, **updates):
+        with self.JOBS_LOCK:
+            job = self.JOBS.get(job_id)
+            if not job:
+                return None
+            job.update(updates)
+            return job
 
-    def _resolve_monitor_instance(self):
-        instance = self._sanitize_instance(self.headers.get("X-OpenAlgo-Instance"))
-        if instance:
-            return instance
-        parsed = urlparse(self.path)
-        params = parse_qs(parsed.query)
-        instance = self._sanitize_instance(params.get("instance", [None])[0])
-        if instance:
-            return instance
-        return self._resolve_instance_from_host()
+    def _get_job(self, job_id):
+        with self.JOBS_LOCK:
+            job = self.JOBS.get(job_id)
+            return dict(job) if job else None
 
-    def _instance_arg(self, raw):
-        """Validate an instance name supplied by an API caller.
+    def _read_output_tail(self, spool, limit=200000):
+        """Decode the last `limit` bytes written to a job's output spool."""
+        size = spool.seek(0, os.SEEK_END)
+        spool.seek(max(0, size - limit))
+        text = spool.read().decode("utf-8", "replace")
+        if size > limit:
+            text = "(Output truncated)\n...\n" + text
+        return text
+
+    def _run_script_job(self, job_id, command, timeout=900):
+        """Run an oa-*.sh job, keeping only the tail of what it prints.
 
-        Returns the sanitized name, or None after sending a 400. Every /api/* path
-        that takes an instance goes through this - unvalidated names reach both
-        subprocess calls and filesystem paths.
+        Output goes to temp files on disk rather than pipes, so a script that
+        logs megabytes costs no memory while it runs, and only the last 200 KB
+        of each stream is ever read back.
         """
-        if not raw:
-            self.send_json({"error": "Missing instance parameter"}, 400)
-            return None
-        instance = self._sanitize_instance(raw)
-        if not instance:
-            self.send_json({"error": "Invalid instance name", "instance": raw}, 400)
-            return None
-        return instance
+        self._update_job(job_id, status="running", started_at=self._now_iso())
+        try:
+            # Popen needs a real fd, so a SpooledTemporaryFile would be rolled
+            # over to disk at once anyway.
+            with tempfile.TemporaryFile() as out, tempfile.TemporaryFile() as err:
+                proc = subprocess.Popen(command, stdout=out, stderr=err)
+                try:
+                    returncode = proc.wait(timeout=timeout)
+                except subprocess.TimeoutExpired:
+                    proc.kill()
+                    proc.wait()
+                    returncode = None
+                stdout = self._read_output_tail(out)
+                stderr = self._read_output_tail(err)
+            output = self._strip_ansi(stdout + ("\n" + stderr if stderr else ""))
+            if returncode is None:
+                self._update_job(
+                    job_id,
+                    status="timeout",
+                    exit_code=None,
+                    output=output.strip(),
+                    error="Command timed out",
+                    finished_at=self._now_iso()
+                )
+                return
+            self._update_job(
+                job_id,
+                status="success" if returncode == 0 else "error",
+                exit_code=returncode,
+                output=output.strip(),
+                finished_at=self._now_iso()
+            )
+        except Exception as e:
+            self._update_job(
+                job_id,
+                status="error",
+                exit_code=None,
+                error=str(e),
+                finished_at=self._now_iso()
+            )
 
-    def _require_monitor_instance(self):
-        instance = self._resolve_monitor_instance()
-        if not instance:
-            self.send_json({"error": "Instance not specified"}, 400)
-            return None
-        return instance
+    def _db_conn(self, db_file):
+        """Return (connection, lock) for a shared read-only handle on db_file.
 
-    def _get_session_token(self):
-        cookie_header = self.headers.get('Cookie', '')
-        for part in cookie_header.split(';'):
-            part = part.strip()
-            if part.startswith(SESSION_COOKIE + '='):
-                return part.split('=', 1)[1]
-        return None
+        Health polls hit every instance's database several times; reusing one
+        open connection skips the open + schema load each time. The handle is
+        keyed on the file's inode, so a database that is recreated (reinstall,
+        restore from backup) gets a fresh connection rather than the old file.
+        """
+        st = os.stat(db_file)
+        key = (st.st_dev, st.st_ino)
+        with self.DB_CONNS_LOCK:
+            cached = self.DB_CONNS.get(db_file)
+            if cached and cached[0] == key:
+                return cached[1], cached[2]
+            stale = [cached] if cached else []
+            # Opening a new handle is rare, so it is also when handles on files
+            # that have gone (removed instance, dropped database) are let go.
+            for path in [p for p in self.DB_CONNS if p != db_file and not os.path.exists(p)]:
+                stale.append(self.DB_CONNS.pop(path))
+                self.DB_TABLES.pop(path, None)
+            conn = sqlite3.connect(f"file:{quote(db_file)}?mode=ro", uri=True,
+                                   check_same_thread=False, timeout=2)
+            # mode=ro only covers the main file; query_only also refuses writes
+            # to anything attached later. The page cache stays at sqlite's
+            # default (~2 MB) since one connection is kept per database.
+            conn.execute("PRAGMA query_only=1")
+            lock = Lock()
+            self.DB_CONNS[db_file] = (key, conn, lock)
+        for _, old_conn, old_lock in stale:
+            with old_lock:
+                old_conn.close()
+        return conn, lock
+
+    def _db_query(self, db_file, sql, params=()):
+        """Run a read-only query on the shared connection and return all rows."""
+        conn, lock = self._db_conn(db_file)
+        try:
+            with lock:
+                return conn.execute(sql, params).fetchall()
+        except sqlite3.Error:
+            # A broken handle must not be served to the next poll as well.
+            with self.DB_CONNS_LOCK:
+                if self.DB_CONNS.get(db_file, (None, None))[1] is conn:
+                    del self.DB_CONNS[db_file]
+            with lock:
+                conn.close()
+            raise
 
-    def _is_authenticated(self):
-        token = self._get_session_token()
-        if not token:
+    def _db_has_table(self, db_file, table_name):
+        # The table names are read once per connection and schema version.
+        # schema_version comes from the file header, so a table created by a
+        # later migration (e.g. auth on first login) is still picked up.
+        try:
+            conn, _ = self._db_conn(db_file)
+            version = self._db_query(db_file, "PRAGMA schema_version")[0][0]
+            cached = self.DB_TABLES.get(db_file)
+            if not cached or cached[0] is not conn or cached[1] != version:
+                rows = self._db_query(db_file, "SELECT name FROM sqlite_master WHERE type='table'")
+                cached = (conn, version, frozenset(row[0] for row in rows))
+                self.DB_TABLES[db_file] = cached
+            return table_name in cached[2]
+        except Exception:
             return False
-        return touch_session(token)
 
-    def _login_prefix(self, path):
-        """nginx only proxies /monitor* to this process for per-instance domains,
-        so the login page must live under the same prefix the request arrived on."""
-        return '/monitor' if path.startswith('/monitor') else ''
+    def _get_db_file_with_table(self, instance, table_name):
+        """Path of the instance database that holds `table_name`, or None.
 
-    def _redirect_to_login(self, path):
-        prefix = self._login_prefix(path)
-        target = f"{prefix}/login?next={quote(path, safe='')}"
-        self.send_response(302)
-        self.send_header('Location', target)
-        self.send_header('Content-Length', '0')
-        self.end_headers()
+        Finding it can mean opening every .db in the instance, so the answer is
+        kept for DB_PATH_TTL seconds. A cached path that has since disappeared
+        (reinstall, restore) is resolved again straight away.
+        """
+        key = (instance, table_name)
+        now = time.time()
+        with self.DB_PATH_LOCK:
+            cached = self.DB_PATH_CACHE.get(key)
+        if (cached and now - cached[0] < self.DB_PATH_TTL
+                and (cached[1] is None or os.path.exists(cached[1]))):
+            return cached[1]
+        path = self._find_db_file_with_table(instance, table_name)
+        with self.DB_PATH_LOCK:
+            self.DB_PATH_CACHE[key] = (now, path)
+        return path
+
+    def _find_db_file_with_table(self, instance, table_name):
+        inst_path = f"/var/python/openalgo-flask/{instance}"
+        instance_num = instance.replace('openalgo', '')
+        db_dir = f"{inst_path}/db"
+        candidates = []
 
-    def serve_login_page(self, path, error=False):
-        parsed = urlparse(self.path)
-        params = parse_qs(parsed.query)
-        prefix = self._login_prefix(path)
-        default_next = prefix if prefix else '/'
-        next_path = params.get('next', [default_next])[0]
-        if not next_path.startswith('/'):
-            next_path = default_next
-        action = f"{prefix}/login-submit"
-        error_html = '<div class="login-error">Invalid username or password.</div>' if error else ''
-        html = ("""<!DOCTYPE html>
-<html>
-<head>
-<meta charset="UTF-8">
-<meta name="viewport" content="width=device-width, initial-scale=1">
-<title>OpenAlgo Admin Login</title>
-<style>""" + DASHBOARD_CSS + """
-body{display:flex;align-items:center;justify-content:center}
-.login-card{width:100%;max-width:360px;padding:28px}
-.login-card h1{font-size:16px;font-weight:650;margin-bottom:4px;display:flex;align-items:center;gap:8px}
-.login-card h1 svg{color:var(--accent)}
-.login-card p.sub{font-size:12.5px;color:var(--text-dim);margin-bottom:20px}
-.login-error{background:var(--danger-soft);color:var(--danger);border:1px solid rgba(244,88,110,.35);border-radius:var(--radius-sm);padding:9px 12px;font-size:12.5px;margin-bottom:14px}
-.login-card form{display:flex;flex-direction:column;gap:12px}
-.login-card button{margin-top:4px}
-</style>
-</head>
-<body>
-<div class="card login-card">
-<h1><svg width="18" height="18" viewBox="0 0 24 24" fill="none" stroke="currentColor" stroke-width="2" stroke-linecap="round" stroke-linejoin="round"><path d="M3 12h4l3 8 4-16 3 8h4"/></svg>OpenAlgo Admin</h1>
-<p class="sub">Sign in to continue</p>
-""" + error_html + """
-<form method="POST" action=\"""" + _esc_attr(action) + """\">
-<div>
-<label class="reset-field-label">Username</label>
-<input class="reset-input" type="text" name="username" autocomplete="username" autofocus required>
-</div>
-<div>
-<label class="reset-field-label">Password</label>
-<input class="reset-input" type="password" name="password" autocomplete="current-password" required>
-</div>
-<input type="hidden" name="next" value=\"""" + _esc_attr(next_path) + """\">
-<button type="submit" class="btn btn-accent">Sign in</button>
-</form>
-</div>
-</body>
-</html>""")
-        html_bytes = html.encode('utf-8')
-        self.send_response(200)
-        self.send_header('Content-Type', 'text/html; charset=utf-8')
-        self.send_header('Cache-Control', 'no-store, no-cache, must-revalidate')
-        self.send_header('Content-Length', len(html_bytes))
-        self.end_headers()
-        self.wfile.write(html_bytes)
+        if instance_num.isdigit():
+            candidates.append(f"{db_dir}/openalgo{instance_num}.db")
+        candidates.append(f"{db_dir}/openalgo.db")
+        if table_name == "auth":
+            candidates.append(f"{db_dir}/auth.db")
+
+        for path in candidates:
+            if os.path.exists(path) and self._db_has_table(path, table_name):
+                return path
+
+        if os.path.isdir(db_dir):
+            for entry in os.scandir(db_dir):
+                if entry.is_file() and entry.name.endswith(".db"):
+                    if self._db_has_table(entry.path, table_name):
+                        return entry.path
+        return None
 
-    def handle_login_submit(self, path, body):
-        prefix = self._login_prefix(path)
-        fields = parse_qs(body)
-        username = fields.get('username', [''])[0]
-        password = fields.get('password', [''])[0]
-        next_path = fields.get('next', [prefix if prefix else '/'])[0]
-        if not next_path.startswith('/'):
-            next_path = prefix if prefix else '/'
+    def _get_auth_db_file(self, instance):
+        return self._get_db_file_with_table(instance, "auth")
 
-        creds = load_credentials()
-        ok = bool(creds) and username == creds.get('username') and verify_password(password, creds.get('hash', ''))
-        if not ok:
-            self.serve_login_page(path, error=True)
-            return
+    def _parse_db_datetime(self, value):
+        if value is None:
+            return None
+        if isinstance(value, datetime):
+            return value
+        value = str(value).strip()
+        # SQLAlchemy stores "YYYY-MM-DD HH:MM:SS[.ffffff]", which fromisoformat
+        # parses in C; strptime is kept for the odd fraction widths that older
+        # Pythons' fromisoformat rejects.
+        try:
+            return datetime.fromisoformat(value)
+        except ValueError:
+            pass
+        for fmt in ("%Y-%m-%d %H:%M:%S.%f", "%Y-%m-%d %H:%M:%S"):
+            try:
+                return datetime.strptime(value, fmt)
+            except ValueError:
+                continue
+        return None
 
-        token = create_session()
-        self.send_response(302)
-        self.send_header('Location', next_path)
-        cookie = f"{SESSION_COOKIE}={token}; HttpOnly; Path=/; Max-Age={SESSION_TTL_SECONDS}; SameSite=Lax"
-        if self.headers.get('X-Forwarded-Proto', '').lower() == 'https':
-            cookie += '; Secure'
-        self.send_header('Set-Cookie', cookie)
-        self.send_header('Content-Length', '0')
-        self.end_headers()
+    def _ist_now(self):
+        return datetime.now(_IST).replace(tzinfo=None)
 
-    def handle_logout(self, path):
-        token = self._get_session_token()
-        if token:
-            destroy_session(token)
-        prefix = self._login_prefix(path)
-        self.send_response(302)
-        self.send_header('Location', f"{prefix}/login")
-        self.send_header('Set-Cookie', f"{SESSION_COOKIE}=; HttpOnly; Path=/; Max-Age=0; SameSite=Lax")
-        self.send_header('Content-Length', '0')
-        self.end_headers()
-    
-    def do_GET(self):
-        """Handle GET requests"""
-        path = urlparse(self.path).path
-        if path in ('/login', '/monitor/login'):
-            self.serve_login_page(path)
-            return
-        if path in ('/logout', '/monitor/logout'):
-            self.handle_logout(path)
-            return
-        if path != '/health' and not self._is_authenticated():
-            if path in ('/', '/index.html', '/monitor', '/monitor/'):
-                self._redirect_to_login(path)
-            else:
-                self.send_json({"error": "Authentication required"}, 401)
-            return
-        if path == '/monitor' or path == '/monitor/':
-            self.serve_monitor_ui()
-        elif path == '/monitor/api/health':
-            self.handle_monitor_health()
-        elif path == '/monitor/api/logs':
-            self.handle_monitor_logs()
-        elif path == '/monitor/api/status':
-            self.handle_monitor_status()
-        elif path == '/monitor/api/scripts-status':
-            self.handle_scripts_status()
-        elif path.startswith('/monitor/api/jobs/'):
-            job_id = path.split('/monitor/api/jobs/')[1].strip('/')
-            if job_id:
-                self.handle_job_status(job_id)
-            else:
-                self.send_json({"error": "Missing job id"}, 400)
-        elif self.path == '/' or self.path == '/index.html':
-            self.serve_web_ui()
-        elif self.path == '/api/instances':
-            self.handle_instances()
-        elif self.path == '/api/status':
-            self.handle_status()
-        elif self.path == '/api/health':
-            self.handle_instances_health()
-        elif self.path == '/health':
-            self.handle_health()
-        elif self.path.startswith('/api/logs/'):
-            instance = self._instance_arg(self.path.split('/api/logs/')[1].strip('/'))
-            if instance:
-                self.handle_instance_logs(instance)
-        elif self.path.startswith('/api/broker-status/'):
-            instance = self._instance_arg(self.path.split('/api/broker-status/')[1].strip('/'))
-            if instance:
-                self.handle_broker_status(instance)
-        elif self.path == '/api/scripts-status':
-            self.handle_scripts_status()
-        elif self.path.startswith('/api/terminal/dbs'):
-            self.handle_terminal_dbs()
-        elif self.path.startswith('/api/jobs/'):
-            job_id = self.path.split('/api/jobs/')[1].strip('/')
-            if job_id:
-                self.handle_job_status(job_id)
-            else:
-                self.send_json({"error": "Missing job id"}, 400)
-        else:
-            self.send_json({"error": "Not found"}, 404)
-    
-    def do_POST(self):
-        """Handle POST requests"""
-        path = urlparse(self.path).path
-        content_length = int(self.headers.get('Content-Length', 0))
-        body = self.rfile.read(content_length).decode('utf-8') if content_length > 0 else ''
+    def _ist_window_start(self, now_ist):
+        window_start = now_ist.replace(hour=3, minute=0, second=0, microsecond=0)
+        if now_ist < window_start:
+            window_start -= timedelta(days=1)
+        return window_start
 
-        if path in ('/login-submit', '/monitor/login-submit'):
-            self.handle_login_submit(path, body)
-            return
+    def _ist_window(self):
+        """(start, end) of the current 03:00 IST master-contract day.
 
-        if not self._is_authenticated():
-            self.send_json({"error": "Authentication required"}, 401)
-            return
+        It only moves once a day, so a health sweep over every instance reuses
+        one computed window instead of rebuilding it per instance.
+        """
+        now_ist = self._ist_now()
+        cached = RestartHandler.IST_WINDOW_CACHE
+        if cached and cached[0] <= now_ist < cached[1]:
+            return cached
+        window_start = self._ist_window_start(now_ist)
+        cached = (window_start, window_start + timedelta(days=1))
+        RestartHandler.IST_WINDOW_CACHE = cached
+        return cached
 
+    def _read_cpu_times(self):
         try:
-            data = json.loads(body) if body else {}
-        except:
-            self.send_json({"error": "Invalid JSON"}, 400)
-            return
+            with open("/proc/stat", "r") as f:
+                line = f.readline()
+            parts = line.split()
+            if len(parts) < 5 or parts[0] != "cpu":
+                return None, None
+            values = [int(p) for p in parts[1:]]
+            total = sum(values)
+            idle = values[3] + (values[4] if len(values) > 4 else 0)
+            return total, idle
+        except Exception:
+            return None, None
+
+    def _get_cpu_percent(self):
+        """CPU busy % since the previous sample.
+
+        Health polls arrive every few seconds, so the sample left by the last
+        call serves as the baseline and no sleep is needed. Only a cold or
+        stale (> CPU_SAMPLE_MAX_AGE) baseline costs a 0.1 s wait for a fresh
+        one; calls closer together than that reuse the last figure.
+        """
+        total1, idle1, sampled_at, percent = self.CPU_SAMPLE
+        age = time.monotonic() - sampled_at
+        if total1 is not None and age < 0.1:
+            return percent
+        if total1 is None or age > self.CPU_SAMPLE_MAX_AGE:
+            total1, idle1 = self._read_cpu_times()
+            time.sleep(0.1)
+        total2, idle2 = self._read_cpu_times()
+        percent = None
+        if total1 is not None and total2 is not None:
+            total_delta = total2 - total1
+            idle_delta = idle2 - idle1
+            if total_delta > 0:
+                percent = round(100.0 * (1.0 - (idle_delta / total_delta)), 1)
+        RestartHandler.CPU_SAMPLE = (total2, idle2, time.monotonic(), percent)
+        return percent
+
+    def _get_system_stats(self):
+        stats = {
+            "cpu_percent": None,
+            "load1": None,
+            "load5": None,
+            "load15": None,
+            "mem_total": None,
+            "mem_used": None,
+            "mem_available": None,
+            "mem_percent": None,
+            "swap_total": None,
+            "swap_used": None,
+            "swap_percent": None,
+            "disk_total": None,
+            "disk_used": None,
+            "disk_free": None,
+            "disk_percent": None,
+        }
+
+        stats["cpu_percent"] = self._get_cpu_percent()
 
-        if path == '/monitor/api/restart':
-            instance = self._require_monitor_instance()
-            if instance:
-                self.handle_restart_instance(instance)
-        elif path == '/monitor/api/stop':
-            instance = self._require_monitor_instance()
-            if instance:
-                self.handle_stop_instance(instance)
-        elif path == '/monitor/api/start':
-            instance = self._require_monitor_instance()
-            if instance:
-                self.handle_start_instance(instance)
-        elif path == '/monitor/api/clear-logs':
-            instance = self._require_monitor_instance()
-            if instance:
-                self.handle_clear_logs_instance(instance)
-        elif path == '/monitor/api/invalidate-session':
-            instance = self._require_monitor_instance()
-            if instance:
-                self.handle_invalidate_session(instance)
-        elif path == '/monitor/api/reset-admin-user':
-            instance = self._require_monitor_instance()
-            if instance:
-                self.handle_reset_admin_user(instance, data)
-        elif path == '/monitor/api/reboot-server':
-            self.handle_reboot_server()
-        elif path == '/monitor/api/health-check':
-            self.handle_health_check(data)
-        elif path == '/monitor/api/update':
-            self.handle_update(data)
-        elif path == '/monitor/api/change-password':
-            self.handle_change_password(data)
-        elif path == '/api/change-password':
-            self.handle_change_password(data)
-        elif path == '/api/invalidate-session':
-            instance = data.get('instance', '')
-            if instance:
-                self.handle_invalidate_session(instance)
-            else:
-                self.send_json({"error": "Missing instance parameter"}, 400)
-        elif path == '/api/reset-admin-user':
-            instance = self._instance_arg(data.get('instance', ''))
-            if instance:
-                self.handle_reset_admin_user(instance, data)
-        elif self.path == '/api/restart-all':
-            self.handle_restart_all()
-        elif self.path == '/api/restart-instance':
-            instance = self._instance_arg(data.get('instance', ''))
-            if instance:
-                self.handle_restart_instance(instance)
-        elif self.path == '/api/stop-instance':
-            instance = self._instance_arg(data.get('instance', ''))
-            if instance:
-                self.handle_stop_instance(instance)
-        elif self.path == '/api/start-instance':
-            instance = self._instance_arg(data.get('instance', ''))
-            if instance:
-                self.handle_start_instance(instance)
-        elif self.path == '/api/reboot-server':
-            self.handle_reboot_server()
-        elif self.path == '/api/health-check':
-            self.handle_health_check(data)
-        elif self.path == '/api/update':
-            self.handle_update(data)
-        elif self.path == '/api/scripts-status':
-            self.handle_scripts_status()
-        elif self.path == '/api/terminal/run':
-            self.handle_terminal_run(data)
-        else:
-            self.send_json({"error": "Not found"}, 404)
-    
-    def handle_instances(self):
-        """Get list of instances"""
         try:
-            base_dir = "/var/python/openalgo-flask"
-            instances = []
-            if os.path.isdir(base_dir):
-                for entry in os.scandir(base_dir):
-                    if entry.is_dir(follow_symlinks=False) and entry.name.startswith("openalgo"):
-                        suffix = entry.name[8:]
-                        if suffix.isdigit() or (suffix.startswith("-") and suffix[1:] and all(ch.isalnum() or ch == "-" for ch in suffix[1:])):
-                            instances.append(entry.name)
-            self.send_json(sorted(instances))
-        except Exception as e:
-            self.send_json({"error": str(e)}, 500)
-    
-    def handle_status(self):
-        """Get status of all instances"""
+            load1, load5, load15 = os.getloadavg()
+            stats["load1"] = round(load1, 2)
+            stats["load5"] = round(load5, 2)
+            stats["load15"] = round(load15, 2)
+        except Exception:
+            pass
+
         try:
-            base_dir = "/var/python/openalgo-flask"
-            instances = []
-            if os.path.isdir(base_dir):
-                for entry in os.scandir(base_dir):
-                    if entry.is_dir(follow_symlinks=False) and entry.name.startswith("openalgo"):
-                        suffix = entry.name[8:]
-                        if suffix.isdigit() or (suffix.startswith("-") and suffix[1:] and all(ch.isalnum() or ch == "-" for ch in suffix[1:])):
-                            instances.append(entry.name)
-            
-            status = {"total": len(instances), "instances": {}, "timestamp": str(datetime.now())}
-            
-            for inst in instances:
-                try:
-                    service_name = self._service_name(inst)
-                    result = subprocess.run(
-                        ["systemctl", "is-active", service_name],
-                        capture_output=True, text=True, timeout=2
-                    )
-                    status["instances"][inst] = result.stdout.strip()
-                except:
-                    status["instances"][inst] = "unknown"
-            
-            self.send_json(status)
-        except Exception as e:
-            self.send_json({"error": str(e)}, 500)
-    
-    def handle_instances_health(self):
-        """Get detailed health status of all instances"""
+            with open("/proc/meminfo", "rb") as f:
+                data = f.read()
+            meminfo = {key.decode(): int(val) * 1024 for key, val in _MEMINFO_RE.findall(data)}
+            mem_total = meminfo.get("MemTotal")
+            mem_available = meminfo.get("MemAvailable")
+            if mem_total is not None and mem_available is not None:
+                mem_used = mem_total - mem_available
+                stats["mem_total"] = mem_total
+                stats["mem_available"] = mem_available
+                stats["mem_used"] = mem_used
+                stats["mem_percent"] = round(100.0 * mem_used / mem_total, 1)
+
+            swap_total = meminfo.get("SwapTotal")
+            swap_free = meminfo.get("SwapFree")
+            if swap_total is not None and swap_free is not None and swap_total > 0:
+                swap_used = swap_total - swap_free
+                stats["swap_total"] = swap_total
+                stats["swap_used"] = swap_used
+                stats["swap_percent"] = round(100.0 * swap_used / swap_total, 1)
+            elif swap_total is not None:
+                stats["swap_total"] = swap_total
+                stats["swap_used"] = 0
+                stats["swap_percent"] = 0.0
+        except Exception:
+            pass
+
         try:
-            base_dir = "/var/python/openalgo-flask"
-            instances = []
-            if os.path.isdir(base_dir):
-                for entry in os.scandir(base_dir):
-                    if entry.is_dir(follow_symlinks=False) and entry.name.startswith("openalgo"):
-                        suffix = entry.name[8:]
-                        if suffix.isdigit() or (suffix.startswith("-") and suffix[1:] and all(ch.isalnum() or ch == "-" for ch in suffix[1:])):
-                            instances.append(entry.name)
-            
-            health = {"total": len(instances), "instances": {}, "timestamp": str(datetime.now())}
-            
-            for inst in instances:
-                health["instances"][inst] = self._get_instance_health(inst)
+            stat = os.statvfs("/")
+            total = stat.f_frsize * stat.f_blocks
+            free = stat.f_frsize * stat.f_bavail
+            used = total - free
+            if total > 0:
+                stats["disk_total"] = total
+                stats["disk_free"] = free
+                stats["disk_used"] = used
+                stats["disk_percent"] = round(100.0 * used / total, 1)
+        except Exception:
+            pass
 
-            try:
-                health["system"] = self._get_system_stats()
-            except Exception:
-                health["system"] = None
-            health["access"] = get_access_info()
+        return stats
 
-            self.send_json(health)
-        except Exception as e:
-            self.send_json({"error": str(e)}, 500)
+    def _get_master_contract_status(self, instance):
+        db_file = self._get_db_file_with_table(instance, "master_contract_status")
+        if not db_file:
+            return {
+                "is_ready": False,
+                "status": "Master Contract Data Not Ready",
+                "last_updated": None,
+                "total_symbols": None,
+                "message": None,
+                "broker": None,
+            }
 
-    def handle_monitor_health(self):
-        """Get detailed health status for the monitor instance"""
-        instance = self._require_monitor_instance()
-        if not instance:
-            return
-        health = self._get_instance_health(instance)
         try:
-            health["system"] = self._get_system_stats()
-        except Exception:
-            health["system"] = None
-        health["access"] = get_access_info()
-        health["timestamp"] = str(datetime.now())
-        self.send_json(health)
+            # The table holds one row per broker, so the newest 20 rows cover
+            # both the latest status and any ready row within today's window.
+            rows = self._db_query(
+                db_file,
+                "SELECT broker, message, last_updated, total_symbols, is_ready "
+                "FROM master_contract_status ORDER BY last_updated DESC LIMIT 20"
+            )
+            latest = rows[0] if rows else None
+
+            window_start, window_end = self._ist_window()
+
+            ready_row = None
+            for row in rows:
+                if row[4] not in (1, "1"):
+                    continue
+                row_dt = self._parse_db_datetime(row[2])
+                if row_dt and window_start <= row_dt < window_end:
+                    ready_row = row
+                    break
+
+            is_ready = ready_row is not None
+            status = "Master Contract Data Ready" if is_ready else "Master Contract Data Not Ready"
+
+            if latest:
+                broker, message, last_updated, total_symbols, _ = latest
+            else:
+                broker = message = last_updated = total_symbols = None
+
+            return {
+                "is_ready": is_ready,
+                "status": status,
+                "last_updated": last_updated,
+                "total_symbols": total_symbols,
+                "message": message,
+                "broker": broker,
+            }
+        except Exception:
+            return {
+                "is_ready": False,
+                "status": "Master Contract Data Not Ready",
+                "last_updated": None,
+                "total_symbols": None,
+                "message": None,
+                "broker": None,
+            }
 
-    def handle_monitor_status(self):
-        """Get simple status for the monitor instance"""
-        instance = self._require_monitor_instance()
-        if not instance:
-            return
-        health = self._get_instance_health(instance)
-        self.send_json({
+    def _invalidate_session(self, instance):
+        """Invalidate session using instance auth models and reset master contract status."""
+        inst_path = f"/var/python/openalgo-flask/{instance}"
+        result = {
             "instance": instance,
-            "status": health.get("status", "unknown"),
-            "timestamp": str(datetime.now())
-        })
+            "auth_updated": False,
+            "auth_error": None,
+            "output": "",
+            "exit_code": None,
+        }
 
-    def handle_monitor_logs(self):
-        """Get logs for the monitor instance"""
-        instance = self._require_monitor_instance()
-        if not instance:
-            return
-        self.handle_instance_logs(instance)
-    
-    def handle_instance_logs(self, instance):
-        """Get last 100 lines of logs for an instance"""
-        try:
-            service_name = self._service_name(instance)
-            result = subprocess.run(
-                ["sudo", "journalctl", "-u", service_name, "-n", "100", "--no-pager"],
-                capture_output=True, text=True, timeout=5
-            )
-            logs = result.stdout.strip().split('\n') if result.stdout.strip() else []
-            self.send_json({
-                "instance": instance,
-                "logs": logs,
-                "count": len(logs),
-                "timestamp": str(datetime.now())
-            })
-        except Exception as e:
-            self.send_json({
-                "instance": instance,
-                "logs": [],
-                "error": str(e),
-                "timestamp": str(datetime.now())
-            }, 500)
+        if not os.path.isdir(inst_path):
+            result["auth_error"] = "Instance not found"
+            return result
+        script_path = self._find_script("oa-invalidate-session.sh")
+        if not script_path:
+            result["auth_error"] = "oa-invalidate-session.sh not found"
+            return result
 
-    def handle_clear_logs_instance(self, instance):
-        """Clear per-instance log files"""
         try:
-            inst_path = f"/var/python/openalgo-flask/{instance}"
-            if not os.path.isdir(inst_path):
-                self.send_json({"error": "Instance not found", "instance": instance}, 404)
-                return
-            clear_script = self._find_script("oa-clear-logs.sh")
-            if not clear_script:
-                self.send_json({"error": "oa-clear-logs.sh not found", "instance": instance}, 500)
-                return
-
             proc = subprocess.run(
-                ["sudo", "bash", clear_script, "--yes", "--instance", instance],
+                _SUDO + ["bash", script_path, "--instance", instance],
+                cwd=inst_path,
                 capture_output=True,
                 text=True,
-                timeout=600,
+                timeout=60,
             )
-            message = (proc.stdout or "").strip()
-            if proc.returncode != 0:
-                self.send_json({
-                    "instance": instance,
-                    "error": f"Clear logs failed (exit {proc.returncode})",
-                    "output": message,
-                    "timestamp": str(datetime.now())
-                }, 500)
-                return
-
-            self.send_json({
-                "instance": instance,
-                "message": "Clear logs completed",
-                "output": message,
-                "timestamp": str(datetime.now())
-            })
-        except Exception as e:
-            self.send_json({
-                "instance": instance,
-                "error": str(e),
-                "timestamp": str(datetime.now())
-            }, 500)
-
-    def handle_broker_status(self, instance):
-        """Get broker authentication status for an instance"""
-        try:
-            inst_path = f"/var/python/openalgo-flask/{instance}"
-            env_file = f"{inst_path}/.env"
-
-            broker = None
-            redirect_url = None
-
-            # Extract broker from .env
-            if os.path.exists(env_file):
-                with open(env_file, 'r') as f:
-                    for line in f:
-                        if 'REDIRECT_URL' in line and '=' in line:
-                            redirect_url = line.split('=', 1)[1].strip().strip("'\"")
-                            # Extract broker from URL: https://domain.com/broker/callback
-                            import re
-                            match = re.search(r'/([^/]+)/callback', redirect_url)
-                            if match:
-                                broker = match.group(1)
-                            break
-
-            authenticated, last_error, broker_db, name_db = self._read_auth_status(instance)
-            error_timestamp = None
-
-            self.send_json({
-                "instance": instance,
-                "broker": broker_db or broker,
-                "name": name_db,
-                "authenticated": authenticated,
-                "last_error": last_error,
-                "error_timestamp": error_timestamp,
-                "requires_login": not authenticated,
-                "timestamp": str(datetime.now())
-            })
+            result["exit_code"] = proc.returncode
+            result["output"] = (proc.stdout or "") + (("\n" + proc.stderr) if proc.stderr else "")
+            if proc.returncode == 0:
+                result["auth_updated"] = True
+            else:
+                result["auth_error"] = f"Script failed (exit {proc.returncode})"
         except Exception as e:
-            self.send_json({
-                "instance": instance,
-                "error": str(e),
-                "timestamp": str(datetime.now())
-            }, 500)
-
-    def handle_job_status(self, job_id):
-        job = self._get_job(job_id)
-        if not job:
-            self.send_json({"error": "Job not found"}, 404)
-            return
-        self.send_json(job)
+            result["auth_error"] = str(e)
 
-    def handle_health_check(self, data):
-        """Run oa-health-check.sh and return job id"""
-        scope = (data.get("scope") or "all").strip().lower()
-        instance = data.get("instance")
+        return result
 
-        if scope not in ("all", "system", "instance"):
-            self.send_json({"error": "Invalid scope. Use all|system|instance"}, 400)
-            return
+    def _reset_admin_user(self, instance, broker_creds=None):
+        """Delete all rows from the users and auth tables via oa-reset-admin.sh,
+        forcing the instance back into first-time admin setup and requiring a
+        fresh broker login. Use when a user forgot their password and has no
+        TOTP/QR reset or working SMTP configured.
 
-        if scope == "instance":
-            instance = self._sanitize_instance(instance)
-            if not instance:
-                self.send_json({"error": "Invalid or missing instance"}, 400)
-                return
+        broker_creds, if given, is a dict that may contain broker (the new
+        broker short name, used to update REDIRECT_URL), broker_api_key,
+        broker_api_secret, broker_api_key_market, broker_api_secret_market —
+        these are also written into the instance's .env file."""
+        inst_path = f"/var/python/openalgo-flask/{instance}"
+        result = {
+            "instance": instance,
+            "reset": False,
+            "error": None,
+            "output": "",
+            "exit_code": None,
+        }
 
-        script_path = self._find_script("oa-health-check.sh")
+        if not os.path.isdir(inst_path):
+            result["error"] = "Instance not found"
+            return result
+        script_path = self._find_script("oa-reset-admin.sh")
         if not script_path:
-            self.send_json({"error": "oa-health-check.sh not found"}, 500)
-            return
-
-        args = ["all"] if scope == "all" else ["system"] if scope == "system" else [instance]
-        job_id = self._create_job("health-check", {"scope": scope, "instance": instance})
-        command = ["sudo", "bash", script_path] + args
-        Thread(target=self._run_script_job, args=(job_id, command, 300), daemon=True).start()
-        self.send_json({
-            "status": "queued",
-            "job_id": job_id,
-            "message": "Health check started",
-            "timestamp": self._now_iso()
-        })
+            result["error"] = "oa-reset-admin.sh not found"
+            return result
 
-    def handle_update(self, data):
-        """Run oa-update.sh and return job id"""
-        scope = (data.get("scope") or "all").strip().lower()
-        instance = data.get("instance")
+        command = _SUDO + ["bash", script_path, "--instance", instance, "--force"]
+        cred_flags = {
+            "broker": "--broker",
+            "broker_api_key": "--broker-api-key",
+            "broker_api_secret": "--broker-api-secret",
+            "broker_api_key_market": "--broker-api-key-market",
+            "broker_api_secret_market": "--broker-api-secret-market",
+        }
+        for key, flag in cred_flags.items():
+            value = (broker_creds or {}).get(key, "")
+            if isinstance(value, str) and value.strip():
+                command.extend([flag, value.strip()])
 
-        if scope not in ("all", "instance"):
-            self.send_json({"error": "Invalid scope. Use all|instance"}, 400)
-            return
+        try:
+            proc = subprocess.run(
+                command,
+                cwd=inst_path,
+                capture_output=True,
+                text=True,
+                timeout=60,
+            )
+            result["exit_code"] = proc.returncode
+            result["output"] = (proc.stdout or "") + (("\n" + proc.stderr) if proc.stderr else "")
+            if proc.returncode == 0:
+                result["reset"] = True
+            else:
+                result["error"] = f"Script failed (exit {proc.returncode})"
+        except Exception as e:
+            result["error"] = str(e)
 
-        if scope == "instance":
-            instance = self._sanitize_instance(instance)
-            if not instance:
-                self.send_json({"error": "Invalid or missing instance"}, 400)
-                return
+        return result
 
-        script_path = self._find_script("oa-update.sh")
-        if not script_path:
-            self.send_json({"error": "oa-update.sh not found"}, 500)
-            return
+    def _read_auth_status(self, instance):
+        return self._auth_status_from_db(self._get_auth_db_file(instance))
 
-        args = ["update-all"] if scope == "all" else [instance]
-        job_id = self._create_job("update", {"scope": scope, "instance": instance})
-        command = ["sudo", "bash", script_path] + args
-        Thread(target=self._run_script_job, args=(job_id, command, 1800), daemon=True).start()
-        self.send_json({
-            "status": "queued",
-            "job_id": job_id,
-            "message": "Update started",
-            "timestamp": self._now_iso()
-        })
+    def _auth_status_from_db(self, db_file):
+        """Auth status from an already-resolved auth database (None if there is none)."""
+        if not db_file:
+            return False, "User Not Setup", None, None
+        try:
+            rows = self._db_query(db_file, "SELECT is_revoked, broker, name FROM auth LIMIT 1")
+            if not rows:
+                return False, "User Not Setup", None, None
+            is_revoked, broker, name = rows[0]
+            if is_revoked in (1, "1", True):
+                return False, "User Not Authenticated: Token Revoked", broker, name
+            return True, "User Authenticated", broker, name
+        except Exception as e:
+            return False, f"Auth check failed: {e}", None, None
+    def _service_name(self, instance):
+        """Map instance directory to systemd service name.
 
-    def handle_scripts_status(self):
-        script_names = ["oa-health-check.sh", "oa-update.sh", "oa-backup.sh", "oa-clear-logs.sh", "oa-invalidate-session.sh", "oa-reset-admin.sh"]
-        scripts = {}
-        for name in script_names:
-            path = self._find_script(name)
-            scripts[name] = {"found": bool(path), "path": path}
+        Raises ValueError on anything that isn't a real instance name. This is the
+        single choke point every systemctl/journalctl call routes through, so
+        validating here covers all callers instead of each one remembering to.
+        """
+        instance = self._sanitize_instance(instance)
+        if not instance:
+            raise ValueError("Invalid instance name")
+        domain = self._read_env(instance).get("DOMAIN")
+        name = f"openalgo-{domain.replace('.', '-')}" if domain else instance
+        # DOMAIN comes out of a file on disk, so don't trust it blindly either.
+        if not _SERVICE_NAME_RE.match(name):
+            raise ValueError("Invalid service name")
+        return name
 
-        missing = [name for name, info in scripts.items() if not info["found"]]
+    def _active_states(self, instances):
+        """Map each instance to its `systemctl is-active` state in one call.
 
-        found_dirs = [os.path.dirname(info["path"]) for info in scripts.values() if info["path"]]
-        suggested_dir = None
-        if found_dirs:
-            counts = {}
-            for d in found_dirs:
-                counts[d] = counts.get(d, 0) + 1
-            suggested_dir = sorted(counts.items(), key=lambda x: (-x[1], x[0]))[0][0]
-        else:
-            base_dir = os.path.dirname(os.path.abspath(__file__))
-            default_root_dir = "/root/Simplifyed-Scripts"
+        is-active accepts many units and prints one state per unit in argument
+        order, so N instances cost one fork instead of N. Its exit code is
+        non-zero whenever any unit is inactive, so it is deliberately ignored.
+        States are cached per unit for ACTIVE_STATE_TTL seconds, and a unit whose
+        probe fails keeps its last known state instead of dropping to "unknown".
+        """
+        states = {inst: "unknown" for inst in instances}
+        services = {}
+        for inst in instances:
             try:
-                if any(name.endswith(".sh") for name in os.listdir(default_root_dir)):
-                    suggested_dir = default_root_dir
-                elif any(name.endswith(".sh") for name in os.listdir(base_dir)):
-                    suggested_dir = base_dir
-            except Exception:
-                suggested_dir = None
+                services[inst] = self._service_name(inst)
+            except ValueError:
+                pass
+
+        now = time.time()
+        stale = {}
+        with self.ACTIVE_STATE_LOCK:
+            for inst, service_name in services.items():
+                cached = self.ACTIVE_STATE_CACHE.get(service_name)
+                if cached:
+                    states[inst] = cached[1]
+                    if now - cached[0] < self.ACTIVE_STATE_TTL:
+                        continue
+                stale[inst] = service_name
+        if not stale:
+            return states
 
-        suggested_fix = None
-        if suggested_dir:
-            suggested_fix = f"sudo ln -sf \"{suggested_dir}/\"*.sh /usr/local/bin/"
+        try:
+            result = subprocess.run(
+                ["systemctl", "is-active", *stale.values()],
+                capture_output=True, text=True, timeout=5
+            )
+        except Exception:
+            return states
+        with self.ACTIVE_STATE_LOCK:
+            for (inst, service_name), state in zip(stale.items(), result.stdout.splitlines()):
+                state = state.strip()
+                if state:
+                    states[inst] = state
+                    self.ACTIVE_STATE_CACHE[service_name] = (time.time(), state)
+        return states
+
+    def _forget_active_state(self, service_name):
+        """Drop a cached unit state after acting on the unit."""
+        with self.ACTIVE_STATE_LOCK:
+            self.ACTIVE_STATE_CACHE.pop(service_name, None)
+        # A finished health sweep taken before the change would otherwise be
+        # handed to the dashboard's post-restart refresh.
+        with self.HEALTH_LOCK:
+            flight = self.HEALTH_FLIGHT
+            if flight and flight["future"].done():
+                RestartHandler.HEALTH_FLIGHT = {}
+
+    def _read_env(self, instance):
+        """Parse an instance's .env into a {KEY: value} dict, quotes stripped.
+
+        Cached per file and re-parsed only when its mtime or size changes, so a
+        dashboard poll costs one stat() per instance instead of a line scan.
+        The returned dict is shared - treat it as read-only. A missing .env
+        yields an empty dict.
+        """
+        env_file = f"/var/python/openalgo-flask/{instance}/.env"
+        try:
+            st = os.stat(env_file)
+        except OSError:
+            return {}
+        key = (st.st_mtime_ns, st.st_size)
+        with self.ENV_LOCK:
+            cached = self.ENV_CACHE.get(env_file)
+            if cached and cached[0] == key:
+                return cached[1]
+        # Binary mode + partition: no codec pass over the whole file and no
+        # regex per line; only the values that are kept get decoded.
+        env = {}
+        with open(env_file, 'rb') as f:
+            for line in f:
+                name, sep, value = line.partition(b'=')
+                name = name.rstrip()
+                if not sep or name[:1].isdigit() or not name.replace(b'_', b'').isalnum():
+                    continue
+                env[name.decode('ascii')] = value.strip().strip(b"'\"").decode('utf-8', 'replace')
+        with self.ENV_LOCK:
+            self.ENV_CACHE[env_file] = (key, env)
+        return env
 
-        self.send_json({
-            "scripts": scripts,
-            "missing": missing,
-            "suggested_dir": suggested_dir,
-            "suggested_fix": suggested_fix,
-            "timestamp": self._now_iso()
-        })
+    def _sanitize_instance(self, instance):
+        if not instance:
+            return None
+        instance = instance.strip()
+        if _INSTANCE_RE.match(instance):
+            return instance
+        if _HOST_NAME_RE.match(instance):
+            candidate = f"openalgo-{instance.replace('.', '-')}"
+            if os.path.isdir(f"/var/python/openalgo-flask/{candidate}"):
+                return candidate
+        return None
 
-    def handle_terminal_dbs(self):
-        params = parse_qs(urlparse(self.path).query)
+    def _resolve_instance_from_host(self):
+        host = self.headers.get("Host", "")
+        host = host.split(":", 1)[0].strip()
+        if not host:
+            return None
+        if not _HOST_NAME_RE.match(host):
+            return None
+        candidate = f"/var/python/openalgo-flask/openalgo-{host.replace('.', '-')}"
+        if os.path.exists(candidate):
+            return self._sanitize_instance(os.path.basename(candidate))
+        return None
+
+    def _resolve_monitor_instance(self):
+        instance = self._sanitize_instance(self.headers.get("X-OpenAlgo-Instance"))
+        if instance:
+            return instance
+        parsed = urlparse(self.path)
+        params = parse_qs(parsed.query)
         instance = self._sanitize_instance(params.get("instance", [None])[0])
+        if instance:
+            return instance
+        return self._resolve_instance_from_host()
+
+    def _instance_arg(self, raw):
+        """Validate an instance name supplied by an API caller.
+
+        Returns the sanitized name, or None after sending a 400/404. Every /api/*
+        path that takes an instance goes through this - unvalidated names reach
+        both subprocess calls and filesystem paths, and a typo checked here costs
+        a stat instead of a sudo/systemctl fork. The check is on the directory,
+        not _list_instances(): openalgo-<domain> names are symlinks to an
+        openalgoN install, which the instance scan deliberately skips.
+        """
+        if not raw:
+            self.send_json({"error": "Missing instance parameter"}, 400)
+            return None
+        instance = self._sanitize_instance(raw)
         if not instance:
-            instances = self._list_instances()
-            instance = instances[0] if instances else None
+            self.send_json({"error": "Invalid instance name", "instance": raw}, 400)
+            return None
+        if not os.path.isdir(f"/var/python/openalgo-flask/{instance}"):
+            self.send_json({"error": "Unknown instance", "instance": instance}, 404)
+            return None
+        return instance
+
+    def _require_monitor_instance(self):
+        instance = self._resolve_monitor_instance()
         if not instance:
-            self.send_json({"error": "Invalid or missing instance"}, 400)
-            return
-        dbs = self._list_db_files(instance)
-        self.send_json({"instance": instance, "dbs": dbs, "timestamp": self._now_iso()})
+            self.send_json({"error": "Instance not specified"}, 400)
+            return None
+        return instance
 
-    def handle_terminal_run(self, data):
-        action = (data.get("action") or "").strip()
-        instance = self._sanitize_instance(data.get("instance"))
-        lines = data.get("lines", 100)
-        db_name = data.get("db")
-        query = data.get("query")
+    def _get_session_token(self):
+        cookie_header = self.headers.get('Cookie', '')
+        for part in cookie_header.split(';'):
+            part = part.strip()
+            if part.startswith(SESSION_COOKIE + '='):
+                return part.split('=', 1)[1]
+        return None
 
-        allowed = {"systemctl_status", "journalctl_tail", "df", "free", "uptime", "sqlite_select"}
-        if action not in allowed:
-            self.send_json({"error": "Action not allowed"}, 400)
-            return
+    def _is_authenticated(self):
+        token = self._get_session_token()
+        if not token:
+            return False
+        return touch_session(token)
 
-        try:
-            lines = int(lines)
-        except Exception:
-            lines = 100
-        if lines < 10:
-            lines = 10
-        if lines > 500:
-            lines = 500
+    def _login_prefix(self, path):
+        """nginx only proxies /monitor* to this process for per-instance domains,
+        so the login page must live under the same prefix the request arrived on."""
+        return '/monitor' if path.startswith('/monitor') else ''
 
-        cmd = None
-        if action in ("systemctl_status", "journalctl_tail"):
-            if not instance:
-                instances = self._list_instances()
-                instance = instances[0] if instances else None
-            if not instance:
-                self.send_json({"error": "Instance required for this action"}, 400)
-                return
-            service_name = self._service_name(instance)
-            if action == "systemctl_status":
-                cmd = ["systemctl", "status", service_name, "--no-pager"]
-            else:
-                cmd = ["journalctl", "-u", service_name, "-n", str(lines), "--no-pager"]
-        elif action == "df":
-            cmd = ["df", "-h"]
-        elif action == "free":
-            cmd = ["free", "-h"]
-        elif action == "uptime":
-            cmd = ["uptime"]
-        elif action == "sqlite_select":
-            if not instance:
-                instances = self._list_instances()
-                instance = instances[0] if instances else None
-            if not instance:
-                self.send_json({"error": "Instance required for sqlite query"}, 400)
-                return
-            if not query or not self._is_safe_select(query):
-                self.send_json({"error": "Only single SELECT statements are allowed"}, 400)
-                return
-            if not db_name or not str(db_name).endswith(".db"):
-                self.send_json({"error": "DB name required"}, 400)
-                return
-            dbs = self._list_db_files(instance)
-            if db_name not in dbs:
-                self.send_json({"error": "DB not allowed"}, 400)
-                return
-            db_path = f"/var/python/openalgo-flask/{instance}/db/{db_name}"
-            if not shutil.which("sqlite3"):
-                self.send_json({"error": "sqlite3 not installed"}, 400)
-                return
-            cmd = ["sqlite3", db_path, "-header", "-column", query]
+    def _redirect_to_login(self, path):
+        prefix = self._login_prefix(path)
+        target = f"{prefix}/login?next={quote(path, safe='')}"
+        self.send_response(302)
+        self.send_header('Location', target)
+        self.send_header('Content-Length', '0')
+        self.end_headers()
+
+    def serve_login_page(self, path, error=False):
+        parsed = urlparse(self.path)
+        params = parse_qs(parsed.query)
+        prefix = self._login_prefix(path)
+        default_next = prefix if prefix else '/'
+        next_path = params.get('next', [default_next])[0]
+        if not next_path.startswith('/'):
+            next_path = default_next
+        action = f"{prefix}/login-submit"
+        error_html = '<div class="login-error">Invalid username or password.</div>' if error else ''
+        html = ("""<!DOCTYPE html>
+<html>
+<head>
+<meta charset="UTF-8">
+<meta name="viewport" content="width=device-width, initial-scale=1">
+<title>OpenAlgo Admin Login</title>
+<style>""" + DASHBOARD_CSS + """
+body{display:flex;align-items:center;justify-content:center}
+.login-card{width:100%;max-width:360px;padding:28px}
+.login-card h1{font-size:16px;font-weight:650;margin-bottom:4px;display:flex;align-items:center;gap:8px}
+.login-card h1 svg{color:var(--accent)}
+.login-card p.sub{font-size:12.5px;color:var(--text-dim);margin-bottom:20px}
+.login-error{background:var(--danger-soft);color:var(--danger);border:1px solid rgba(244,88,110,.35);border-radius:var(--radius-sm);padding:9px 12px;font-size:12.5px;margin-bottom:14px}
+.login-card form{display:flex;flex-direction:column;gap:12px}
+.login-card button{margin-top:4px}
+</style>
+</head>
+<body>
+<div class="card login-card">
+<h1><svg width="18" height="18" viewBox="0 0 24 24" fill="none" stroke="currentColor" stroke-width="2" stroke-linecap="round" stroke-linejoin="round"><path d="M3 12h4l3 8 4-16 3 8h4"/></svg>OpenAlgo Admin</h1>
+<p class="sub">Sign in to continue</p>
+""" + error_html + """
+<form method="POST" action=\"""" + _esc_attr(action) + """\">
+<div>
+<label class="reset-field-label">Username</label>
+<input class="reset-input" type="text" name="username" autocomplete="username" autofocus required>
+</div>
+<div>
+<label class="reset-field-label">Password</label>
+<input class="reset-input" type="password" name="password" autocomplete="current-password" required>
+</div>
+<input type="hidden" name="next" value=\"""" + _esc_attr(next_path) + """\">
+<button type="submit" class="btn btn-accent">Sign in</button>
+</form>
+</div>
+</body>
+</html>""")
+        html_bytes = html.encode('utf-8')
+        self.send_response(200)
+        self.send_header('Content-Type', 'text/html; charset=utf-8')
+        self.send_header('Cache-Control', 'no-store, no-cache, must-revalidate')
+        self.send_header('Content-Length', len(html_bytes))
+        self.end_headers()
+        self.wfile.write(html_bytes)
+
+    def handle_login_submit(self, path, body):
+        prefix = self._login_prefix(path)
+        fields = parse_qs(body)
+        username = fields.get('username', [''])[0]
+        password = fields.get('password', [''])[0]
+        next_path = fields.get('next', [prefix if prefix else '/'])[0]
+        if not next_path.startswith('/'):
+            next_path = prefix if prefix else '/'
+
+        creds = load_credentials()
+        ok = bool(creds) and username == creds.get('username') and verify_password(password, creds.get('hash', ''))
+        if not ok:
+            self.serve_login_page(path, error=True)
+            return
+
+        token = create_session()
+        self.send_response(302)
+        self.send_header('Location', next_path)
+        cookie = f"{SESSION_COOKIE}={token}; HttpOnly; Path=/; Max-Age={SESSION_TTL_SECONDS}; SameSite=Lax"
+        if self.headers.get('X-Forwarded-Proto', '').lower() == 'https':
+            cookie += '; Secure'
+        self.send_header('Set-Cookie', cookie)
+        self.send_header('Content-Length', '0')
+        self.end_headers()
 
-        if not cmd:
-            self.send_json({"error": "Command not available"}, 400)
+    def handle_logout(self, path):
+        token = self._get_session_token()
+        if token:
+            destroy_session(token)
+        prefix = self._login_prefix(path)
+        self.send_response(302)
+        self.send_header('Location', f"{prefix}/login")
+        self.send_header('Set-Cookie', f"{SESSION_COOKIE}=; HttpOnly; Path=/; Max-Age=0; SameSite=Lax")
+        self.send_header('Content-Length', '0')
+        self.end_headers()
+    
+    def do_GET(self):
+        """Handle GET requests"""
+        path = urlparse(self.path).path
+        if path in ('/login', '/monitor/login'):
+            self.serve_login_page(path)
+            return
+        if path in ('/logout', '/monitor/logout'):
+            self.handle_logout(path)
+            return
+        if path != '/health' and not self._is_authenticated():
+            if path in ('/', '/index.html', '/monitor', '/monitor/'):
+                self._redirect_to_login(path)
+            else:
+                self.send_json({"error": "Authentication required"}, 401)
             return
+        name = _GET_ROUTES.get(path)
+        if name is not None:
+            getattr(self, name)()
+            return
+        for prefix, name in _GET_PREFIX_ROUTES:
+            if path.startswith(prefix):
+                getattr(self, name)(path[len(prefix):].strip('/'))
+                return
+        self.send_json({"error": "Not found"}, 404)
 
-        try:
-            result = subprocess.run(
-                cmd,
-                capture_output=True,
-                text=True,
-                timeout=15
-            )
-            output = (result.stdout or "") + ("\n" + result.stderr if result.stderr else "")
-            output = self._strip_ansi(output)
-            output = self._truncate_output(output)
-            self.send_json({
-                "status": "success" if result.returncode == 0 else "error",
-                "exit_code": result.returncode,
-                "output": output.strip(),
-                "timestamp": self._now_iso()
-            })
-        except subprocess.TimeoutExpired:
-            self.send_json({"error": "Command timed out"}, 504)
-        except Exception as e:
-            self.send_json({"error": str(e)}, 500)
+    def _route_instance_logs(self, rest):
+        instance = self._instance_arg(rest)
+        if instance:
+            self.handle_instance_logs(instance)
 
-    def _check_domain_http(self, domain):
-        """Check if the main app domain responds over HTTPS."""
-        import urllib.request
-        import ssl
-        url = f"https://{domain}/"
-        try:
-            ctx = ssl.create_default_context()
-            req = urllib.request.Request(url, headers={"User-Agent": "OpenAlgo-Monitor/1.0"})
-            with urllib.request.urlopen(req, timeout=10, context=ctx) as resp:
-                return {"reachable": True, "status_code": resp.status, "url": url}
-        except urllib.error.HTTPError as e:
-            return {"reachable": True, "status_code": e.code, "url": url}
-        except Exception as e:
-            return {"reachable": False, "status_code": None, "error": str(e)[:120], "url": url}
+    def _route_broker_status(self, rest):
+        instance = self._instance_arg(rest)
+        if instance:
+            self.handle_broker_status(instance)
 
-    def _probe_socket(self, instance):
-        """Does the instance's gunicorn socket actually answer HTTP?
+    def _route_job_status(self, rest):
+        if rest:
+            self.handle_job_status(rest)
+        else:
+            self.send_json({"error": "Missing job id"}, 400)
+    
+    def do_POST(self):
+        """Handle POST requests"""
+        path = urlparse(self.path).path
+        content_length = int(self.headers.get('Content-Length', 0))
+        body = self.rfile.read(content_length) if content_length > 0 else b''
 
-        True = serving, False = wedged (accepts but never responds), None = no socket
-        to probe or the probe itself broke. Any HTTP status counts as healthy; a
-        redirect to the login page is a perfectly good answer.
-        """
-        socket_file = f"/var/python/openalgo-flask/{instance}/openalgo.sock"
-        if not os.path.exists(socket_file):
-            return None
-        try:
-            result = subprocess.run(
-                ["sudo", "-u", "www-data", "curl", "-s", "-m", "5",
-                 "-o", "/dev/null", "-w", "%{http_code}",
-                 "--unix-socket", socket_file, "http://localhost/"],
-                capture_output=True, text=True, timeout=10,
-            )
-        except Exception:
-            return None
-        code = (result.stdout or "").strip()
-        return bool(code) and code != "000"
+        if path in ('/login-submit', '/monitor/login-submit'):
+            self.handle_login_submit(path, body.decode('utf-8', errors='replace'))
+            return
 
-    def _get_instance_health(self, instance):
-        """Get detailed health info for a single instance"""
-        health = {"name": instance, "status": "unknown", "serving": None, "wedged": False, "port": None, "database": False, "broker": None, "domain": None, "env_version": None, "auth_name": None, "auth_status": None, "session_valid": True, "master_contract": None, "git": None, "valid_brokers": []}
+        if not self._is_authenticated():
+            self.send_json({"error": "Authentication required"}, 401)
+            return
 
         try:
-            service_name = self._service_name(instance)
-            result = subprocess.run(
-                ["systemctl", "is-active", service_name],
-                capture_output=True, text=True, timeout=2
-            )
-            health["status"] = result.stdout.strip()
+            data = _json_loads(body) if body else {}
         except:
-            health["status"] = "unknown"
+            self.send_json({"error": "Invalid JSON"}, 400)
+            return
 
-        # is-active is not liveness. A wedged eventlet worker keeps the process and
-        # the socket alive while every request hangs into an nginx 504, and is-active
-        # says "active" throughout. Only an end-to-end request over the socket sees
-        # it - same probe as check_socket() in oa-health-check.sh.
-        if health["status"] == "active":
-            health["serving"] = self._probe_socket(instance)
-            health["wedged"] = health["serving"] is False
+        route = _POST_ROUTES.get(path)
+        if route is None:
+            self.send_json({"error": "Not found"}, 404)
+            return
+        name, instance_from, with_data = route
+        args = []
+        if instance_from == 'monitor':
+            instance = self._require_monitor_instance()
+            if not instance:
+                return
+            args.append(instance)
+        elif instance_from == 'body':
+            instance = self._instance_arg(data.get('instance', ''))
+            if not instance:
+                return
+            args.append(instance)
+        if with_data:
+            args.append(data)
+        getattr(self, name)(*args)
+    
+    def _refresh_status_snapshot(self):
+        """Collect the instance list and their unit states in one pass."""
+        instances = self._list_instances()
+        snapshot = {
+            "ts": time.time(),
+            "instances": instances,
+            "states": self._active_states(instances),
+            "timestamp": self._now_iso(),
+        }
+        # Rebinding the class attribute is atomic, so readers never see a
+        # half-built snapshot and need no lock.
+        RestartHandler.STATUS_SNAPSHOT = snapshot
+        return snapshot
 
-        try:
-            inst_path = f"/var/python/openalgo-flask/{instance}"
-            db_file = self._get_auth_db_file(instance)
-            if db_file:
-                health["database"] = True
-        except:
-            pass
+    def _status_snapshot(self):
+        """Latest snapshot from the background refresher.
 
-        try:
-            env_file = f"/var/python/openalgo-flask/{instance}/.env"
-            if os.path.exists(env_file):
-                with open(env_file, 'r') as f:
-                    for line in f:
-                        m = re.match(r"^DOMAIN\s*=\s*(.+)", line)
-                        if m:
-                            health["domain"] = m.group(1).strip().strip("'\"")
-                            continue
-                        m = re.match(r"^FLASK_PORT\s*=\s*(.+)", line)
-                        if m:
-                            health["port"] = m.group(1).strip().strip("'\"")
-                            continue
-                        m = re.match(r"^ENV_CONFIG_VERSION\s*=\s*(.+)", line)
-                        if m:
-                            health["env_version"] = m.group(1).strip().strip("'\"")
-                            continue
-                        m = re.match(r"^VALID_BROKERS\s*=\s*(.+)", line)
-                        if m:
-                            raw = m.group(1).strip().strip("'\"")
-                            health["valid_brokers"] = [b.strip() for b in raw.split(",") if b.strip()]
-                            continue
-                        if 'REDIRECT_URL' in line and '=' in line:
-                            redirect_url = line.split('=', 1)[1].strip().strip("'\"")
-                            match = re.search(r'/([^/]+)/callback', redirect_url)
-                            if match:
-                                health["broker"] = match.group(1)
-        except:
-            pass
+        Falls back to collecting inline when the refresher is not running (or has
+        stalled), so the endpoints never serve arbitrarily old data.
+        """
+        RestartHandler.STATUS_LAST_READ = time.time()
+        snapshot = self.STATUS_SNAPSHOT
+        if snapshot and time.time() - snapshot["ts"] < 2 * self.STATUS_REFRESH_INTERVAL:
+            return snapshot
+        return self._refresh_status_snapshot()
 
+    def handle_instances(self):
+        """Get list of instances"""
         try:
-            authenticated, last_error, broker_db, name_db = self._read_auth_status(instance)
-            health["session_valid"] = authenticated
-            if broker_db:
-                health["broker"] = broker_db
-            if name_db:
-                health["auth_name"] = name_db
-            if last_error:
-                health["auth_status"] = last_error
-            elif authenticated:
-                health["auth_status"] = "User Authenticated"
-        except:
-            pass
+            self.send_json(self._status_snapshot()["instances"])
+        except Exception as e:
+            self.send_json({"error": str(e)}, 500)
+    
+    def handle_status(self):
+        """Get status of all instances"""
+        try:
+            snapshot = self._status_snapshot()
+            status = {"total": len(snapshot["instances"]), "instances": snapshot["states"], "timestamp": snapshot["timestamp"]}
 
+            self.send_json_revalidated(status, snapshot["states"])
+        except Exception as e:
+            self.send_json({"error": str(e)}, 500)
+    
+    def handle_instances_health(self):
+        """Get detailed health status of all instances"""
         try:
-            health["master_contract"] = self._get_master_contract_status(instance)
-        except:
-            pass
+            # Plain send_json, not send_json_revalidated: the payload carries
+            # live CPU/memory figures that differ on every sweep, so an ETag
+            # would never match.
+            self.send_json(self._shared_instances_health())
+        except Exception as e:
+            self.send_json({"error": str(e)}, 500)
 
-        if health.get("domain"):
+    def _shared_instances_health(self):
+        """Health of every instance, computed at most once per HEALTH_TTL.
+
+        Every open dashboard tab polls this. Requests that arrive while a sweep
+        is running wait for that sweep instead of starting their own, and for
+        HEALTH_TTL seconds afterwards they reuse its result. The returned dict
+        is shared between requests - treat it as read-only.
+        """
+        with self.HEALTH_LOCK:
+            flight = self.HEALTH_FLIGHT
+            owner = not flight or (flight["future"].done()
+                                   and time.time() - flight["ts"] >= self.HEALTH_TTL)
+            if owner:
+                flight = {"ts": time.time(), "future": Future()}
+                RestartHandler.HEALTH_FLIGHT = flight
+        if owner:
             try:
-                health["domain_check"] = self._check_domain_http(health["domain"])
-            except Exception:
-                health["domain_check"] = {"reachable": False, "error": "check failed", "url": ""}
+                result, error = self._collect_instances_health(), None
+            except Exception as e:
+                result, error = None, e
+            # The TTL runs from when the sweep finished, not when it started.
+            flight["ts"] = time.time()
+            if error is None:
+                flight["future"].set_result(result)
+            else:
+                flight["future"].set_exception(error)
+        return flight["future"].result()
+
+    def _collect_instances_health(self):
+        instances = self._list_instances()
+        health = {"total": len(instances), "instances": {}, "timestamp": self._now_iso()}
+
+        # Each instance's probes (socket, sqlite, domain, git) are blocking I/O,
+        # so run them side by side instead of one instance after another.
+        states = self._active_states(instances)
+        futures = {
+            inst: self.HEALTH_EXECUTOR.submit(self._get_instance_health, inst, states[inst])
+            for inst in instances
+        }
+        # One hung instance (a stuck socket probe, an unreachable git remote)
+        # must not hold the whole dashboard; past the deadline it is reported
+        # with just its unit state and the sweep returns.
+        deadline = time.monotonic() + self.HEALTH_TIMEOUT
+        for inst in instances:
+            try:
+                health["instances"][inst] = futures[inst].result(
+                    timeout=max(0, deadline - time.monotonic()))
+            except FuturesTimeout:
+                health["instances"][inst] = {
+                    "name": inst, "status": states[inst], "serving": None, "wedged": False,
+                    "session_valid": False, "auth_status": "Health check timed out",
+                }
 
         try:
-            health["git"] = self._get_git_info(instance)
+            health["system"] = self._get_system_stats()
         except Exception:
-            pass
-
+            health["system"] = None
+        health["access"] = get_access_info()
         return health
-    
-    def handle_health(self):
-        """Health check"""
-        self.send_json({
-            "status": "healthy",
-            "service": "OpenAlgo Restart API",
-            "timestamp": str(datetime.now())
-        })
 
-    def handle_change_password(self, data):
-        """Change the admin password (requires the current one)"""
-        creds = load_credentials()
-        if not creds:
-            self.send_json({"error": "No admin account configured"}, 400)
-            return
-        current_password = data.get('current_password', '')
-        new_password = data.get('new_password', '')
-        if not verify_password(current_password, creds.get('hash', '')):
-            self.send_json({"error": "Current password is incorrect"}, 401)
-            return
-        if not new_password:
-            self.send_json({"error": "New password cannot be empty"}, 400)
+    def handle_monitor_health(self):
+        """Get detailed health status for the monitor instance"""
+        instance = self._require_monitor_instance()
+        if not instance:
             return
-        save_credentials(creds.get('username'), new_password)
-        self.send_json({"status": "success", "message": "Password changed successfully"})
-    
-    def handle_restart_all(self):
-        """Restart all instances"""
-        job_id = self._create_job("restart-all", {})
-        Thread(target=self._restart_all, args=(job_id,), daemon=True).start()
-        self.send_json({
-            "status": "queued",
-            "job_id": job_id,
-            "message": "Restart triggered for all instances",
-            "timestamp": str(datetime.now())
-        })
+        self.send_json(self._monitor_health(instance))
 
-    def handle_restart_instance(self, instance):
-        """Restart specific instance"""
+    def _monitor_health(self, instance):
+        health = self._get_instance_health(instance)
         try:
-            service_name = self._service_name(instance)
-        except ValueError as e:
-            self.send_json({"error": str(e), "instance": instance}, 400)
-            return
-
-        job_id = self._create_job("restart-instance", {"instance": instance})
-        Thread(
-            target=self._restart_instance_background,
-            args=(job_id, instance, service_name),
-            daemon=True,
-        ).start()
-
-        self.send_json({
-            "status": "queued",
-            "job_id": job_id,
-            "message": f"Restart queued for {instance}",
-            "instance": instance,
-            "service": service_name,
-            "timestamp": str(datetime.now())
-        })
-
-    def _clear_instance_logs_quick(self, instance):
-        """Delete per-instance log files without running full system cleanup."""
-        inst_path = f"/var/python/openalgo-flask/{instance}"
-        deleted = 0
-
-        for log_dir_name in ("log", "logs"):
-            log_dir = os.path.join(inst_path, log_dir_name)
-            if not os.path.isdir(log_dir):
-                continue
-
-            for root, dirs, files in os.walk(log_dir, topdown=False):
-                for filename in files:
-                    file_path = os.path.join(root, filename)
-                    try:
-                        os.remove(file_path)
-                        deleted += 1
-                    except FileNotFoundError:
-                        continue
-                    except Exception:
-                        continue
-
-                for dirname in dirs:
-                    dir_path = os.path.join(root, dirname)
-                    try:
-                        os.rmdir(dir_path)
-                    except OSError:
-                        continue
-
-        return deleted
+            health["system"] = self._get_system_stats()
+        except Exception:
+            health["system"] = None
+        health["access"] = get_access_info()
+        health["timestamp"] = self._now_iso()
+        return health
 
-    def _restart_instance_background(self, job_id, instance, service_name):
-        """Run restart-related work without blocking the monitor HTTP server.
+    def handle_dashboard(self):
+        """Everything one manager refresh needs (health + scripts status) in one response."""
+        try:
+            self.send_json({
+                "health": self._shared_instances_health(),
+                "scripts_status": self._scripts_status(),
+            })
+        except Exception as e:
+            self.send_json({"error": str(e)}, 500)
 
-        The restart itself decides the job outcome; session-invalidation and log
-        clearing are best-effort housekeeping and only get noted in the output.
+    def handle_events(self):
+        """Stream the /api/dashboard payload to the manager page (server-sent events).
+
+        The full payload goes out whenever instance health or scripts status
+        changes, checked every EVENTS_INTERVAL seconds. Otherwise a small
+        `system` event carries just the live CPU/memory/disk figures, which
+        change every sweep anyway; it doubles as the heartbeat that keeps
+        proxies from closing the stream. EVENTS_INTERVAL matches the page's old
+        30 s poll, so a stream costs no more health sweeps than polling did, and
+        the page drops the stream while its tab is hidden. Each stream holds a
+        thread, so at most EVENTS_MAX_STREAMS run at once and each ends after
+        EVENTS_MAX_AGE; EventSource reconnects on its own, and a refused page
+        keeps polling.
         """
-        self._update_job(job_id, status="running", started_at=self._now_iso())
-        notes = []
+        with self.EVENTS_LOCK:
+            if RestartHandler.EVENTS_STREAMS >= self.EVENTS_MAX_STREAMS:
+                self.send_json({"error": "Too many event streams"}, 503)
+                return
+            RestartHandler.EVENTS_STREAMS += 1
+        try:
+            self.close_connection = True
+            self.send_response(200)
+            self.send_header('Content-Type', 'text/event-stream')
+            self.send_header('Cache-Control', 'no-cache')
+            # nginx would otherwise buffer the stream behind the manager domain.
+            self.send_header('X-Accel-Buffering', 'no')
+            self.send_header('Connection', 'close')
+            self.end_headers()
+            self.wfile.write(b"retry: 5000\n\n")
+            last = None
+            end = time.monotonic() + self.EVENTS_MAX_AGE
+            while time.monotonic() < end:
+                try:
+                    health = self._shared_instances_health()
+                    payload = {"health": health, "scripts_status": self._scripts_status()}
+                    # Timestamps and system stats change on every sweep; they
+                    # alone are no news and go out in the small event below.
+                    fingerprint = _json_dumps([dict(health, timestamp=None, system=None),
+                                               dict(payload["scripts_status"], timestamp=None)])
+                except Exception as e:
+                    payload = {"error": str(e)}
+                    fingerprint = None
+                if fingerprint is None or fingerprint != last:
+                    self.wfile.write(b"data: " + _json_dumps(payload) + b"\n\n")
+                    last = fingerprint
+                else:
+                    system = {"system": health.get("system"), "access": health.get("access")}
+                    self.wfile.write(b"event: system\ndata: " + _json_dumps(system) + b"\n\n")
+                # EventSource never sends on this connection, so the socket only
+                # turns readable when the tab goes away - free the slot then
+                # rather than at the next write.
+                if select.select([self.connection], [], [], self.EVENTS_INTERVAL)[0]:
+                    break
+        except (BrokenPipeError, ConnectionResetError):
+            pass
+        finally:
+            with self.EVENTS_LOCK:
+                RestartHandler.EVENTS_STREAMS -= 1
 
-        for label, fn in (("invalidate-session", lambda: self._invalidate_session(instance)),
-                          ("clear-logs", lambda: self._clear_instance_logs_quick(instance))):
-            try:
-                fn()
-            except Exception as e:
-                notes.append(f"{label} failed (non-fatal): {e}")
+    def handle_monitor_dashboard(self):
+        """Monitor counterpart of handle_dashboard for a single instance."""
+        instance = self._require_monitor_instance()
+        if not instance:
+            return
+        self.send_json({
+            "health": self._monitor_health(instance),
+            "scripts_status": self._scripts_status(),
+        })
 
-        try:
-            result = subprocess.run(
-                ["sudo", "systemctl", "restart", service_name],
-                capture_output=True, text=True, timeout=60,
-            )
-        except Exception as e:
-            self._update_job(job_id, status="error", error=f"systemctl restart failed: {e}",
-                             output="\n".join(notes), finished_at=self._now_iso())
+    def handle_monitor_status(self):
+        """Get simple status for the monitor instance"""
+        instance = self._require_monitor_instance()
+        if not instance:
             return
+        # Only the unit state is reported, so read it from the shared
+        # is-active cache rather than running the full health probe (socket,
+        # sqlite, git, HTTPS) just to discard everything else.
+        self.send_json({
+            "instance": instance,
+            "status": self._active_states([instance])[instance],
+            "timestamp": self._now_iso()
+        })
 
-        if result.returncode != 0:
-            self._update_job(
-                job_id, status="error", exit_code=result.returncode,
-                error=(result.stderr or "").strip() or f"systemctl restart {service_name} failed",
-                output="\n".join(notes + [(result.stdout or "").strip()]).strip(),
-                finished_at=self._now_iso(),
-            )
+    def handle_monitor_logs(self):
+        """Get logs for the monitor instance"""
+        instance = self._require_monitor_instance()
+        if not instance:
             return
+        self.handle_instance_logs(instance)
+    
+    def handle_instance_logs(self, instance):
+        """Get the newest log lines for an instance, one page at a time.
 
+        ?limit=N sets the page size (default LOGS_PAGE_LINES). Passing a page's
+        next_cursor back as ?before= returns the page preceding it. journalctl
+        reads backwards from the end (or the cursor), so a request never walks
+        more of the journal than it returns.
+        """
+        params = parse_qs(urlparse(self.path).query)
         try:
-            nginx = subprocess.run(
-                ["sudo", "systemctl", "reload", "nginx"],
-                capture_output=True, text=True, timeout=30,
-            )
-            if nginx.returncode != 0:
-                notes.append(f"nginx reload failed: {(nginx.stderr or '').strip()}")
+            limit = int(params.get("limit", [self.LOGS_PAGE_LINES])[0])
+        except ValueError:
+            self.send_json({"error": "Invalid limit", "instance": instance}, 400)
+            return
+        limit = max(1, min(limit, self.LOGS_MAX_LINES))
+        before = params.get("before", [""])[0]
+        if before and not _JOURNAL_CURSOR_RE.match(before):
+            self.send_json({"error": "Invalid cursor", "instance": instance}, 400)
+            return
+        try:
+            page = self._read_log_page(instance, limit, before)
+            page["timestamp"] = self._now_iso()
+            self.send_json(page)
         except Exception as e:
-            notes.append(f"nginx reload failed: {e}")
+            self.send_json({
+                "instance": instance,
+                "logs": [],
+                "error": str(e),
+                "timestamp": self._now_iso()
+            }, 500)
 
-        self._update_job(
-            job_id, status="success", exit_code=0,
-            output="\n".join(notes + [f"Restarted {service_name}"]).strip(),
-            finished_at=self._now_iso(),
-        )
+    def _read_log_page(self, instance, limit, before=""):
+        service_name = self._service_name(instance)
+        command = _JOURNALCTL + ["-u", service_name, "-n", str(limit), "-r",
+                                 "--show-cursor", "--no-pager"]
+        if before:
+            command.append(f"--after-cursor={before}")
+        result = subprocess.run(command, capture_output=True, text=True, timeout=5)
+        logs = result.stdout.splitlines()
+        # --show-cursor appends the cursor of the last entry printed, which
+        # in reverse order is the oldest one on this page.
+        cursor = None
+        if logs and logs[-1].startswith("-- cursor: "):
+            cursor = logs.pop()[len("-- cursor: "):]
+        logs = [line for line in reversed(logs) if line != "-- No entries --"]
+        return {
+            "instance": instance,
+            "logs": logs,
+            "count": len(logs),
+            "next_cursor": cursor,
+            "has_more": cursor is not None and len(logs) >= limit,
+        }
 
-    def _systemctl(self, instance, verbs, ok_message):
-        """Run systemctl verbs against an instance and report what actually happened.
+    def handle_logs_batch(self):
+        """Newest log page for several instances: /api/logs?instances=a,b,c
 
-        Anything that fails is reported as a failure - a caller (the fleet manager,
-        the dashboard) that is told "success" for a no-op cannot manage anything.
+        The dashboard batches log panels opened together into one request; the
+        journalctl reads then run side by side instead of one request each.
         """
-        try:
-            service_name = self._service_name(instance)
-        except ValueError as e:
-            self.send_json({"error": str(e), "instance": instance}, 400)
+        params = parse_qs(urlparse(self.path).query)
+        names = [n for n in params.get("instances", [""])[0].split(",") if n]
+        if not names:
+            self.send_json({"error": "Missing instances"}, 400)
             return
-
-        for verb in verbs:
+        # Same checks as _instance_arg, so every name /api/logs/<instance>
+        # accepts (bare domains, openalgo-<domain> symlinks) is accepted here.
+        resolved = {n: self._sanitize_instance(n) for n in dict.fromkeys(names)}
+        invalid = [n for n, inst in resolved.items() if not inst]
+        if invalid:
+            self.send_json({"error": "Invalid instance name", "instances": invalid}, 400)
+            return
+        unknown = [n for n, inst in resolved.items()
+                   if not os.path.isdir(f"/var/python/openalgo-flask/{inst}")]
+        if unknown:
+            self.send_json({"error": "Unknown instance", "instances": unknown}, 404)
+            return
+        futures = {
+            name: self.LOGS_EXECUTOR.submit(self._read_log_page, inst, self.LOGS_PAGE_LINES)
+            for name, inst in resolved.items()
+        }
+        pages = {}
+        for inst, future in futures.items():
             try:
-                result = subprocess.run(
-                    ["sudo", "systemctl", verb, service_name],
-                    capture_output=True, text=True, timeout=30,
-                )
+                pages[inst] = future.result()
             except Exception as e:
-                self.send_json({
-                    "status": "error", "instance": instance, "service": service_name,
-                    "error": f"systemctl {verb} failed: {e}",
-                }, 500)
+                pages[inst] = {"instance": inst, "logs": [], "error": str(e)}
+        self.send_json({"instances": pages, "timestamp": self._now_iso()})
+
+    def handle_clear_logs_instance(self, instance):
+        """Clear per-instance log files"""
+        try:
+            inst_path = f"/var/python/openalgo-flask/{instance}"
+            if not os.path.isdir(inst_path):
+                self.send_json({"error": "Instance not found", "instance": instance}, 404)
+                return
+            clear_script = self._find_script("oa-clear-logs.sh")
+            if not clear_script:
+                self.send_json({"error": "oa-clear-logs.sh not found", "instance": instance}, 500)
                 return
 
-            if result.returncode != 0:
+            proc = subprocess.run(
+                _SUDO + ["bash", clear_script, "--yes", "--instance", instance],
+                capture_output=True,
+                text=True,
+                timeout=600,
+            )
+            message = (proc.stdout or "").strip()
+            if proc.returncode != 0:
                 self.send_json({
-                    "status": "error", "instance": instance, "service": service_name,
-                    "exit_code": result.returncode,
-                    "error": (result.stderr or "").strip() or f"systemctl {verb} {service_name} failed",
+                    "instance": instance,
+                    "error": f"Clear logs failed (exit {proc.returncode})",
+                    "output": message,
+                    "timestamp": self._now_iso()
                 }, 500)
                 return
 
-        self.send_json({
-            "status": "success",
-            "message": ok_message.format(instance=instance),
-            "instance": instance,
-            "service": service_name,
-            "timestamp": str(datetime.now())
-        })
+            self.send_json({
+                "instance": instance,
+                "message": "Clear logs completed",
+                "output": message,
+                "timestamp": self._now_iso()
+            })
+        except Exception as e:
+            self.send_json({
+                "instance": instance,
+                "error": str(e),
+                "timestamp": self._now_iso()
+            }, 500)
 
-    def handle_stop_instance(self, instance):
-        """Stop specific instance, and keep it stopped across reboots.
+    def handle_broker_status(self, instance):
+        """Get broker authentication status for an instance"""
+        try:
+            # Extract broker from REDIRECT_URL: https://domain.com/broker/callback
+            broker = None
+            match = _CALLBACK_RE.search(self._read_env(instance).get("REDIRECT_URL", ""))
+            if match:
+                broker = match.group(1)
 
-        `stop` alone is undone by the next reboot or by the daily restart-all, so a
-        deliberately stopped instance would silently come back. `disable` makes the
-        intent stick; handle_start_instance re-enables.
-        """
-        self._systemctl(instance, ["disable", "stop"], "Stopped and disabled {instance}")
+            authenticated, last_error, broker_db, name_db = self._read_auth_status(instance)
+            error_timestamp = None
 
-    def handle_start_instance(self, instance):
-        """Start specific instance and re-enable it at boot."""
-        self._systemctl(instance, ["enable", "start"], "Started and enabled {instance}")
+            self.send_json({
+                "instance": instance,
+                "broker": broker_db or broker,
+                "name": name_db,
+                "authenticated": authenticated,
+                "last_error": last_error,
+                "error_timestamp": error_timestamp,
+                "requires_login": not authenticated,
+                "timestamp": self._now_iso()
+            })
+        except Exception as e:
+            self.send_json({
+                "instance": instance,
+                "error": str(e),
+                "timestamp": self._now_iso()
+            }, 500)
 
-    def handle_invalidate_session(self, instance):
-        """Invalidate session for a specific instance"""
-        result = self._invalidate_session(instance)
-        self.send_json({
-            "status": "success",
-            "message": f"Session invalidated for {instance}",
-            "instance": instance,
-            "details": result,
-            "timestamp": str(datetime.now())
-        })
+    def handle_job_status(self, job_id):
+        job = self._get_job(job_id)
+        if not job:
+            self.send_json({"error": "Job not found"}, 404)
+            return
+        self.send_json(job)
 
-    def handle_reset_admin_user(self, instance, data=None):
-        """Delete all users for a specific instance, forcing first-time setup.
-        Optionally also switches the active broker (data['broker'], which
-        updates REDIRECT_URL) and/or rotates broker API credentials in .env
-        when data includes broker_api_key / broker_api_secret / *_market
-        fields."""
-        broker_creds = {
-            "broker": (data or {}).get("broker", ""),
-            "broker_api_key": (data or {}).get("broker_api_key", ""),
-            "broker_api_secret": (data or {}).get("broker_api_secret", ""),
-            "broker_api_key_market": (data or {}).get("broker_api_key_market", ""),
-            "broker_api_secret_market": (data or {}).get("broker_api_secret_market", ""),
-        }
-        result = self._reset_admin_user(instance, broker_creds)
+    def handle_health_check(self, data):
+        """Run oa-health-check.sh and return job id"""
+        scope = (data.get("scope") or "all").strip().lower()
+        instance = data.get("instance")
+
+        if scope not in ("all", "system", "instance"):
+            self.send_json({"error": "Invalid scope. Use all|system|instance"}, 400)
+            return
+
+        if scope == "instance":
+            instance = self._sanitize_instance(instance)
+            if not instance:
+                self.send_json({"error": "Invalid or missing instance"}, 400)
+                return
+
+        script_path = self._find_script("oa-health-check.sh")
+        if not script_path:
+            self.send_json({"error": "oa-health-check.sh not found"}, 500)
+            return
+
+        args = ["all"] if scope == "all" else ["system"] if scope == "system" else [instance]
+        job_id = self._create_job("health-check", {"scope": scope, "instance": instance})
+        command = _SUDO + ["bash", script_path] + args
+        Thread(target=self._run_script_job, args=(job_id, command, 300), daemon=True).start()
         self.send_json({
-            "status": "success" if result.get("reset") else "error",
-            "message": f"Factory reset complete for {instance}" if result.get("reset") else (result.get("error") or "Reset failed"),
-            "instance": instance,
-            "details": result,
-            "timestamp": str(datetime.now())
+            "status": "queued",
+            "job_id": job_id,
+            "message": "Health check started",
+            "timestamp": self._now_iso()
         })
 
-    def handle_reboot_server(self):
-        """Reboot the server with fallback"""
-        def _reboot():
-            try:
-                # Try primary reboot command
-                result = subprocess.run(
-                    "sudo systemctl reboot",
-                    shell=True, capture_output=True, timeout=10
-                )
-                # If primary fails, use fallback
-                if result.returncode != 0:
-                    subprocess.run(
-                        "sudo shutdown -r now",
-                        shell=True, capture_output=True, timeout=10
-                    )
-            except Exception as e:
-                # Final fallback
-                try:
-                    subprocess.run(
-                        "sudo shutdown -r now",
-                        shell=True, capture_output=True, timeout=10
-                    )
-                except:
-                    pass
+    def handle_update(self, data):
+        """Run oa-update.sh and return job id"""
+        scope = (data.get("scope") or "all").strip().lower()
+        instance = data.get("instance")
 
-        # Run reboot in background thread so response can be sent before shutdown
-        Thread(target=_reboot).start()
+        if scope not in ("all", "instance"):
+            self.send_json({"error": "Invalid scope. Use all|instance"}, 400)
+            return
 
+        if scope == "instance":
+            instance = self._sanitize_instance(instance)
+            if not instance:
+                self.send_json({"error": "Invalid or missing instance"}, 400)
+                return
+
+        script_path = self._find_script("oa-update.sh")
+        if not script_path:
+            self.send_json({"error": "oa-update.sh not found"}, 500)
+            return
+
+        args = ["update-all"] if scope == "all" else [instance]
+        job_id = self._create_job("update", {"scope": scope, "instance": instance})
+        command = _SUDO + ["bash", script_path] + args
+        Thread(target=self._run_script_job, args=(job_id, command, 1800), daemon=True).start()
         self.send_json({
-            "status": "success",
-            "message": "Server reboot initiated. The system will restart shortly.",
-            "timestamp": str(datetime.now())
+            "status": "queued",
+            "job_id": job_id,
+            "message": "Update started",
+            "timestamp": self._now_iso()
         })
 
-    def _restart_all(self, job_id):
-        """Background restart all.
+    def handle_scripts_status(self):
+        self.send_json(self._scripts_status())
 
-        The daily-restart script only exists if setup-daily-restart.sh was run, so
-        fall back to restarting each instance directly rather than failing.
-        """
-        script = '/usr/local/bin/openalgo-daily-restart.sh'
-        if os.path.exists(script):
-            self._run_script_job(job_id, [script], timeout=600)
-            return
+    def _scripts_status(self):
+        script_names = ["oa-health-check.sh", "oa-update.sh", "oa-backup.sh", "oa-clear-logs.sh", "oa-invalidate-session.sh", "oa-reset-admin.sh"]
+        scripts = {}
+        for name in script_names:
+            path = self._find_script(name)
+            scripts[name] = {"found": bool(path), "path": path}
 
-        self._update_job(job_id, status="running", started_at=self._now_iso())
-        lines = [f"{script} not found - restarting each instance directly"]
-        failed = []
-        for inst in self._list_instances():
+        missing = [name for name, info in scripts.items() if not info["found"]]
+
+        found_dirs = [os.path.dirname(info["path"]) for info in scripts.values() if info["path"]]
+        suggested_dir = None
+        if found_dirs:
+            counts = {}
+            for d in found_dirs:
+                counts[d] = counts.get(d, 0) + 1
+            suggested_dir = sorted(counts.items(), key=lambda x: (-x[1], x[0]))[0][0]
+        else:
+            base_dir = os.path.dirname(os.path.abspath(__file__))
+            default_root_dir = "/root/Simplifyed-Scripts"
             try:
-                service_name = self._service_name(inst)
-                result = subprocess.run(
-                    ["sudo", "systemctl", "restart", service_name],
-                    capture_output=True, text=True, timeout=60,
-                )
-                if result.returncode == 0:
-                    lines.append(f"restarted {service_name}")
-                else:
-                    failed.append(inst)
-                    lines.append(f"FAILED {service_name}: {(result.stderr or '').strip()}")
-            except Exception as e:
-                failed.append(inst)
-                lines.append(f"FAILED {inst}: {e}")
+                if any(name.endswith(".sh") for name in os.listdir(default_root_dir)):
+                    suggested_dir = default_root_dir
+                elif any(name.endswith(".sh") for name in os.listdir(base_dir)):
+                    suggested_dir = base_dir
+            except Exception:
+                suggested_dir = None
 
-        try:
-            subprocess.run(["sudo", "systemctl", "reload", "nginx"],
-                           capture_output=True, text=True, timeout=30)
-        except Exception as e:
-            lines.append(f"nginx reload failed: {e}")
+        suggested_fix = None
+        if suggested_dir:
+            suggested_fix = f"sudo ln -sf \"{suggested_dir}/\"*.sh /usr/local/bin/"
 
-        self._update_job(
-            job_id,
-            status="error" if failed else "success",
-            exit_code=1 if failed else 0,
-            error=f"Failed to restart: {', '.join(failed)}" if failed else None,
-            output="\n".join(lines),
-            finished_at=self._now_iso(),
-        )
+        return {
+            "scripts": scripts,
+            "missing": missing,
+            "suggested_dir": suggested_dir,
+            "suggested_fix": suggested_fix,
+            "timestamp": self._now_iso()
+        }
 
-    def serve_monitor_ui(self):
-        """Serve single-instance monitor UI"""
-        instance = self._resolve_monitor_instance() or ""
-        manager_domain = os.environ.get('MANAGER_DOMAIN', '').strip()
-        if manager_domain:
-            manager_url = f"https://{manager_domain}/"
-        else:
-            server_ip = get_server_ip()
-            manager_url = f"http://{server_ip}:{PORT}/" if server_ip else "/"
-        html = ("""<!DOCTYPE html>
-<html>
-<head>
-<meta charset="UTF-8">
-<meta name="viewport" content="width=device-width, initial-scale=1">
-<title>OpenAlgo Monitor</title>
-<style>""" + DASHBOARD_CSS + """</style>
-</head>
-<body>
-<div class="topbar">
-<div class="brand">
-<div class="brand-mark"><svg width="16" height="16" viewBox="0 0 24 24" fill="none" stroke="currentColor" stroke-width="2" stroke-linecap="round" stroke-linejoin="round"><path d="M3 12h4l3 8 4-16 3 8h4"/></svg></div>
-<div class="brand-text"><b>OpenAlgo</b><span>Instance Monitor</span></div>
-</div>
-<div class="topbar-right">
-<span class="live"><span class="dot pulse"></span><span class="live-text" id="last-updated">Loading…</span></span>
-<a class="icon-btn" href="__MANAGER_URL__" title="All Instances"><svg width="16" height="16" viewBox="0 0 24 24" fill="none" stroke="currentColor" stroke-width="2" stroke-linecap="round" stroke-linejoin="round"><rect x="3" y="3" width="7" height="7" rx="1"/><rect x="14" y="3" width="7" height="7" rx="1"/><rect x="14" y="14" width="7" height="7" rx="1"/><rect x="3" y="14" width="7" height="7" rx="1"/></svg></a>
-<button class="icon-btn" title="Refresh" onclick="loadInstance()"><svg width="16" height="16" viewBox="0 0 24 24" fill="none" stroke="currentColor" stroke-width="2" stroke-linecap="round" stroke-linejoin="round"><path d="M23 4v6h-6M1 20v-6h6"/><path d="M3.51 9a9 9 0 0114.85-3.36L23 10M1 14l4.64 4.36A9 9 0 0020.49 15"/></svg></button>
-<button class="icon-btn" title="Change Password" onclick="changePassword()"><svg width="16" height="16" viewBox="0 0 24 24" fill="none" stroke="currentColor" stroke-width="2" stroke-linecap="round" stroke-linejoin="round"><rect x="3" y="11" width="18" height="11" rx="2"/><path d="M7 11V7a5 5 0 0110 0v4"/></svg></button>
-<a class="icon-btn" href="/monitor/logout" title="Log out"><svg width="16" height="16" viewBox="0 0 24 24" fill="none" stroke="currentColor" stroke-width="2" stroke-linecap="round" stroke-linejoin="round"><path d="M9 21H5a2 2 0 01-2-2V5a2 2 0 012-2h4"/><path d="M16 17l5-5-5-5"/><path d="M21 12H9"/></svg></a>
-</div>
-</div>
-<main>
-<div id="toasts" role="status" aria-live="polite"></div>
+    def handle_terminal_dbs(self):
+        params = parse_qs(urlparse(self.path).query)
+        instance = self._sanitize_instance(params.get("instance", [None])[0])
+        if not instance:
+            instances = self._list_instances()
+            instance = instances[0] if instances else None
+        if not instance:
+            self.send_json({"error": "Invalid or missing instance"}, 400)
+            return
+        dbs = self._list_db_files(instance)
+        self.send_json({"instance": instance, "dbs": dbs, "timestamp": self._now_iso()})
 
-<div class="card">
-<div class="toolbar">
-<button class="btn btn-accent" onclick="loadInstance()">Refresh</button>
-<button class="btn" onclick="restartInstance()">Restart Instance</button>
-<button class="btn btn-warning" onclick="rebootServer()">Reboot Server</button>
-<button class="btn" onclick="clearLogs()">Clear Logs</button>
-<button class="btn" onclick="invalidateSession()">Invalidate Session</button>
-<div class="toolbar-danger"><button class="btn btn-danger" onclick="resetAdminUser()">Factory Reset</button></div>
-</div>
-</div>
+    def handle_terminal_run(self, data):
+        action = (data.get("action") or "").strip()
+        instance = self._sanitize_instance(data.get("instance"))
+        lines = data.get("lines", 100)
+        db_name = data.get("db")
+        query = data.get("query")
 
-<div id="system" class="card"></div>
+        allowed = {"systemctl_status", "journalctl_tail", "df", "free", "uptime", "sqlite_select"}
+        if action not in allowed:
+            self.send_json({"error": "Action not allowed"}, 400)
+            return
 
-<div class="card">
-<div class="card-head"><h2>Maintenance</h2></div>
-<div id="scripts-status" class="scripts-row"></div>
-<div class="toolbar" style="padding-top:0">
-<button id="btn-health-instance" class="btn" onclick="runHealthCheck()">Health Check</button>
-<button id="btn-update-instance" class="btn" onclick="updateInstance()">Update Instance</button>
-</div>
-<div id="maintenance-status" class="maintenance-status"></div>
-<div id="maintenance-output" class="maintenance-output"><pre id="maintenance-output-pre"></pre></div>
-</div>
+        try:
+            lines = int(lines)
+        except Exception:
+            lines = 100
+        if lines < 10:
+            lines = 10
+        if lines > 500:
+            lines = 500
 
-<div id="loading" class="loading"><div class="spinner"></div><p>Loading instance...</p></div>
-<div id="instance"></div>
-</main>
+        cmd = None
+        if action in ("systemctl_status", "journalctl_tail"):
+            if not instance:
+                instances = self._list_instances()
+                instance = instances[0] if instances else None
+            if not instance:
+                self.send_json({"error": "Instance required for this action"}, 400)
+                return
+            service_name = self._service_name(instance)
+            if action == "systemctl_status":
+                cmd = ["systemctl", "status", service_name, "--no-pager"]
+            else:
+                cmd = ["journalctl", "-u", service_name, "-n", str(lines), "--no-pager"]
+        elif action == "df":
+            cmd = ["df", "-h"]
+        elif action == "free":
+            cmd = ["free", "-h"]
+        elif action == "uptime":
+            cmd = ["uptime"]
+        elif action == "sqlite_select":
+            if not instance:
+                instances = self._list_instances()
+                instance = instances[0] if instances else None
+            if not instance:
+                self.send_json({"error": "Instance required for sqlite query"}, 400)
+                return
+            if not query or not self._is_safe_select(query):
+                self.send_json({"error": "Only single SELECT statements are allowed"}, 400)
+                return
+            if not db_name or not str(db_name).endswith(".db"):
+                self.send_json({"error": "DB name required"}, 400)
+                return
+            dbs = self._list_db_files(instance)
+            if db_name not in dbs:
+                self.send_json({"error": "DB not allowed"}, 400)
+                return
+            db_path = f"/var/python/openalgo-flask/{instance}/db/{db_name}"
+            if not shutil.which("sqlite3"):
+                self.send_json({"error": "sqlite3 not installed"}, 400)
+                return
+            cmd = ["sqlite3", db_path, "-header", "-column", query]
 
-<dialog id="resetAdminDialog" class="reset-admin-dialog">
-<form method="dialog" id="resetAdminForm">
-<h3 style="margin:0 0 10px;color:var(--danger);display:flex;align-items:center;gap:8px;font-size:16px"><svg width="18" height="18" viewBox="0 0 24 24" fill="none" stroke="currentColor" stroke-width="2" stroke-linecap="round" stroke-linejoin="round"><path d="M10.29 3.86L1.82 18a2 2 0 001.71 3h16.94a2 2 0 001.71-3L13.71 3.86a2 2 0 00-3.42 0z"/><path d="M12 9v4M12 17h.01"/></svg>Factory Reset</h3>
-<p style="font-size:13px;color:var(--text-dim);margin:0 0 15px;line-height:1.5">Deletes all users and clears the broker login session for this instance. The next visit will require first-time admin setup and a fresh broker login. Use only when there's no TOTP/QR reset and no working SMTP.</p>
-<div class="reset-section">
-<label class="reset-field-label">Broker</label>
-<select id="resetBroker" class="reset-input" onchange="updateCallbackPreview()">
-<option value="">Keep current broker</option>
-</select>
-<div id="resetCallbackPreview" class="reset-preview"></div>
-</div>
-<label class="reset-checkbox-label"><input type="checkbox" id="resetRotateCreds" onchange="document.getElementById('resetCredsFields').style.display=this.checked?'block':'none'"> Also update broker API key/secret in .env</label>
-<div id="resetCredsFields" style="display:none">
-<label class="reset-field-label">New BROKER_API_KEY</label>
-<input type="text" id="resetApiKey" class="reset-input" placeholder="Leave blank to keep existing">
-<label class="reset-field-label">New BROKER_API_SECRET</label>
-<input type="password" id="resetApiSecret" class="reset-input" placeholder="Leave blank to keep existing">
-<label class="reset-checkbox-label"><input type="checkbox" id="resetXts" onchange="document.getElementById('resetXtsFields').style.display=this.checked?'block':'none'"> This broker also needs separate market-data credentials (XTS-based)</label>
-<div id="resetXtsFields" style="display:none">
-<label class="reset-field-label">New BROKER_API_KEY_MARKET</label>
-<input type="text" id="resetApiKeyMarket" class="reset-input" placeholder="Leave blank to keep existing">
-<label class="reset-field-label">New BROKER_API_SECRET_MARKET</label>
-<input type="password" id="resetApiSecretMarket" class="reset-input" placeholder="Leave blank to keep existing">
-</div>
-</div>
-<div class="reset-dialog-actions">
-<button type="button" class="btn btn-ghost" onclick="document.getElementById('resetAdminDialog').close()">Cancel</button>
-<button type="submit" value="confirm" class="btn btn-danger">Factory Reset</button>
-</div>
-</form>
-</dialog>
+        if not cmd:
+            self.send_json({"error": "Command not available"}, 400)
+            return
+
+        try:
+            result = subprocess.run(
+                cmd,
+                capture_output=True,
+                text=True,
+                timeout=15
+            )
+            output = (result.stdout or "") + ("\n" + result.stderr if result.stderr else "")
+            output = self._strip_ansi(output)
+            output = self._truncate_output(output)
+            self.send_json({
+                "status": "success" if result.returncode == 0 else "error",
+                "exit_code": result.returncode,
+                "output": output.strip(),
+                "timestamp": self._now_iso()
+            })
+        except subprocess.TimeoutExpired:
+            self.send_json({"error": "Command timed out"}, 504)
+        except Exception as e:
+            self.send_json({"error": str(e)}, 500)
+
+    def _check_domain_http(self, domain):
+        """Check if the main app domain responds over HTTPS."""
+        url = f"https://{domain}/"
+        try:
+            req = urllib.request.Request(url, headers={"User-Agent": "OpenAlgo-Monitor/1.0"})
+            with urllib.request.urlopen(req, timeout=10, context=_TLS_CONTEXT) as resp:
+                return {"reachable": True, "status_code": resp.status, "url": url}
+        except urllib.error.HTTPError as e:
+            return {"reachable": True, "status_code": e.code, "url": url}
+        except Exception as e:
+            return {"reachable": False, "status_code": None, "error": str(e)[:120], "url": url}
 
-<dialog id="changePasswordDialog" class="reset-admin-dialog">
-<form method="dialog" id="changePasswordForm">
-<h3 style="margin:0 0 10px;display:flex;align-items:center;gap:8px;font-size:16px"><svg width="18" height="18" viewBox="0 0 24 24" fill="none" stroke="currentColor" stroke-width="2" stroke-linecap="round" stroke-linejoin="round"><rect x="3" y="11" width="18" height="11" rx="2"/><path d="M7 11V7a5 5 0 0110 0v4"/></svg>Change Admin Password</h3>
-<label class="reset-field-label">Current Password</label>
-<input type="password" id="cpCurrent" class="reset-input" autocomplete="current-password" required>
-<label class="reset-field-label">New Password</label>
-<input type="password" id="cpNew" class="reset-input" autocomplete="new-password" required>
-<label class="reset-field-label">Confirm New Password</label>
-<input type="password" id="cpConfirm" class="reset-input" autocomplete="new-password" required>
-<div class="reset-dialog-actions">
-<button type="button" class="btn btn-ghost" onclick="document.getElementById('changePasswordDialog').close()">Cancel</button>
-<button type="submit" value="confirm" class="btn btn-accent">Change Password</button>
-</div>
-</form>
-</dialog>
+    def _probe_socket(self, instance):
+        """Does the instance's gunicorn socket actually answer HTTP?
 
-<script>""" + DASHBOARD_JS_COMMON + """
-const monitorInstance="__INSTANCE__";
-let resolvedInstance=null;
-let logsLoaded=false;
-const monitorApiBase='/monitor/api';
-const apiBase=monitorApiBase;
-async function fetchJson(url, options){
-const opts=options||{};
-const headers=new Headers(opts.headers||{});
-if(url.startsWith(monitorApiBase)){
-const inst=resolvedInstance||monitorInstance;
-if(inst){headers.set('X-OpenAlgo-Instance',inst);}
-}
-opts.headers=headers;
-const r=await fetch(url,opts);
-if(r.status===401){
-window.location.href=`/monitor/login?next=${encodeURIComponent(location.pathname+location.search)}`;
-return new Promise(()=>{});
-}
-const text=await r.text();
-const contentType=(r.headers.get('content-type')||'').toLowerCase();
-try{
-return JSON.parse(text);
-}catch(e){
-const preview=text.replace(/\\s+/g,' ').slice(0,160);
-throw new Error(`Invalid JSON from ${url} (status ${r.status}, type ${contentType||'unknown'}): ${preview}`);
-}
-}
-let lastHealth=null;
-async function loadInstance(){
-if(!monitorInstance){
-showAlert('Instance not specified. Use /monitor?instance=openalgo1','error');
-document.getElementById('loading').style.display='none';
-return;
-}
-try{
-document.getElementById('loading').style.display='block';
-const h=await fetchJson(`${monitorApiBase}/health`);
-const scriptsStatus=await fetchJson(`${monitorApiBase}/scripts-status`);
-document.getElementById('loading').style.display='none';
-if(h.error){
-showAlert(h.error,'error');
-return;
-}
-lastHealth=h;
-renderSystem(h.system,h.access);
-renderScriptsStatus(scriptsStatus);
-renderInstance(h);
-const lu=document.getElementById('last-updated');
-if(lu){lu.textContent='Live · updated '+new Date().toLocaleTimeString();}
-}catch(e){
-showAlert('Error: '+e.message,'error');
-}
-}
-function applyScriptsAvailability(scripts){
-const healthOk=!!(scripts&&scripts['oa-health-check.sh']&&scripts['oa-health-check.sh'].found);
-const updateOk=!!(scripts&&scripts['oa-update.sh']&&scripts['oa-update.sh'].found);
-const btnHealth=document.getElementById('btn-health-instance');
-const btnUpdate=document.getElementById('btn-update-instance');
-if(btnHealth){btnHealth.disabled=!healthOk;btnHealth.title=healthOk?'':'oa-health-check.sh not found';}
-if(btnUpdate){btnUpdate.disabled=!updateOk;btnUpdate.title=updateOk?'':'oa-update.sh not found';}
-}
-function renderInstance(h){
-const inst=h.name||monitorInstance;
-resolvedInstance=inst||resolvedInstance;
-const active=h.status==='active'&&!h.wedged;
-const broker=h.broker||'Unknown';
-const domain=h.domain||'Unknown';
-const authName=h.auth_name||'Unknown';
-const authStatus=h.auth_status||((h.session_valid!==false)?'User Authenticated':'Not Authenticated');
-const isAuthenticated=authStatus==='User Authenticated';
-const brokerAuthBadge=isAuthenticated?`<span class="badge badge-authenticated">${authStatus}</span>`:`<span class="badge badge-unauthenticated">${authStatus}</span>`;
-const mc=h.master_contract||{};
-const mcReady=mc.is_ready===true;
-const mcStatus=mc.status||'Master Contract Data Not Ready';
-const mcBadge=mcReady?`<span class="badge badge-authenticated">${mcStatus}</span>`:`<span class="badge badge-unauthenticated">${mcStatus}</span>`;
-const mcLast=mc.last_updated||'Unknown';
-const mcSymbols=(mc.total_symbols!==undefined&&mc.total_symbols!==null)?mc.total_symbols:'N/A';
-const mcBroker=mc.broker||'Unknown';
-const mcMessage=mc.message||'N/A';
-const git=h.git||{};
-const gitCurrent=git.current_commit||'N/A';
-const gitLatest=git.latest_commit||'N/A';
-const gitBehind=(git.behind!==null&&git.behind!==undefined)?`${git.behind} behind`:'';
-const gitUpdated=git.current_date||'Unknown';
-const gitSummary=gitCurrent===gitLatest?`${gitCurrent} (up to date)`:`${gitCurrent} → ${gitLatest} ${gitBehind}`.trim();
-const dc=h.domain_check||{};
-const dcOk=dc.reachable===true&&dc.status_code>=200&&dc.status_code<400;
-const dcClass=dcOk?'ok':(dc.reachable?'':'bad');
-const dcBadge=dcOk?`<span class="badge badge-authenticated">${ICON_CHECK} ${dc.status_code} OK</span>`:`<span class="badge badge-unauthenticated">${ICON_X} ${dc.reachable?dc.status_code:'Unreachable'}</span>`;
-const dcExtra=dc.error?`<div style="color:var(--danger);font-size:11px;margin-top:3px">${escapeHtml(dc.error)}</div>`:'';
-const dcHtml=domain!=='Unknown'&&h.domain_check!==undefined?`<div class="domain-check ${dcClass}"><strong>App Reachability</strong> | <a href="https://${domain}" target="_blank" rel="noopener">${domain}</a> | ${dcBadge}${dcExtra}</div>`:'';
-const actions=active
-?`<button class="btn btn-sm btn-danger" onclick="stopInstance()">Stop</button>`
-:`<button class="btn btn-sm btn-success" onclick="startInstance()">Start</button>`;
-document.getElementById('instance').innerHTML=`<div class="card"><div class="instance-header"><div class="instance-name">${inst}<span class="badge ${active?'badge-active':'badge-inactive'}">${active?ICON_CHECK+' Active':ICON_X+(h.wedged?' Wedged':' Inactive')}</span></div></div><div class="detail-grid"><div class="detail-item"><div class="detail-label">Domain</div><div class="detail-value">${domain!=='Unknown'?`<a href="https://${domain}" target="_blank" rel="noopener">${domain} ↗</a>`:domain}</div></div><div class="detail-item"><div class="detail-label">Env Version</div><div class="detail-value">${h.env_version||'—'}</div></div><div class="detail-item"><div class="detail-label">Status</div><div class="detail-value ${active?'active':'inactive'}">${h.wedged?'active (wedged - not serving)':(h.status||'unknown')}</div></div><div class="detail-item"><div class="detail-label">Flask Port</div><div class="detail-value">${h.port||'N/A'}</div></div><div class="detail-item"><div class="detail-label">Database</div><div class="detail-value status-inline">${h.database?ICON_CHECK+' Present':ICON_X+' Missing'}</div></div><div class="detail-item"><div class="detail-label">Git</div><div class="detail-value mono">${gitSummary}</div></div><div class="detail-item"><div class="detail-label">Code Updated</div><div class="detail-value">${gitUpdated}</div></div></div>${dcHtml}<div class="subpanel ${isAuthenticated?'ok':'bad'}"><div class="subpanel-title">${authName} | Broker: ${broker} ${brokerAuthBadge}</div></div><div class="subpanel ${mcReady?'ok':'bad'}"><div class="subpanel-title">Master Contract Data ${mcBadge}</div><div class="subpanel-grid"><div><div class="detail-label">Last Updated</div><div class="detail-value">${mcLast}</div></div><div><div class="detail-label">Total Symbols</div><div class="detail-value">${mcSymbols}</div></div><div><div class="detail-label">Broker</div><div class="detail-value">${mcBroker}</div></div><div><div class="detail-label">Message</div><div class="detail-value">${mcMessage}</div></div></div></div><button class="logs-toggle" onclick="toggleLogs()">${ICON_LOGS}View Logs${ICON_CHEVRON}</button><div id="logs" class="logs-section"><div class="logs-container" id="logs-content"><p style="color:var(--text-faint)">Loading logs...</p></div></div><div class="actions"><button class="btn btn-sm" onclick="restartInstance()">Restart</button><div class="danger-group">${actions}</div></div></div>`;
-}
-function toggleLogs(){
-const logsSection=document.getElementById('logs');
-if(!logsSection)return;
-logsSection.classList.toggle('show');
-document.querySelector('.logs-toggle')?.classList.toggle('open');
-if(logsSection.classList.contains('show')&&!logsLoaded){
-fetchLogs();
-}
-}
-async function fetchLogs(){
-try{
-const data=await fetchJson(`${monitorApiBase}/logs`);
-const logsContent=document.getElementById('logs-content');
-if(data.logs&&data.logs.length>0){
-const html=data.logs.map(log=>{
-const lowerLog=log.toLowerCase();
-const hasAuthError=(lowerLog.includes('session expired')||lowerLog.includes('invalid session detected')||lowerLog.includes('no valid auth token'));
-const hasSuccess=(lowerLog.includes('master contract download completed')||lowerLog.includes('successfully loaded'));
-return`<div class="log-line ${hasAuthError?'log-error':''}${hasSuccess?'log-success':''}">${escapeHtml(log)}</div>`;
-}).join('');
-logsContent.innerHTML=html;
-logsLoaded=true;
-}else{
-logsContent.innerHTML='<p style="color:var(--text-faint)">No logs available</p>';
-}
-}catch(e){
-document.getElementById('logs-content').innerHTML=`<p style="color:var(--danger)">Error loading logs: ${e.message}</p>`;
-}
-}
-async function post(path){
-return fetchJson(path,{method:'POST'});
-}
-async function restartInstance(){
-if(!confirm('Restart this instance? This will invalidate the session.'))return;
-showAlert('Restarting instance and invalidating session...','info');
-await post('/monitor/api/restart');
-setTimeout(loadInstance,1000);
-}
-async function stopInstance(){
-if(!confirm('Stop this instance?'))return;
-showAlert('Stopping instance...','info');
-await post('/monitor/api/stop');
-setTimeout(loadInstance,1000);
-}
-async function startInstance(){
-if(!confirm('Start this instance?'))return;
-showAlert('Starting instance...','info');
-await post('/monitor/api/start');
-setTimeout(loadInstance,1000);
-}
-async function clearLogs(){
-if(!confirm('Clear all log files for this instance?'))return;
-showAlert('Clearing logs...','info');
-try{
-const res=await post('/monitor/api/clear-logs');
-if(res&&res.error){
-showAlert(res.error,'error');
-return;
-}
-const msg=res&&res.message?res.message:'Logs cleared';
-showAlert(msg,'success');
-}catch(e){
-showAlert('Error: '+e.message,'error');
-return;
-}
-logsLoaded=false;
-setTimeout(loadInstance,1000);
-}
-async function invalidateSession(){
-if(!confirm('Invalidate the session for this instance? This will clear auth tokens and revoke the session.'))return;
-showAlert('Invalidating session...','info');
-await post('/monitor/api/invalidate-session');
-setTimeout(loadInstance,1000);
-}
-let resetDialogHealth=null;
-function openResetAdminDialog(health){
-resetDialogHealth=health||{};
-const dlg=document.getElementById('resetAdminDialog');
-document.getElementById('resetAdminForm').reset();
-populateBrokerSelect();
-document.getElementById('resetCredsFields').style.display='none';
-document.getElementById('resetXtsFields').style.display='none';
-return new Promise(resolve=>{
-dlg.returnValue='';
-dlg.showModal();
-dlg.onclose=function(){
-if(dlg.returnValue!=='confirm'){resolve(null);return;}
-const broker=document.getElementById('resetBroker').value;
-if(!document.getElementById('resetRotateCreds').checked){resolve(broker?{broker:broker}:{});return;}
-const xts=document.getElementById('resetXts').checked;
-resolve({
-broker:broker,
-broker_api_key:document.getElementById('resetApiKey').value.trim(),
-broker_api_secret:document.getElementById('resetApiSecret').value.trim(),
-broker_api_key_market:xts?document.getElementById('resetApiKeyMarket').value.trim():'',
-broker_api_secret_market:xts?document.getElementById('resetApiSecretMarket').value.trim():''
-});
-};
-});
-}
-async function resetAdminUser(){
-const creds=await openResetAdminDialog(lastHealth);
-if(creds===null)return;
-showAlert('Resetting admin user...','info');
-try{
-const res=await fetchJson('/monitor/api/reset-admin-user',{method:'POST',headers:{'Content-Type':'application/json'},body:JSON.stringify(creds)});
-const msg=res&&res.message?res.message:'Factory reset complete';
-showAlert(msg,res&&res.status==='error'?'error':'success');
-}catch(e){
-showAlert('Error: '+e.message,'error');
-return;
-}
-setTimeout(loadInstance,1000);
-}
-function runHealthCheck(){
-const target=resolvedInstance||monitorInstance;
-if(!target){
-showAlert('Instance not specified. Use /monitor?instance=openalgo1','error');
-return;
-}
-startJob(`${monitorApiBase}/health-check`,{scope:'instance',instance:target},`Health Check (${target})`);
-}
-function updateInstance(){
-const target=resolvedInstance||monitorInstance;
-if(!target){
-showAlert('Instance not specified. Use /monitor?instance=openalgo1','error');
-return;
-}
-if(!confirm(`Update ${target}? This can take several minutes.`))return;
-startJob(`${monitorApiBase}/update`,{scope:'instance',instance:target},`Update ${target}`);
-}
-window.addEventListener('load',loadInstance);
-setInterval(loadInstance,30000);
-</script>
-</body>
-</html>""")
+        True = serving, False = wedged (accepts but never responds), None = no socket
+        to probe or the probe itself broke. Any HTTP status counts as healthy; a
+        redirect to the login page is a perfectly good answer.
+        """
+        socket_file = f"/var/python/openalgo-flask/{instance}/openalgo.sock"
+        if not os.path.exists(socket_file):
+            return None
+        try:
+            result = subprocess.run(
+                ["sudo", "-u", "www-data", "curl", "-s", "-m", "5",
+                 "-o", "/dev/null", "-w", "%{http_code}",
+                 "--unix-socket", socket_file, "http://localhost/"],
+                capture_output=True, text=True, timeout=10,
+            )
+        except Exception:
+            return None
+        code = (result.stdout or "").strip()
+        return bool(code) and code != "000"
+
+    def _get_instance_health(self, instance, status=None):
+        """Get detailed health info for a single instance.
+
+        Callers sweeping many instances pass `status` from one batched
+        _active_states() call instead of probing each unit separately.
+        """
+        health = {"name": instance, "status": "unknown", "serving": None, "wedged": False, "port": None, "database": False, "broker": None, "domain": None, "env_version": None, "auth_name": None, "auth_status": None, "session_valid": True, "master_contract": None, "git": None, "valid_brokers": []}
 
-        html = html.replace("__INSTANCE__", instance).replace("__MANAGER_URL__", manager_url)
-        html_bytes = html.encode('utf-8')
-        self.send_response(200)
-        self.send_header('Content-Type', 'text/html; charset=utf-8')
-        self.send_header('Cache-Control', 'no-store, no-cache, must-revalidate')
-        self.send_header('Pragma', 'no-cache')
-        self.send_header('Expires', '0')
-        self.send_header('Content-Length', len(html_bytes))
-        self.end_headers()
-        self.wfile.write(html_bytes)
+        if status is None:
+            status = self._active_states([instance])[instance]
+        health["status"] = status
 
-    def serve_web_ui(self):
-        """Serve HTML dashboard"""
-        html = ("""<!DOCTYPE html>
-<html>
-<head>
-<meta charset="UTF-8">
-<meta name="viewport" content="width=device-width, initial-scale=1">
-<title>OpenAlgo Manager</title>
-<style>""" + DASHBOARD_CSS + """</style>
-</head>
-<body>
-<div class="topbar">
-<div class="brand">
-<div class="brand-mark"><svg width="16" height="16" viewBox="0 0 24 24" fill="none" stroke="currentColor" stroke-width="2" stroke-linecap="round" stroke-linejoin="round"><path d="M3 12h4l3 8 4-16 3 8h4"/></svg></div>
-<div class="brand-text"><b>OpenAlgo</b><span>Instance Manager</span></div>
-</div>
-<div class="topbar-right">
-<span class="live"><span class="dot pulse"></span><span class="live-text" id="last-updated">Loading…</span></span>
-<button class="icon-btn" title="Refresh" onclick="loadInstances()"><svg width="16" height="16" viewBox="0 0 24 24" fill="none" stroke="currentColor" stroke-width="2" stroke-linecap="round" stroke-linejoin="round"><path d="M23 4v6h-6M1 20v-6h6"/><path d="M3.51 9a9 9 0 0114.85-3.36L23 10M1 14l4.64 4.36A9 9 0 0020.49 15"/></svg></button>
-<button class="icon-btn" title="Change Password" onclick="changePassword()"><svg width="16" height="16" viewBox="0 0 24 24" fill="none" stroke="currentColor" stroke-width="2" stroke-linecap="round" stroke-linejoin="round"><rect x="3" y="11" width="18" height="11" rx="2"/><path d="M7 11V7a5 5 0 0110 0v4"/></svg></button>
-<a class="icon-btn" href="/logout" title="Log out"><svg width="16" height="16" viewBox="0 0 24 24" fill="none" stroke="currentColor" stroke-width="2" stroke-linecap="round" stroke-linejoin="round"><path d="M9 21H5a2 2 0 01-2-2V5a2 2 0 012-2h4"/><path d="M16 17l5-5-5-5"/><path d="M21 12H9"/></svg></a>
-</div>
-</div>
-<main>
-<div id="toasts" role="status" aria-live="polite"></div>
+        # is-active is not liveness. A wedged eventlet worker keeps the process and
+        # the socket alive while every request hangs into an nginx 504, and is-active
+        # says "active" throughout. Only an end-to-end request over the socket sees
+        # it - same probe as check_socket() in oa-health-check.sh.
+        if health["status"] == "active":
+            health["serving"] = self._probe_socket(instance)
+            health["wedged"] = health["serving"] is False
 
-<div class="card">
-<div class="card-head"><h2>Summary</h2></div>
-<div id="summary" class="kpi-row"><div class="kpi"><div class="kpi-label">Instances</div><div class="kpi-value">Loading…</div></div></div>
-</div>
+        # Resolved once here and reused for the auth read below; finding it can
+        # mean probing every .db in the instance for an auth table. Only the
+        # filesystem can fail in these lookups - the sqlite readers already turn
+        # their own errors into a status - so nothing broader is caught.
+        db_file = None
+        try:
+            db_file = self._get_auth_db_file(instance)
+        except OSError:
+            pass
+        health["database"] = bool(db_file)
 
-<div id="system" class="card"></div>
+        try:
+            env = self._read_env(instance)
+        except OSError:
+            env = {}
+        health["domain"] = env.get("DOMAIN") or None
+        health["port"] = env.get("FLASK_PORT") or None
+        health["env_version"] = env.get("ENV_CONFIG_VERSION") or None
+        raw = env.get("VALID_BROKERS", "")
+        health["valid_brokers"] = [b.strip() for b in raw.split(",") if b.strip()]
+        match = _CALLBACK_RE.search(env.get("REDIRECT_URL", ""))
+        if match:
+            health["broker"] = match.group(1)
+
+        authenticated, last_error, broker_db, name_db = self._auth_status_from_db(db_file)
+        health["session_valid"] = authenticated
+        if broker_db:
+            health["broker"] = broker_db
+        if name_db:
+            health["auth_name"] = name_db
+        if last_error:
+            health["auth_status"] = last_error
+        elif authenticated:
+            health["auth_status"] = "User Authenticated"
 
-<div class="card">
-<div class="card-head"><h2>Maintenance</h2></div>
-<div id="scripts-status" class="scripts-row"></div>
-<div class="toolbar" style="padding-top:0">
-<button id="btn-health-all" class="btn" onclick="runHealthCheck('all')">Health Check (All)</button>
-<button id="btn-health-system" class="btn" onclick="runHealthCheck('system')">Health Check (System)</button>
-<button id="btn-update-all" class="btn" onclick="updateAll()">Update All Instances</button>
-</div>
-<div id="maintenance-status" class="maintenance-status"></div>
-<div id="maintenance-output" class="maintenance-output"><pre id="maintenance-output-pre"></pre></div>
-</div>
+        try:
+            health["master_contract"] = self._get_master_contract_status(instance)
+        except OSError:
+            pass
 
-<div class="card">
-<div class="card-head"><h2>Terminal <span class="card-sub" style="margin-left:6px;font-weight:400">(safe, read-only commands)</span></h2></div>
-<div class="terminal-grid">
-<div class="field">
-<span class="field-label">Action</span>
-<select id="term-action">
-<option value="systemctl_status">Systemctl Status</option>
-<option value="journalctl_tail">Journalctl Tail</option>
-<option value="df">Disk Usage (df -h)</option>
-<option value="free">Memory (free -h)</option>
-<option value="uptime">Uptime</option>
-<option value="sqlite_select">sqlite3 SELECT</option>
-</select>
-</div>
-<div id="term-instance-wrap" class="field">
-<span class="field-label">Instance</span>
-<select id="term-instance"></select>
-</div>
-<div id="term-lines-wrap" class="field">
-<span class="field-label">Lines</span>
-<input id="term-lines" type="number" min="10" max="500" value="100"/>
-</div>
-<div id="term-db-wrap" class="field">
-<span class="field-label">DB</span>
-<select id="term-db"></select>
-</div>
-</div>
-<div id="term-query-wrap" class="field" style="padding:0 20px;margin-top:12px">
-<span class="field-label">Query (SELECT only)</span>
-<textarea id="term-query"></textarea>
-</div>
-<div class="terminal-run"><button class="btn btn-accent" onclick="runTerminal()">Run Command</button></div>
-<div class="terminal-output"><pre id="term-output">Ready.</pre></div>
-</div>
+        if health.get("domain"):
+            try:
+                health["domain_check"] = self._check_domain_http(health["domain"])
+            except Exception:
+                health["domain_check"] = {"reachable": False, "error": "check failed", "url": ""}
+
+        try:
+            health["git"] = self._get_git_info(instance)
+        except Exception:
+            pass
+
+        return health
+    
+    def handle_health(self):
+        """Health check"""
+        # Only the timestamp varies and it has second resolution, so the
+        # encoded body is reused until the clock ticks.
+        timestamp = self._now_iso()
+        cached = RestartHandler.HEALTH_BODY_CACHE
+        if cached[0] != timestamp:
+            cached = (timestamp, _json_dumps({
+                "status": "healthy",
+                "service": "OpenAlgo Restart API",
+                "timestamp": timestamp
+            }))
+            RestartHandler.HEALTH_BODY_CACHE = cached
+        self._send_json_bytes(cached[1])
+
+    def handle_change_password(self, data):
+        """Change the admin password (requires the current one)"""
+        creds = load_credentials()
+        if not creds:
+            self.send_json({"error": "No admin account configured"}, 400)
+            return
+        current_password = data.get('current_password', '')
+        new_password = data.get('new_password', '')
+        if not verify_password(current_password, creds.get('hash', '')):
+            self.send_json({"error": "Current password is incorrect"}, 401)
+            return
+        if not new_password:
+            self.send_json({"error": "New password cannot be empty"}, 400)
+            return
+        save_credentials(creds.get('username'), new_password)
+        self.send_json({"status": "success", "message": "Password changed successfully"})
+    
+    def handle_restart_all(self):
+        """Restart all instances"""
+        # Repeated clicks join the running sweep instead of stacking another
+        # 600 s script run behind it. "*" can never be an instance name.
+        job_id, running = self._submit_restart("*", "restart-all", {}, self._restart_all)
+        if running:
+            self.send_json({
+                "status": "error",
+                "error": "A restart of all instances is already in progress",
+                "job_id": running,
+            }, 409)
+            return
+
+        self.send_json({
+            "status": "queued",
+            "job_id": job_id,
+            "message": "Restart triggered for all instances",
+            "timestamp": self._now_iso()
+        })
+
+    def handle_restart_instance(self, instance):
+        """Restart specific instance"""
+        try:
+            service_name = self._service_name(instance)
+        except ValueError as e:
+            self.send_json({"error": str(e), "instance": instance}, 400)
+            return
+
+        job_id, running = self._submit_restart(
+            instance, "restart-instance", {"instance": instance},
+            self._restart_instance_background, instance, service_name,
+        )
+        if running:
+            self.send_json({
+                "status": "error",
+                "error": f"A restart of {instance} is already in progress",
+                "job_id": running,
+                "instance": instance,
+            }, 409)
+            return
+
+        self.send_json({
+            "status": "queued",
+            "job_id": job_id,
+            "message": f"Restart queued for {instance}",
+            "instance": instance,
+            "service": service_name,
+            "timestamp": self._now_iso()
+        })
+
+    def _clear_instance_logs_quick(self, instance):
+        """Delete per-instance log files without running full system cleanup."""
+        inst_path = f"/var/python/openalgo-flask/{instance}"
+        deleted = 0
+
+        for log_dir_name in ("log", "logs"):
+            deleted += self._remove_tree_files(os.path.join(inst_path, log_dir_name))
+        return deleted
+
+    def _remove_tree_files(self, top):
+        """Delete every file below `top` and prune emptied subdirectories.
+
+        scandir reports each entry's type with the listing, so there is no
+        extra stat or path join per file as with os.walk. `top` itself is kept.
+        Returns the number of files removed.
+        """
+        deleted = 0
+        try:
+            entries = list(os.scandir(top))
+        except OSError:
+            return 0
+        for entry in entries:
+            try:
+                if entry.is_dir(follow_symlinks=False):
+                    deleted += self._remove_tree_files(entry.path)
+                    os.rmdir(entry.path)
+                else:
+                    os.unlink(entry.path)
+                    deleted += 1
+            except OSError:
+                continue
+        return deleted
+
+    def _restart_instance_background(self, job_id, instance, service_name):
+        """Run restart-related work without blocking the monitor HTTP server.
+
+        The restart itself decides the job outcome; session-invalidation and log
+        clearing are best-effort housekeeping and only get noted in the output.
+        """
+        self._update_job(job_id, status="running", started_at=self._now_iso())
+        notes = []
+
+        for label, fn in (("invalidate-session", lambda: self._invalidate_session(instance)),
+                          ("clear-logs", lambda: self._clear_instance_logs_quick(instance))):
+            try:
+                fn()
+            except Exception as e:
+                notes.append(f"{label} failed (non-fatal): {e}")
+
+        try:
+            result = subprocess.run(
+                _SYSTEMCTL + ["restart", service_name],
+                capture_output=True, text=True, timeout=60,
+            )
+        except Exception as e:
+            self._update_job(job_id, status="error", error=f"systemctl restart failed: {e}",
+                             output="\n".join(notes), finished_at=self._now_iso())
+            return
+        self._forget_active_state(service_name)
+
+        if result.returncode != 0:
+            self._update_job(
+                job_id, status="error", exit_code=result.returncode,
+                error=(result.stderr or "").strip() or f"systemctl restart {service_name} failed",
+                output="\n".join(notes + [(result.stdout or "").strip()]).strip(),
+                finished_at=self._now_iso(),
+            )
+            return
+
+        try:
+            nginx = subprocess.run(
+                _SYSTEMCTL + ["reload", "nginx"],
+                capture_output=True, text=True, timeout=30,
+            )
+            if nginx.returncode != 0:
+                notes.append(f"nginx reload failed: {(nginx.stderr or '').strip()}")
+        except Exception as e:
+            notes.append(f"nginx reload failed: {e}")
+
+        self._update_job(
+            job_id, status="success", exit_code=0,
+            output="\n".join(notes + [f"Restarted {service_name}"]).strip(),
+            finished_at=self._now_iso(),
+        )
+
+    def _systemctl(self, instance, verbs, ok_message):
+        """Run systemctl verbs against an instance and report what actually happened.
+
+        Anything that fails is reported as a failure - a caller (the fleet manager,
+        the dashboard) that is told "success" for a no-op cannot manage anything.
+        """
+        try:
+            service_name = self._service_name(instance)
+        except ValueError as e:
+            self.send_json({"error": str(e), "instance": instance}, 400)
+            return
+
+        for verb in verbs:
+            try:
+                result = subprocess.run(
+                    _SYSTEMCTL + [verb, service_name],
+                    capture_output=True, text=True, timeout=30,
+                )
+            except Exception as e:
+                self.send_json({
+                    "status": "error", "instance": instance, "service": service_name,
+                    "error": f"systemctl {verb} failed: {e}",
+                }, 500)
+                return
+
+            self._forget_active_state(service_name)
+            if result.returncode != 0:
+                self.send_json({
+                    "status": "error", "instance": instance, "service": service_name,
+                    "exit_code": result.returncode,
+                    "error": (result.stderr or "").strip() or f"systemctl {verb} {service_name} failed",
+                }, 500)
+                return
 
-<div class="card">
-<div class="toolbar">
-<button class="btn" onclick="restartAll()">Restart All Instances</button>
-<button class="btn btn-accent" onclick="loadInstances()">Refresh</button>
-<button class="btn btn-warning" onclick="rebootServer()">Reboot Server</button>
-</div>
-</div>
+        # The unit state was just forgotten, so this is one fresh is-active; the
+        # page updates the one card from it and its next poll fills in the rest.
+        # Not the full health probe - that would hold every caller for a socket
+        # probe, an HTTPS check and git.
+        self.send_json({
+            "status": "success",
+            "message": ok_message.format(instance=instance),
+            "instance": instance,
+            "service": service_name,
+            "state": self._active_states([instance])[instance],
+            "timestamp": self._now_iso()
+        })
 
-<div id="loading" class="loading"><div class="spinner"></div><p>Loading instances...</p></div>
-<div id="instances"></div>
-</main>
+    def handle_stop_instance(self, instance):
+        """Stop specific instance, and keep it stopped across reboots.
 
-<dialog id="resetAdminDialog" class="reset-admin-dialog">
-<form method="dialog" id="resetAdminForm">
-<h3 style="margin:0 0 10px;color:var(--danger);display:flex;align-items:center;gap:8px;font-size:16px"><svg width="18" height="18" viewBox="0 0 24 24" fill="none" stroke="currentColor" stroke-width="2" stroke-linecap="round" stroke-linejoin="round"><path d="M10.29 3.86L1.82 18a2 2 0 001.71 3h16.94a2 2 0 001.71-3L13.71 3.86a2 2 0 00-3.42 0z"/><path d="M12 9v4M12 17h.01"/></svg>Factory Reset<span id="resetAdminInstanceLabel"></span></h3>
-<p style="font-size:13px;color:var(--text-dim);margin:0 0 15px;line-height:1.5">Deletes all users and clears the broker login session. The next visit will require first-time admin setup and a fresh broker login. Use only when there's no TOTP/QR reset and no working SMTP.</p>
-<div class="reset-section">
-<label class="reset-field-label">Broker</label>
-<select id="resetBroker" class="reset-input" onchange="updateCallbackPreview()">
-<option value="">Keep current broker</option>
-</select>
-<div id="resetCallbackPreview" class="reset-preview"></div>
-</div>
-<label class="reset-checkbox-label"><input type="checkbox" id="resetRotateCreds" onchange="document.getElementById('resetCredsFields').style.display=this.checked?'block':'none'"> Also update broker API key/secret in .env</label>
-<div id="resetCredsFields" style="display:none">
-<label class="reset-field-label">New BROKER_API_KEY</label>
-<input type="text" id="resetApiKey" class="reset-input" placeholder="Leave blank to keep existing">
-<label class="reset-field-label">New BROKER_API_SECRET</label>
-<input type="password" id="resetApiSecret" class="reset-input" placeholder="Leave blank to keep existing">
-<label class="reset-checkbox-label"><input type="checkbox" id="resetXts" onchange="document.getElementById('resetXtsFields').style.display=this.checked?'block':'none'"> This broker also needs separate market-data credentials (XTS-based)</label>
-<div id="resetXtsFields" style="display:none">
-<label class="reset-field-label">New BROKER_API_KEY_MARKET</label>
-<input type="text" id="resetApiKeyMarket" class="reset-input" placeholder="Leave blank to keep existing">
-<label class="reset-field-label">New BROKER_API_SECRET_MARKET</label>
-<input type="password" id="resetApiSecretMarket" class="reset-input" placeholder="Leave blank to keep existing">
-</div>
-</div>
-<div class="reset-dialog-actions">
-<button type="button" class="btn btn-ghost" onclick="document.getElementById('resetAdminDialog').close()">Cancel</button>
-<button type="submit" value="confirm" class="btn btn-danger">Factory Reset</button>
-</div>
-</form>
-</dialog>
+        `stop` alone is undone by the next reboot or by the daily restart-all, so a
+        deliberately stopped instance would silently come back. `disable` makes the
+        intent stick; handle_start_instance re-enables.
+        """
+        self._systemctl(instance, ["disable", "stop"], "Stopped and disabled {instance}")
 
-<dialog id="changePasswordDialog" class="reset-admin-dialog">
-<form method="dialog" id="changePasswordForm">
-<h3 style="margin:0 0 10px;display:flex;align-items:center;gap:8px;font-size:16px"><svg width="18" height="18" viewBox="0 0 24 24" fill="none" stroke="currentColor" stroke-width="2" stroke-linecap="round" stroke-linejoin="round"><rect x="3" y="11" width="18" height="11" rx="2"/><path d="M7 11V7a5 5 0 0110 0v4"/></svg>Change Admin Password</h3>
-<label class="reset-field-label">Current Password</label>
-<input type="password" id="cpCurrent" class="reset-input" autocomplete="current-password" required>
-<label class="reset-field-label">New Password</label>
-<input type="password" id="cpNew" class="reset-input" autocomplete="new-password" required>
-<label class="reset-field-label">Confirm New Password</label>
-<input type="password" id="cpConfirm" class="reset-input" autocomplete="new-password" required>
-<div class="reset-dialog-actions">
-<button type="button" class="btn btn-ghost" onclick="document.getElementById('changePasswordDialog').close()">Cancel</button>
-<button type="submit" value="confirm" class="btn btn-accent">Change Password</button>
-</div>
-</form>
-</dialog>
+    def handle_start_instance(self, instance):
+        """Start specific instance and re-enable it at boot."""
+        self._systemctl(instance, ["enable", "start"], "Started and enabled {instance}")
 
-<script>""" + DASHBOARD_JS_COMMON + """
-const apiBase='/api';
-let brokerStatusCache={};
-let logsCache={};
-let terminalInstances=[];
-let terminalInitialized=false;
-async function fetchJson(url, options){
-const r=await fetch(url,options);
-if(r.status===401){
-window.location.href=`/login?next=${encodeURIComponent(location.pathname+location.search)}`;
-return new Promise(()=>{});
-}
-const text=await r.text();
-const contentType=(r.headers.get('content-type')||'').toLowerCase();
-try{
-return JSON.parse(text);
-}catch(e){
-const preview=text.replace(/\\s+/g,' ').slice(0,160);
-throw new Error(`Invalid JSON from ${url} (status ${r.status}, type ${contentType||'unknown'}): ${preview}`);
-}
-}
-let lastHealthAll={};
-async function loadInstances(){
-try{
-document.getElementById('loading').style.display='block';
-const [instances, scriptsStatus, health]=await Promise.all([
-fetchJson('/api/instances'),
-fetchJson('/api/scripts-status'),
-fetchJson('/api/health')
-]);
-document.getElementById('loading').style.display='none';
-if(!instances||instances.length===0){
-document.getElementById('instances').innerHTML='<p style="color:var(--text-faint)">No instances found</p>';
-return;
-}
-lastHealthAll=health.instances||{};
-renderScriptsStatus(scriptsStatus);
-renderInstances(instances, health, true);
-const lu=document.getElementById('last-updated');
-if(lu){lu.textContent='Live · updated '+new Date().toLocaleTimeString();}
-}catch(e){
-showAlert('Error: '+e.message,'error');
-}
-}
-function renderInstances(instances, health, initTerminal){
-const running=Object.values(health.instances||{}).filter(i=>i.status==='active'&&!i.wedged).length;
-document.getElementById('summary').innerHTML=`<div class="kpi"><div class="kpi-label">Total Instances</div><div class="kpi-value">${instances.length}</div></div><div class="kpi"><div class="kpi-label">Running</div><div class="kpi-value success">${running}</div></div><div class="kpi"><div class="kpi-label">Stopped</div><div class="kpi-value danger">${instances.length-running}</div></div>`;
-renderSystem(health.system,health.access);
-const html=instances.map(inst=>{
-const h=health.instances?.[inst]||{};
-const active=h.status==='active'&&!h.wedged;
-const broker=h.broker||'Unknown';
-const domain=h.domain||'Unknown';
-const authName=h.auth_name||'Unknown';
-const authStatus=h.auth_status||((h.session_valid!==false)?'User Authenticated':'Not Authenticated');
-const isAuthenticated=authStatus==='User Authenticated';
-const brokerAuthBadge=isAuthenticated?`<span class="badge badge-authenticated">${authStatus}</span>`:`<span class="badge badge-unauthenticated">${authStatus}</span>`;
-const mc=h.master_contract||{};
-const mcReady=mc.is_ready===true;
-const mcStatus=mc.status||'Master Contract Data Not Ready';
-const mcBadge=mcReady?`<span class="badge badge-authenticated">${mcStatus}</span>`:`<span class="badge badge-unauthenticated">${mcStatus}</span>`;
-const mcLast=mc.last_updated||'Unknown';
-const mcSymbols=(mc.total_symbols!==undefined&&mc.total_symbols!==null)?mc.total_symbols:'N/A';
-const mcBroker=mc.broker||'Unknown';
-const mcMessage=mc.message||'N/A';
-const git=h.git||{};
-const gitCurrent=git.current_commit||'N/A';
-const gitLatest=git.latest_commit||'N/A';
-const gitBehind=(git.behind!==null&&git.behind!==undefined)?`${git.behind} behind`:'';
-const gitUpdated=git.current_date||'Unknown';
-const gitSummary=gitCurrent===gitLatest?`${gitCurrent} (up to date)`:`${gitCurrent} → ${gitLatest} ${gitBehind}`.trim();
-const actions=active
-?`<button class="btn btn-sm btn-danger" onclick="stop('${inst}')">Stop</button>`
-:`<button class="btn btn-sm btn-success" onclick="start('${inst}')">Start</button>`;
-const monitorHref=domain!=='Unknown'?`https://${domain}/monitor`:`/monitor?instance=${inst}`;
-return`<div class="card"><div class="instance-header"><div class="instance-name">${inst}<span class="badge ${active?'badge-active':'badge-inactive'}">${active?ICON_CHECK+' Active':ICON_X+(h.wedged?' Wedged':' Inactive')}</span></div><a class="icon-btn" href="${monitorHref}" target="_blank" rel="noopener" title="Open monitor page for ${inst}"><svg width="15" height="15" viewBox="0 0 24 24" fill="none" stroke="currentColor" stroke-width="2" stroke-linecap="round" stroke-linejoin="round"><path d="M18 13v6a2 2 0 01-2 2H5a2 2 0 01-2-2V8a2 2 0 012-2h6"/><path d="M15 3h6v6"/><path d="M10 14L21 3"/></svg></a></div><div class="detail-grid"><div class="detail-item"><div class="detail-label">Domain</div><div class="detail-value">${domain!=='Unknown'?`<a href="https://${domain}" target="_blank" rel="noopener">${domain} ↗</a>`:domain}</div></div><div class="detail-item"><div class="detail-label">Env Version</div><div class="detail-value">${h.env_version||'—'}</div></div><div class="detail-item"><div class="detail-label">Status</div><div class="detail-value ${active?'active':'inactive'}">${h.wedged?'active (wedged - not serving)':(h.status||'unknown')}</div></div><div class="detail-item"><div class="detail-label">Flask Port</div><div class="detail-value">${h.port||'N/A'}</div></div><div class="detail-item"><div class="detail-label">Database</div><div class="detail-value status-inline">${h.database?ICON_CHECK+' Present':ICON_X+' Missing'}</div></div><div class="detail-item"><div class="detail-label">Git</div><div class="detail-value mono">${gitSummary}</div></div><div class="detail-item"><div class="detail-label">Code Updated</div><div class="detail-value">${gitUpdated}</div></div></div><div class="subpanel ${isAuthenticated?'ok':'bad'}"><div class="subpanel-title">${authName} | Broker: ${broker} ${brokerAuthBadge}</div></div><div class="subpanel ${mcReady?'ok':'bad'}"><div class="subpanel-title">Master Contract Data ${mcBadge}</div><div class="subpanel-grid"><div><div class="detail-label">Last Updated</div><div class="detail-value">${mcLast}</div></div><div><div class="detail-label">Total Symbols</div><div class="detail-value">${mcSymbols}</div></div><div><div class="detail-label">Broker</div><div class="detail-value">${mcBroker}</div></div><div><div class="detail-label">Message</div><div class="detail-value">${mcMessage}</div></div></div></div><button class="logs-toggle" onclick="toggleLogs('${inst}')">${ICON_LOGS}View Logs${ICON_CHEVRON}</button><div id="logs-${inst}" class="logs-section"><div class="logs-container" id="logs-content-${inst}"><p style="color:var(--text-faint)">Loading logs...</p></div></div><div class="actions"><button class="btn btn-sm" onclick="runHealthCheck('instance','${inst}')">Health</button><button class="btn btn-sm" onclick="updateInstance('${inst}')">Update</button><button class="btn btn-sm" onclick="restart('${inst}')">Restart</button><div class="danger-group"><button class="btn btn-sm" onclick="invalidate('${inst}')">Invalidate</button><button class="btn btn-sm btn-danger" onclick="resetAdminUser('${inst}')">Factory Reset</button>${actions}</div></div></div>`;
-}).join('');
-document.getElementById('instances').innerHTML=html;
-if(initTerminal && !terminalInitialized){
-populateTerminalInstances(instances);
-terminalInitialized=true;
-}
-}
-function populateTerminalInstances(instances){
-const select=document.getElementById('term-instance');
-if(!select)return;
-terminalInstances=Array.isArray(instances)?instances:[];
-if(!instances||instances.length===0){
-select.innerHTML='<option value="">No instances</option>';
-}else{
-select.innerHTML=instances.map(i=>`<option value="${i}">${i}</option>`).join('');
-}
-if(select.options.length){
-select.selectedIndex=0;
-}
-updateTerminalFields();
-}
-function getSelectedInstance(){
-const select=document.getElementById('term-instance');
-if(!select)return'';
-let val='';
-if(select.selectedOptions&&select.selectedOptions.length){
-const opt=select.selectedOptions[0];
-val=(opt.value||opt.text||'').trim();
-}
-if(!val){
-val=(select.value||'').trim();
-}
-if(!val&&select.options&&select.options.length){
-const opt=select.options[0];
-val=(opt.value||opt.text||'').trim();
-}
-return val;
-}
-function resolveInstance(){
-let inst=getSelectedInstance();
-const select=document.getElementById('term-instance');
-if(!inst&&select&&select.options&&select.options.length){
-select.selectedIndex=0;
-inst=getSelectedInstance();
-}
-if(!inst&&terminalInstances.length){
-inst=terminalInstances[0];
-if(select){select.value=inst;}
-}
-return (inst||'').trim();
-}
-function updateTerminalFields(){
-const action=document.getElementById('term-action')?.value;
-const dbWrap=document.getElementById('term-db-wrap');
-const queryWrap=document.getElementById('term-query-wrap');
-const linesWrap=document.getElementById('term-lines-wrap');
-const instanceWrap=document.getElementById('term-instance-wrap');
-if(dbWrap){dbWrap.style.display=(action==='sqlite_select')?'block':'none';}
-if(queryWrap){queryWrap.style.display=(action==='sqlite_select')?'block':'none';}
-if(linesWrap){linesWrap.style.display=(action==='journalctl_tail')?'block':'none';}
-if(instanceWrap){instanceWrap.style.display=(action==='df'||action==='free'||action==='uptime')?'none':'block';}
-loadTerminalDbs();
-}
-async function loadTerminalDbs(){
-const action=document.getElementById('term-action')?.value;
-const inst=resolveInstance();
-const dbSelect=document.getElementById('term-db');
-if(!dbSelect)return;
-if(!inst){
-dbSelect.innerHTML='<option value="">Select instance</option>';
-return;
-}
-if(action!=='sqlite_select'){
-dbSelect.innerHTML='';
-return;
-}
-try{
-const data=await fetchJson(`/api/terminal/dbs?instance=${encodeURIComponent(inst)}`);
-const dbs=data.dbs||[];
-dbSelect.innerHTML=dbs.length?dbs.map(d=>`<option value="${d}">${d}</option>`).join(''):'<option value="">No databases found</option>';
-}catch(e){
-dbSelect.innerHTML='<option value="">Error loading dbs</option>';
-}
-}
-document.getElementById('term-action')?.addEventListener('change',()=>{
-updateTerminalFields();
-});
-document.getElementById('term-instance')?.addEventListener('change',loadTerminalDbs);
-document.getElementById('term-action')?.dispatchEvent(new Event('change'));
+    def handle_invalidate_session(self, instance):
+        """Invalidate session for a specific instance"""
+        result = self._invalidate_session(instance)
+        self.send_json({
+            "status": "success",
+            "message": f"Session invalidated for {instance}",
+            "instance": instance,
+            "details": result,
+            "timestamp": self._now_iso()
+        })
+
+    def handle_reset_admin_user(self, instance, data=None):
+        """Delete all users for a specific instance, forcing first-time setup.
+        Optionally also switches the active broker (data['broker'], which
+        updates REDIRECT_URL) and/or rotates broker API credentials in .env
+        when data includes broker_api_key / broker_api_secret / *_market
+        fields."""
+        broker_creds = {
+            "broker": (data or {}).get("broker", ""),
+            "broker_api_key": (data or {}).get("broker_api_key", ""),
+            "broker_api_secret": (data or {}).get("broker_api_secret", ""),
+            "broker_api_key_market": (data or {}).get("broker_api_key_market", ""),
+            "broker_api_secret_market": (data or {}).get("broker_api_secret_market", ""),
+        }
+        result = self._reset_admin_user(instance, broker_creds)
+        self.send_json({
+            "status": "success" if result.get("reset") else "error",
+            "message": f"Factory reset complete for {instance}" if result.get("reset") else (result.get("error") or "Reset failed"),
+            "instance": instance,
+            "details": result,
+            "timestamp": self._now_iso()
+        })
 
-async function runTerminal(){
-const action=document.getElementById('term-action').value;
-const instance=resolveInstance();
-const lines=document.getElementById('term-lines').value;
-const db=document.getElementById('term-db').value;
-const query=document.getElementById('term-query').value;
-const output=document.getElementById('term-output');
-if(output){output.textContent='Running...';}
-if((action==='systemctl_status'||action==='journalctl_tail'||action==='sqlite_select')&&!instance){
-if(output){output.textContent='Instance required for this action.';}
-return;
-}
-if(action==='sqlite_select' && !db){
-if(output){output.textContent='Please select a database.';}
-return;
-}
-if(action==='sqlite_select' && (!query||!query.trim())){
-if(output){output.textContent='Please enter a SELECT query.';}
-return;
-}
-const payload={action,instance,lines,db,query};
-try{
-const data=await fetchJson('/api/terminal/run',{method:'POST',headers:{'Content-Type':'application/json'},body:JSON.stringify(payload)});
-if(data.error){
-if(output){output.textContent=data.error;}
-return;
-}
-if(output){output.textContent=data.output||'';}
-}catch(e){
-if(output){output.textContent=e.message;}
-}
-}
-function applyScriptsAvailability(scripts){
-const healthOk=!!(scripts&&scripts['oa-health-check.sh']&&scripts['oa-health-check.sh'].found);
-const updateOk=!!(scripts&&scripts['oa-update.sh']&&scripts['oa-update.sh'].found);
-const btnHealthAll=document.getElementById('btn-health-all');
-const btnHealthSystem=document.getElementById('btn-health-system');
-const btnUpdateAll=document.getElementById('btn-update-all');
-if(btnHealthAll){btnHealthAll.disabled=!healthOk;btnHealthAll.title=healthOk?'':'oa-health-check.sh not found';}
-if(btnHealthSystem){btnHealthSystem.disabled=!healthOk;btnHealthSystem.title=healthOk?'':'oa-health-check.sh not found';}
-if(btnUpdateAll){btnUpdateAll.disabled=!updateOk;btnUpdateAll.title=updateOk?'':'oa-update.sh not found';}
-}
-async function toggleLogs(inst){
-const logsSection=document.getElementById(`logs-${inst}`);
-logsSection.classList.toggle('show');
-event?.currentTarget?.classList.toggle('open');
-if(logsSection.classList.contains('show')&&!logsCache[inst]){
-fetchLogs(inst);
-}
-}
-async function fetchLogs(inst){
-try{
-const data=await fetchJson(`/api/logs/${inst}`);
-const logsContent=document.getElementById(`logs-content-${inst}`);
-if(data.logs&&data.logs.length>0){
-const html=data.logs.map(log=>{
-const lowerLog=log.toLowerCase();
-const hasAuthError=(lowerLog.includes('session expired')||lowerLog.includes('invalid session detected')||lowerLog.includes('no valid auth token'));
-const hasSuccess=(lowerLog.includes('master contract download completed')||lowerLog.includes('successfully loaded'));
-return`<div class="log-line ${hasAuthError?'log-error':''}${hasSuccess?'log-success':''}">${escapeHtml(log)}</div>`;
-}).join('');
-logsContent.innerHTML=html;
-logsCache[inst]=true;
-}else{
-logsContent.innerHTML='<p style="color:var(--text-faint)">No logs available</p>';
-}
-}catch(e){
-document.getElementById(`logs-content-${inst}`).innerHTML=`<p style="color:var(--danger)">Error loading logs: ${e.message}</p>`;
-}
-}
-async function restartAll(){
-if(!confirm('Restart all instances?'))return;
-showAlert('Restarting all...','info');
-const d=await fetchJson('/api/restart-all',{method:'POST'});
-showAlert(d.message,'success');
-setTimeout(loadInstances,2000);
-}
-function runHealthCheck(scope,instance){
-const title=scope==='instance'?`Health Check (${instance})`:`Health Check (${scope})`;
-startJob('/api/health-check',{scope:scope,instance:instance},title);
-}
-function updateAll(){
-if(!confirm('Update ALL instances? This can take several minutes.'))return;
-startJob('/api/update',{scope:'all'},'Update All Instances');
-}
-function updateInstance(inst){
-if(!confirm(`Update ${inst}? This can take several minutes.`))return;
-startJob('/api/update',{scope:'instance',instance:inst},`Update ${inst}`);
-}
-async function restart(inst){
-if(!confirm(`Restart ${inst}? This will invalidate the session.`))return;
-await fetchJson('/api/restart-instance',{method:'POST',headers:{'Content-Type':'application/json'},body:JSON.stringify({instance:inst})});
-showAlert(`Restarting ${inst}`,'info');
-setTimeout(loadInstances,1000);
-}
-async function invalidate(inst){
-if(!confirm(`Invalidate session for ${inst}? This will clear auth tokens and revoke the session.`))return;
-await fetchJson('/api/invalidate-session',{method:'POST',headers:{'Content-Type':'application/json'},body:JSON.stringify({instance:inst})});
-showAlert(`Invalidating session for ${inst}`,'info');
-setTimeout(loadInstances,1000);
-}
-let resetDialogHealth=null;
-function openResetAdminDialog(inst){
-resetDialogHealth=(lastHealthAll&&lastHealthAll[inst])||{};
-const dlg=document.getElementById('resetAdminDialog');
-document.getElementById('resetAdminForm').reset();
-populateBrokerSelect();
-document.getElementById('resetCredsFields').style.display='none';
-document.getElementById('resetXtsFields').style.display='none';
-document.getElementById('resetAdminInstanceLabel').textContent=inst?` for ${inst}`:'';
-return new Promise(resolve=>{
-dlg.returnValue='';
-dlg.showModal();
-dlg.onclose=function(){
-if(dlg.returnValue!=='confirm'){resolve(null);return;}
-const broker=document.getElementById('resetBroker').value;
-if(!document.getElementById('resetRotateCreds').checked){resolve(broker?{broker:broker}:{});return;}
-const xts=document.getElementById('resetXts').checked;
-resolve({
-broker:broker,
-broker_api_key:document.getElementById('resetApiKey').value.trim(),
-broker_api_secret:document.getElementById('resetApiSecret').value.trim(),
-broker_api_key_market:xts?document.getElementById('resetApiKeyMarket').value.trim():'',
-broker_api_secret_market:xts?document.getElementById('resetApiSecretMarket').value.trim():''
-});
-};
-});
-}
-async function resetAdminUser(inst){
-const creds=await openResetAdminDialog(inst);
-if(creds===null)return;
-showAlert(`Resetting admin user for ${inst}...`,'info');
-try{
-const res=await fetchJson('/api/reset-admin-user',{method:'POST',headers:{'Content-Type':'application/json'},body:JSON.stringify(Object.assign({instance:inst},creds))});
-showAlert(res&&res.message?res.message:`Factory reset complete for ${inst}`,res&&res.status==='error'?'error':'success');
-}catch(e){
-showAlert('Error: '+e.message,'error');
-return;
-}
-setTimeout(loadInstances,1000);
-}
-async function stop(inst){
-if(!confirm(`Stop ${inst}?`))return;
-await fetchJson('/api/stop-instance',{method:'POST',headers:{'Content-Type':'application/json'},body:JSON.stringify({instance:inst})});
-showAlert(`Stopping ${inst}`,'info');
-setTimeout(loadInstances,1000);
-}
-async function start(inst){
-if(!confirm(`Start ${inst}?`))return;
-await fetchJson('/api/start-instance',{method:'POST',headers:{'Content-Type':'application/json'},body:JSON.stringify({instance:inst})});
-showAlert(`Starting ${inst}`,'info');
-setTimeout(loadInstances,1000);
-}
-window.addEventListener('load',loadInstances);
-setInterval(loadInstances,30000);
-</script>
-</body>
-</html>""")
-        
-        html_bytes = html.encode('utf-8')
+    def handle_reboot_server(self):
+        """Reboot the server with fallback"""
+        def _reboot():
+            try:
+                # Try primary reboot command
+                result = subprocess.run(
+                    _SYSTEMCTL + ["reboot"],
+                    capture_output=True, timeout=10
+                )
+                # If primary fails, use fallback
+                if result.returncode != 0:
+                    subprocess.run(
+                        _SUDO + ["shutdown", "-r", "now"],
+                        capture_output=True, timeout=10
+                    )
+            except Exception as e:
+                # Final fallback
+                try:
+                    subprocess.run(
+                        _SUDO + ["shutdown", "-r", "now"],
+                        capture_output=True, timeout=10
+                    )
+                except:
+                    pass
+
+        # Run reboot in background thread so response can be sent before shutdown
+        Thread(target=_reboot).start()
+
+        self.send_json({
+            "status": "success",
+            "message": "Server reboot initiated. The system will restart shortly.",
+            "timestamp": self._now_iso()
+        })
+
+    def _restart_all(self, job_id):
+        """Background restart all.
+
+        The daily-restart script only exists if setup-daily-restart.sh was run, so
+        fall back to restarting each instance directly rather than failing.
+        """
+        script = '/usr/local/bin/openalgo-daily-restart.sh'
+        if os.path.exists(script):
+            self._run_script_job(job_id, [script], timeout=600)
+            for inst in self._list_instances():
+                try:
+                    self._forget_active_state(self._service_name(inst))
+                except ValueError:
+                    pass
+            return
+
+        self._update_job(job_id, status="running", started_at=self._now_iso())
+        lines = [f"{script} not found - restarting each instance directly"]
+        failed = []
+
+        def restart_one(inst):
+            try:
+                service_name = self._service_name(inst)
+                result = subprocess.run(
+                    _SYSTEMCTL + ["restart", service_name],
+                    capture_output=True, text=True, timeout=60,
+                )
+                self._forget_active_state(service_name)
+                if result.returncode == 0:
+                    return True, f"restarted {service_name}"
+                return False, f"FAILED {service_name}: {(result.stderr or '').strip()}"
+            except Exception as e:
+                return False, f"FAILED {inst}: {e}"
+
+        # A few units at a time: wall-clock drops to roughly N/width restarts,
+        # but a 2 GB box is never asked to boot every gunicorn worker at once.
+        instances = self._list_instances()
+        with ThreadPoolExecutor(max_workers=self.RESTART_ALL_WIDTH) as pool:
+            for inst, (ok, line) in zip(instances, pool.map(restart_one, instances)):
+                lines.append(line)
+                if not ok:
+                    failed.append(inst)
+
+        try:
+            subprocess.run(_SYSTEMCTL + ["reload", "nginx"],
+                           capture_output=True, text=True, timeout=30)
+        except Exception as e:
+            lines.append(f"nginx reload failed: {e}")
+
+        self._update_job(
+            job_id,
+            status="error" if failed else "success",
+            exit_code=1 if failed else 0,
+            error=f"Failed to restart: {', '.join(failed)}" if failed else None,
+            output="\n".join(lines),
+            finished_at=self._now_iso(),
+        )
+
+    def serve_monitor_ui(self):
+        """Serve single-instance monitor UI"""
+        instance = self._resolve_monitor_instance() or ""
+        manager_domain = os.environ.get('MANAGER_DOMAIN', '').strip()
+        if manager_domain:
+            manager_url = f"https://{manager_domain}/"
+        else:
+            server_ip = get_server_ip()
+            manager_url = f"http://{server_ip}:{PORT}/" if server_ip else "/"
+        etag = self._monitor_etag(manager_url, instance)
+        # Same revalidation scheme as the manager page: the browser keeps the
+        # page and an unchanged one costs a 304.
+        if self._etag_matches(etag):
+            self.send_response(304)
+            self.send_header('ETag', etag)
+            self.send_header('Vary', 'Accept-Encoding')
+            self.send_header('Cache-Control', 'private, no-cache')
+            self.end_headers()
+            return
+        use_gzip = _accepts_gzip(self.headers.get('Accept-Encoding'))
+        page = self._monitor_page(manager_url, instance)
+        html_bytes = page[1] if use_gzip else page[0]
         self.send_response(200)
         self.send_header('Content-Type', 'text/html; charset=utf-8')
-        self.send_header('Cache-Control', 'no-store, no-cache, must-revalidate')
-        self.send_header('Pragma', 'no-cache')
-        self.send_header('Expires', '0')
+        if use_gzip:
+            self.send_header('Content-Encoding', 'gzip')
+        self.send_header('Vary', 'Accept-Encoding')
+        self.send_header('ETag', etag)
+        self.send_header('Cache-Control', 'private, no-cache')
+        self.send_header('Content-Length', len(html_bytes))
+        self.end_headers()
+        self.wfile.write(html_bytes)
+
+    def _monitor_etag(self, manager_url, instance):
+        data = b"\0".join((MONITOR_UI_DIGEST, manager_url.encode('utf-8'), instance.encode('utf-8')))
+        return 'W/"%s"' % hashlib.sha256(data).hexdigest()[:16]
+
+    def _monitor_page(self, manager_url, instance):
+        """(identity, gzip) bytes of the monitor page for one instance.
+
+        Only the manager link and the instance name vary; the rest of the page
+        was encoded once at import. Pages for installed instances are cached
+        with their compressed form, so gzip runs once per instance rather than
+        per load. That includes openalgo-<domain> symlinks, the name a Host
+        header resolves to. Other names are rendered but never cached, which
+        keeps the cache bounded by what is on disk.
+        """
+        key = (manager_url, instance)
+        page = self.MONITOR_UI_CACHE.get(key)
+        if page:
+            return page
+        html_bytes = b"".join((MONITOR_UI_HEAD, manager_url.encode('utf-8'), MONITOR_UI_MID,
+                               instance.encode('utf-8'), MONITOR_UI_TAIL))
+        page = (html_bytes, gzip.compress(html_bytes, compresslevel=9, mtime=0))
+        if instance and os.path.isdir(f"/var/python/openalgo-flask/{instance}"):
+            self.MONITOR_UI_CACHE[key] = page
+        return page
+
+    def _etag_matches(self, etag):
+        """True when the request's If-None-Match already names `etag`."""
+        header = self.headers.get('If-None-Match', '')
+        if not header:
+            return False
+        tags = [t.strip() for t in header.split(',')]
+        return '*' in tags or etag in tags or etag.replace('W/', '', 1) in tags
+
+    def serve_web_ui(self):
+        """Serve HTML dashboard"""
+        # no-cache (not no-store) lets the browser keep the page and revalidate
+        # it with If-None-Match on every load; an unchanged page costs a 304.
+        if self._etag_matches(WEB_UI_ETAG):
+            self.send_response(304)
+            self.send_header('ETag', WEB_UI_ETAG)
+            self.send_header('Vary', 'Accept-Encoding')
+            self.send_header('Cache-Control', 'private, no-cache')
+            self.end_headers()
+            return
+        use_gzip = _accepts_gzip(self.headers.get('Accept-Encoding'))
+        html_bytes = WEB_UI_GZIP if use_gzip else WEB_UI_BYTES
+        self.send_response(200)
+        self.send_header('Content-Type', 'text/html; charset=utf-8')
+        if use_gzip:
+            self.send_header('Content-Encoding', 'gzip')
+        self.send_header('Vary', 'Accept-Encoding')
+        self.send_header('ETag', WEB_UI_ETAG)
+        self.send_header('Cache-Control', 'private, no-cache')
         self.send_header('Content-Length', len(html_bytes))
         self.end_headers()
         self.wfile.write(html_bytes)
     
     def send_json(self, data, status=200):
         """Send JSON response"""
-        json_str = json.dumps(data)
-        json_bytes = json_str.encode('utf-8')
+        self._send_json_bytes(_json_dumps(data), status)
+
+    def send_json_revalidated(self, data, fingerprint):
+        """Send JSON that pollers may revalidate with If-None-Match.
+
+        The weak ETag hashes `fingerprint` - the payload minus whatever changes
+        on every call (the timestamp) - so a poll that would return the same
+        data gets a bodiless 304 instead. Only worth it where the rest of the
+        payload is stable between polls, which is /api/status (unit states);
+        the health payloads carry live system stats and never would be.
+        """
+        etag = 'W/"%s"' % hashlib.blake2b(_json_dumps(fingerprint), digest_size=8).hexdigest()
+        if self._etag_matches(etag):
+            self.send_response(304)
+            self.send_header('ETag', etag)
+            self.send_header('Vary', 'Accept-Encoding')
+            self.send_header('Cache-Control', 'private, no-cache')
+            self.end_headers()
+            return
+        self._send_json_bytes(_json_dumps(data), etag=etag)
+
+    def _send_json_bytes(self, json_bytes, status=200, etag=None):
+        """Send an already-serialized JSON body"""
+        # The health and log payloads are repetitive JSON that shrinks several
+        # times over; below ~1 KB gzip's header and CPU cost outweigh it.
+        use_gzip = (len(json_bytes) >= _JSON_GZIP_MIN_SIZE
+                    and _accepts_gzip(self.headers.get('Accept-Encoding')))
+        if use_gzip:
+            json_bytes = gzip.compress(json_bytes, compresslevel=6, mtime=0)
         self.send_response(status)
         self.send_header('Content-Type', 'application/json')
-        self.send_header('Cache-Control', 'no-store, no-cache, must-revalidate')
-        self.send_header('Pragma', 'no-cache')
-        self.send_header('Expires', '0')
+        if use_gzip:
+            self.send_header('Content-Encoding', 'gzip')
+        self.send_header('Vary', 'Accept-Encoding')
+        if etag:
+            # Stored, but revalidated on every use - that is what lets the
+            # client send If-None-Match.
+            self.send_header('ETag', etag)
+            self.send_header('Cache-Control', 'private, no-cache')
+        else:
+            self.send_header('Cache-Control', 'no-store, no-cache, must-revalidate')
+            self.send_header('Pragma', 'no-cache')
+            self.send_header('Expires', '0')
         self.send_header('Content-Length', len(json_bytes))
         self.end_headers()
         self.wfile.write(json_bytes)
@@ -3176,9 +4138,45 @@ setInterval(loadInstances,30000);
         """Suppress logging"""
         pass
 
+class APIServer(http.server.ThreadingHTTPServer):
+    """Thread-per-connection server for the API and both dashboards.
+
+    Not a fixed worker pool: keep-alive connections sit idle for up to
+    RestartHandler.timeout, and with a pool a handful of idle sockets would
+    tie up every worker and stall /health.
+    """
+
+    # socketserver's default listen() backlog is 5; a burst of dashboard tabs
+    # and fleet-manager polls arriving together would see refused or retried
+    # SYNs beyond that.
+    request_queue_size = 64
+
+
+def _status_refresher():
+    """Keep RestartHandler.STATUS_SNAPSHOT warm in the background.
+
+    /api/instances and /api/status then answer from memory, and systemctl is
+    polled once per interval no matter how many dashboard tabs are open.
+
+    Nothing pushes unit changes to us without a D-Bus client, so this polls -
+    but only while someone is reading. Once no client has asked for STATUS_IDLE
+    seconds it stops forking systemctl; the next read collects inline and the
+    loop picks up again.
+    """
+    handler = RestartHandler.__new__(RestartHandler)
+    while True:
+        if time.time() - RestartHandler.STATUS_LAST_READ < RestartHandler.STATUS_IDLE:
+            try:
+                handler._refresh_status_snapshot()
+            except Exception as e:
+                print(f"Status refresh failed: {e}", flush=True)
+        time.sleep(RestartHandler.STATUS_REFRESH_INTERVAL)
+
+
 def _self_test():
     """Verify instance-name validation rejects anything that could reach a shell
-    or escape the instance directory. Runs without root and without a server."""
+    or escape the instance directory, plus the pure request-parsing helpers.
+    Runs without root and without a server."""
     handler = RestartHandler.__new__(RestartHandler)
 
     rejected = [
@@ -3199,8 +4197,23 @@ def _self_test():
     for good in ("openalgo1", "openalgo42", "openalgo-fyers-simplifyed-in"):
         assert handler._sanitize_instance(good) == good, f"should accept: {good}"
 
+    # gzip is only sent when the client accepts it; q=0 is an explicit refusal.
+    for header, expected in (("gzip, deflate, br", True), ("br;q=1.0, gzip;q=0.8", True),
+                             ("gzip;q=0", False), ("identity", False), ("", False),
+                             (None, False), ("*", True), ("*;q=0", False),
+                             ("gzip;q=0, *", False)):
+        assert _accepts_gzip(header) is expected, f"_accepts_gzip({header!r}) != {expected}"
+
+    # Routes are looked up by name at request time, so a typo would only
+    # surface as a 500 on that endpoint.
+    names = list(_GET_ROUTES.values()) + [name for _, name in _GET_PREFIX_ROUTES]
+    names += [route[0] for route in _POST_ROUTES.values()]
+    for name in names:
+        assert callable(getattr(RestartHandler, name, None)), f"route target missing: {name}"
+
     print("self-test passed: instance-name validation rejects shell metacharacters "
-          "and path traversal")
+          "and path traversal; Accept-Encoding negotiation honours q=0; "
+          "every route resolves to a handler")
 
 
 if __name__ == '__main__':
@@ -3244,12 +4257,15 @@ if __name__ == '__main__':
 
     PORT = int(sys.argv[1]) if len(sys.argv) > 1 else 8888
 
-    class ReusableTCPServer(socketserver.ThreadingMixIn, socketserver.TCPServer):
-        allow_reuse_address = True
-        daemon_threads = True
-
+    # ThreadingHTTPServer (stdlib, Python 3.7+) serves each connection on its
+    # own daemon thread and sets SO_REUSEADDR, so a slow systemctl/journalctl
+    # call or an idle keep-alive connection never blocks the accept loop or
+    # other dashboard polls.
+    # It must stay stdlib-only: api-manager.sh copies this single file and runs
+    # it with the system /usr/bin/python3.
     BIND = os.environ.get('OPENALGO_BIND', '0.0.0.0')
-    server = ReusableTCPServer((BIND, PORT), RestartHandler)
+    server = APIServer((BIND, PORT), RestartHandler)
+    Thread(target=_status_refresher, daemon=True).start()
 
     print(f"OpenAlgo API running on {BIND}:{PORT}", flush=True)
     